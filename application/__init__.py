@@ -12,6 +12,10 @@ app.config.from_pyfile("config.cfg")
 # create db object
 db = SQLAlchemy(app)
 
+# request / stage / model-load metrics (shared across workers via METRICS_DIR)
+from application import metrics
+metrics.configure(app)
+
 # ------------ Flask-Login setup ------------
 login_manager = LoginManager(app)
 
@@ -30,10 +34,31 @@ def load_user(user_id):
 
 # import routes so the decorators register with 'app'
 from application import routes
+# flask CLI commands (flask export-flat-model, ...)
+from application import commands
+
+# start loading the model in the background so the first request doesn't wait for it
+from application import warmup
+if app.config.get("MODEL_WARMUP_ON_START", True):
+    warmup.start_warmup(app)
+
+# hot-reload the model when the files in Model/ change
+if app.config.get("MODEL_WATCH_ENABLED", False):
+    from application import predictor
+    predictor.start_model_watch(app)
 
 
 # new method for SQLAlchemy version 3 onwards
 with app.app_context():
-    db.drop_all()
+    # RESET_DB_ON_START = False keeps existing rows (e.g. seeded with flask seed-history)
+    if app.config.get("RESET_DB_ON_START", True):
+        db.drop_all()
     db.create_all()
+    # columns added since the tables were created (application/schema.py)
+    from application import schema
+    schema.ensure_schema()
+    # the FTS location index (application/search.py) is made with the prediction
+    # table; this adds it to a database created before it existed
+    from application import search
+    search.ensure_location_search()
     print('Created Database!')
\ No newline at end of file
@@ -0,0 +1,334 @@
+# ASGI entry point: uvicorn application.asgi:application
+#
+# The /api/predictions write endpoints run on the event loop. The body is
+# read without holding a thread, inference runs in a thread pool and the
+# database write on one writer thread, so an open connection only costs a
+# thread while it is actually being scored or saved. Every other route
+# (HTML pages, login, GET/DELETE, model stats, ...) is the unchanged Flask
+# app, run through asgiref's WSGI adapter.
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.cookies import CookieError, SimpleCookie
+
+import pytz
+from asgiref.wsgi import WsgiToAsgi
+from itsdangerous import BadSignature
+
+from application import app, db
+from application import metrics
+from application.models import User
+from application.predictor import preprocess_and_predict
+from application.routes import (
+    api_batch_items,
+    api_batch_save,
+    api_prediction_input,
+    batch_response_body,
+    batch_response_items,
+    created_prediction_body,
+    missing_api_fields,
+    new_prediction,
+    saved_batch_rows,
+    score_api_batch,
+    store_predictions,
+)
+from application.writebehind import flush_write_queue
+
+singapore_tz = pytz.timezone("Asia/Singapore")
+
+# returned by session_user_id() when only Flask-Login can tell who the user is
+USE_FLASK = object()
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+def _in_app_context(fn, *args):
+    with app.app_context():
+        return fn(*args)
+
+
+def _score_prediction(data):
+    """
+    Parse (checking the location against the model's vocabulary, which
+    may load the encoder) and score one /api/predictions body. Runs on an
+    inference thread.
+
+    Returns:
+        tuple: (input_data, predicted_rent)
+    """
+    input_data = api_prediction_input(data)
+    return input_data, preprocess_and_predict(input_data)
+
+
+def _score_batch(items, save):
+    """
+    score_api_batch, plus the rows to store when save is set. Runs on an
+    inference thread.
+
+    Returns:
+        tuple: (results, [(position, input_data, predicted_rent), ...])
+    """
+    results = score_api_batch(items)
+    return results, saved_batch_rows(items, results) if save else []
+
+
+def _save_predictions(rows, created_at, user_id):
+    """
+    Store scored (input_data, predicted_rent) rows in one transaction
+    (or queue them, WRITE_BEHIND_ENABLED). Runs on the writer thread.
+
+    Returns:
+        list: (id, public_id) of each new Prediction, in the order of rows;
+        id is None while queued
+    """
+    # same as Flask-Login: a session for a deleted user is anonymous
+    if user_id is not None and db.session.get(User, user_id) is None:
+        user_id = None
+
+    new_preds = [new_prediction(input_data, predicted_rent, created_at, user_id)
+                 for input_data, predicted_rent in rows]
+    try:
+        ids = store_predictions(new_preds)
+    except Exception:
+        db.session.rollback()
+        raise
+    return [(prediction_id, pred.public_id) for prediction_id, pred in zip(ids, new_preds)]
+
+
+def session_user_id(flask_app, headers):
+    """
+    The user id Flask-Login would load for a request with these headers,
+    read from the signed Flask session cookie.
+
+    Returns:
+        int or None, or USE_FLASK if the user could only be restored from
+        the remember-me cookie
+    """
+    cookie = SimpleCookie()
+    try:
+        for name, value in headers:
+            if name == b"cookie":
+                cookie.load(value.decode("latin-1"))
+    except CookieError:
+        return USE_FLASK
+
+    user_id = None
+    session_name = flask_app.config["SESSION_COOKIE_NAME"]
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    if session_name in cookie and serializer is not None:
+        try:
+            data = serializer.loads(
+                cookie[session_name].value,
+                max_age=int(flask_app.permanent_session_lifetime.total_seconds()),
+            )
+            user_id = data.get("_user_id")
+        except BadSignature:
+            pass
+
+    if user_id is None and flask_app.config.get("REMEMBER_COOKIE_NAME", "remember_token") in cookie:
+        return USE_FLASK
+    return int(user_id) if user_id is not None else None
+
+
+async def read_body(receive, max_bytes):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ClientDisconnected()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if max_bytes and size > max_bytes:
+            raise BodyTooLarge()
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+def json_body(scope, body):
+    """
+    The JSON object in body, or {} (like request.get_json(silent=True) or {}).
+    Decoding a body of up to ASGI_MAX_BODY_BYTES takes a while: run it on
+    an inference thread, not the event loop.
+    """
+    content_type = dict(scope["headers"]).get(b"content-type", b"").decode("latin-1")
+    mimetype = content_type.split(";")[0].strip().lower()
+    if not (mimetype == "application/json" or (mimetype.startswith("application/") and mimetype.endswith("+json"))):
+        return {}
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+class PredictionASGIApp:
+    """
+    ASGI app serving POST /api/predictions and /api/predictions/batch
+    natively and everything else through the Flask app.
+
+    Args:
+        flask_app: The Flask application
+        inference_threads (int): Threads scoring requests (ASGI_INFERENCE_THREADS)
+        max_body_bytes (int): Largest request body accepted (ASGI_MAX_BODY_BYTES)
+    """
+
+    def __init__(self, flask_app, inference_threads=8, max_body_bytes=16 * 1024 * 1024):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.inference_threads = inference_threads
+        self.max_body_bytes = max_body_bytes
+        self._inference = None
+        self._writer = None
+        # (method, path) -> (handler, endpoint name of the Flask view it replaces)
+        self.routes = {
+            ("POST", "/api/predictions"): (self.create_prediction, "api_create_prediction"),
+            ("POST", "/api/predictions/batch"): (self.create_predictions_batch, "api_create_predictions_batch"),
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+
+        if scope["type"] == "http":
+            path = scope["path"]
+            root_path = scope.get("root_path", "")
+            if root_path and path.startswith(root_path):
+                path = path[len(root_path):]
+            route = self.routes.get((scope["method"], path))
+            if route is not None:
+                user_id = session_user_id(self.flask_app, scope["headers"])
+                if user_id is not USE_FLASK:
+                    await self.serve(*route, scope, receive, send, user_id)
+                    return
+
+        await self.wsgi(scope, receive, send)
+
+    async def serve(self, handler, endpoint, scope, receive, send, user_id):
+        started = time.perf_counter()
+        try:
+            body = await read_body(receive, self.max_body_bytes)
+        except ClientDisconnected:
+            return
+        except BodyTooLarge:
+            status, payload = 413, {"success": False, "message": "Request body too large"}
+        else:
+            data = await self.infer(json_body, scope, body)
+            status, payload = await handler(data, user_id)
+
+        await self.send_json(send, status, payload)
+        metrics.HTTP_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+        metrics.HTTP_REQUESTS.inc(endpoint=endpoint, method=scope["method"], status=status)
+
+    async def send_json(self, send, status, payload):
+        body = self.flask_app.json.dumps(payload).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # ------------ executors ------------
+
+    def _executors(self):
+        if self._inference is None:
+            self._inference = ThreadPoolExecutor(self.inference_threads, thread_name_prefix="asgi-inference")
+            # SQLite takes one writer at a time anyway; one thread never waits on the lock
+            self._writer = ThreadPoolExecutor(1, thread_name_prefix="asgi-db-writer")
+        return self._inference, self._writer
+
+    async def infer(self, fn, *args):
+        inference, _ = self._executors()
+        return await asyncio.get_running_loop().run_in_executor(inference, _in_app_context, fn, *args)
+
+    async def save(self, rows, created_at, user_id):
+        _, writer = self._executors()
+        return await asyncio.get_running_loop().run_in_executor(
+            writer, _in_app_context, _save_predictions, rows, created_at, user_id
+        )
+
+    def shutdown(self):
+        """Finish pending writes (and the write-behind queue), stop the inference threads."""
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._inference.shutdown(wait=False)
+            self._inference = self._writer = None
+        flush_write_queue()
+
+    # ------------ endpoints (same responses as the Flask views) ------------
+
+    async def create_prediction(self, data, user_id):
+        missing = missing_api_fields(data)
+        if missing:
+            return 400, {"success": False, "message": "Missing fields: " + ", ".join(missing)}
+
+        try:
+            input_data, predicted_rent = await self.infer(_score_prediction, data)
+            created_at = datetime.now(singapore_tz)
+            (prediction_id, public_id), = await self.save([(input_data, predicted_rent)], created_at, user_id)
+            return 200, created_prediction_body(prediction_id, predicted_rent, created_at, public_id)
+
+        except (ValueError, TypeError) as e:
+            return 400, {"success": False, "message": f"Invalid input values: {e}"}
+        except TimeoutError as e:
+            return 503, {"success": False, "message": f"Prediction service busy: {e}"}
+        except Exception as e:
+            return 500, {"success": False, "message": f"Unexpected server error: {e}"}
+
+    async def create_predictions_batch(self, data, user_id):
+        items, error = api_batch_items(data)
+        if error:
+            return 400, {"success": False, "message": error}
+
+        save, error = api_batch_save(data)
+        if error:
+            return 400, {"success": False, "message": error}
+
+        try:
+            results, saved = await self.infer(_score_batch, items, save)
+            response_items = batch_response_items(results)
+
+            if saved:
+                rows = [(input_data, predicted_rent) for _, input_data, predicted_rent in saved]
+                ids = await self.save(rows, datetime.now(singapore_tz), user_id)
+                for (position, _, _), (prediction_id, public_id) in zip(saved, ids):
+                    response_items[position]["id"] = prediction_id
+                    response_items[position]["public_id"] = public_id
+
+            return 200, batch_response_body(response_items, bool(saved))
+
+        except TimeoutError as e:
+            return 503, {"success": False, "message": f"Prediction service busy: {e}"}
+        except Exception as e:
+            return 500, {"success": False, "message": f"Unexpected server error: {e}"}
+
+
+application = PredictionASGIApp(
+    app,
+    inference_threads=app.config.get("ASGI_INFERENCE_THREADS", 8),
+    max_body_bytes=app.config.get("ASGI_MAX_BODY_BYTES", 16 * 1024 * 1024),
+)
@@ -0,0 +1,147 @@
+# micro-batching: coalesce concurrent single predictions into one model call
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Collects single-row prediction requests arriving within window_ms of
+    each other (or until max_batch are waiting), scores them with one
+    call to score_fn and hands each caller its own result.
+
+    score_fn(records) must return one value per record, in order. It is
+    called from the batcher thread inside an app context.
+    """
+
+    def __init__(self, app, score_fn, window_ms=3, max_batch=64, timeout=10.0, history=1000):
+        self.app = app
+        self.score_fn = score_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.timeout = timeout
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+        # metrics
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+        self.timeouts = 0
+        self._waits = deque(maxlen=history)      # seconds queued before scoring
+        self._latencies = deque(maxlen=history)  # seconds from submit to result
+
+    def _ensure_thread(self):
+        # threads do not survive fork, so each worker process starts its own
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._thread.start()
+
+    def submit(self, record):
+        """
+        Queue one record and block until its batch has been scored.
+
+        Raises:
+            TimeoutError: If no result arrives within self.timeout seconds
+        """
+        self._ensure_thread()
+
+        future = Future()
+        submitted = time.perf_counter()
+        self._queue.put((record, future, submitted))
+
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._stats_lock:
+                self.timeouts += 1
+            raise TimeoutError(f"Prediction not scored within {self.timeout}s")
+
+        with self._stats_lock:
+            self._latencies.append(time.perf_counter() - submitted)
+        return result
+
+    def _collect(self):
+        """Block for the first request, then gather more until the window closes."""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return [item for item in batch if item[1].set_running_or_notify_cancel()]
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(batch)
+                self.max_batch_seen = max(self.max_batch_seen, len(batch))
+                self._waits.extend(started - submitted for _, _, submitted in batch)
+
+            with self.app.app_context():
+                self._score(batch)
+
+    def _score(self, batch):
+        records = [record for record, _, _ in batch]
+        try:
+            results = self.score_fn(records)
+        except Exception:
+            # One bad record must not fail its neighbours: score one by one
+            for record, future, _ in batch:
+                try:
+                    future.set_result(self.score_fn([record])[0])
+                except Exception as e:
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self):
+        with self._stats_lock:
+            waits = np.array(self._waits) * 1000.0
+            latencies = np.array(self._latencies) * 1000.0
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_batch_seen,
+                "timeouts": self.timeouts,
+                "window_ms": self.window * 1000.0,
+                "max_batch": self.max_batch,
+                "wait_ms_p50": float(np.percentile(waits, 50)) if len(waits) else None,
+                "wait_ms_max": float(waits.max()) if len(waits) else None,
+                "latency_ms_p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                "latency_ms_p99": float(np.percentile(latencies, 99)) if len(latencies) else None,
+            }
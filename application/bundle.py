@@ -0,0 +1,259 @@
+# single-file, versioned model bundle (model + preprocessors + manifest)
+import hashlib
+import io
+import json
+import os
+import stat
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import joblib
+
+BUNDLE_FORMAT = "rent-model-bundle"
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+# bundle part name -> file in the Model/ directory
+PART_FILES = {
+    "model": "final_model_compressed_v2.joblib",
+    "scaler": "scaler.pkl",
+    "encoder": "encoder.pkl",
+    "categorical_cols": "categorical_cols.pkl",
+    "continuous_cols": "continuous_cols.pkl",
+    "feature_columns": "feature_columns.pkl",
+    "furnish_map": "furnish_map.pkl",
+    "model_info": "model_info.pkl",
+}
+
+# parts big enough that a decompressed local copy is worth keeping
+CACHED_PARTS = ("model",)
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _sha256_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_bundle(model_dir, bundle_path, version=None):
+    """
+    Pack the separate files in model_dir into one bundle file.
+
+    Each part is stored byte-for-byte (the model file keeps its own
+    compression) next to a manifest holding the bundle version, a
+    SHA-256 per part and the model_info metadata.
+
+    Returns:
+        dict: The manifest written into the bundle
+    """
+    missing = [f for f in PART_FILES.values() if not os.path.exists(os.path.join(model_dir, f))]
+    if missing:
+        raise FileNotFoundError(f"Missing model files in {model_dir}: {', '.join(missing)}")
+
+    model_info = joblib.load(os.path.join(model_dir, PART_FILES["model_info"]))
+    if version is None:
+        trained = str(model_info.get("training_date", "")) or datetime.now().isoformat()
+        version = "rf-" + "".join(c if c.isalnum() else "-" for c in trained)
+
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "version": version,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "model_info": json.loads(json.dumps(model_info, default=str)),
+        "parts": {},
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(bundle_path)), exist_ok=True)
+    tmp_path = bundle_path + ".tmp"
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name, filename in PART_FILES.items():
+            with open(os.path.join(model_dir, filename), "rb") as f:
+                data = f.read()
+            arcname = f"parts/{name}.joblib"
+            zf.writestr(arcname, data)
+            manifest["parts"][name] = {
+                "file": arcname,
+                "sha256": _sha256(data),
+                "size": len(data),
+            }
+        zf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+    os.replace(tmp_path, bundle_path)
+
+    return manifest
+
+
+def read_manifest(bundle_path):
+    """Manifest of a bundle, without loading any parts."""
+    if not os.path.exists(bundle_path):
+        raise FileNotFoundError(f"Model bundle not found: {bundle_path}")
+
+    with zipfile.ZipFile(bundle_path) as zf:
+        manifest = json.loads(zf.read(MANIFEST_NAME))
+
+    if manifest.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"Not a model bundle: {bundle_path}")
+    if manifest.get("format_version", 0) > BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format version {manifest['format_version']}")
+    return manifest
+
+
+def _owned_privately(path, is_dir):
+    """
+    True if path is a real file / directory (not a symlink) owned by this
+    user that no one else can write to. Cache files are unpickled, so they
+    may only come from a place other users cannot touch.
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    if not (stat.S_ISDIR(st.st_mode) if is_dir else stat.S_ISREG(st.st_mode)):
+        return False
+    if hasattr(os, "getuid") and st.st_uid != os.getuid():
+        return False
+    return not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def private_cache_dir(path):
+    """
+    Create path with mode 0700 if it is missing.
+
+    Returns:
+        str: path, or None (and a message) if someone else could write to it
+    """
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+    except OSError as e:
+        print(f"Model cache disabled, cannot create {path}: {e}")
+        return None
+    if not _owned_privately(path, is_dir=True):
+        print(f"Model cache disabled: {path} must be a directory owned by this user, not writable by others")
+        return None
+    return path
+
+
+def _cache_path(cache_dir, manifest, name):
+    # keyed by the part's full manifest checksum: a cache entry only ever
+    # stands for the exact bytes the manifest vouches for
+    part = manifest["parts"][name]
+    return os.path.join(cache_dir, part["sha256"], f"{name}.joblib")
+
+
+def _cache_record_path(path):
+    return path + ".json"
+
+
+def _load_cached(path, part_sha256):
+    """
+    Load a decompressed cache file if it is present, private (see
+    _owned_privately) and was made from the bundle part with checksum
+    part_sha256.
+    """
+    record_path = _cache_record_path(path)
+    if not (os.path.exists(path) and os.path.exists(record_path)):
+        return None
+
+    directory = os.path.dirname(path)
+    if not all((_owned_privately(os.path.dirname(directory), is_dir=True),
+                _owned_privately(directory, is_dir=True),
+                _owned_privately(path, is_dir=False),
+                _owned_privately(record_path, is_dir=False))):
+        print(f"Ignoring model cache not private to this user: {path}")
+        return None
+
+    with open(record_path) as f:
+        record = json.load(f)
+    if record.get("part_sha256") != part_sha256 or _sha256_file(path) != record.get("sha256"):
+        print(f"Ignoring corrupt model cache: {path}")
+        return None
+
+    return joblib.load(path)
+
+
+def _write_cache(path, obj, part_sha256):
+    """Store obj uncompressed (written to a temp file, then renamed)."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        joblib.dump(obj, tmp_path, compress=0)
+        record = {"part_sha256": part_sha256, "sha256": _sha256_file(tmp_path)}
+        with open(tmp_path + ".json", "w") as f:
+            json.dump(record, f)
+        for written in (tmp_path, tmp_path + ".json"):
+            os.chmod(written, 0o600)
+        os.replace(tmp_path + ".json", _cache_record_path(path))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not write model cache {path}: {e}")
+        for leftover in (tmp_path, tmp_path + ".json"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+
+def _load_part(bundle_path, manifest, name, cache_dir):
+    part = manifest["parts"][name]
+    if cache_dir and name in CACHED_PARTS:
+        cached = _load_cached(_cache_path(cache_dir, manifest, name), part["sha256"])
+        if cached is not None:
+            return cached
+
+    with zipfile.ZipFile(bundle_path) as zf:
+        data = zf.read(part["file"])
+
+    if _sha256(data) != part["sha256"]:
+        raise ValueError(f"Checksum mismatch for bundle part '{name}' in {bundle_path}")
+
+    obj = joblib.load(io.BytesIO(data))
+
+    if cache_dir and name in CACHED_PARTS:
+        _write_cache(_cache_path(cache_dir, manifest, name), obj, part["sha256"])
+
+    return obj
+
+
+def load_bundle(bundle_path, parts=None, cache_dir=None, max_workers=4):
+    """
+    Load parts of a bundle in parallel, verifying each part's checksum.
+
+    Large parts (the model) are also written uncompressed to cache_dir the
+    first time, so later cold starts load them without decompressing.
+
+    Args:
+        bundle_path (str): Bundle file built by build_bundle
+        parts (list[str]): Part names to load (default: all)
+        cache_dir (str): Directory for the decompressed copies (None disables);
+            only used if it is private to this user (private_cache_dir)
+        max_workers (int): Parts loaded concurrently
+
+    Returns:
+        tuple: (components dict keyed by part name, manifest dict)
+    """
+    manifest = read_manifest(bundle_path)
+    if cache_dir:
+        cache_dir = private_cache_dir(cache_dir)
+    names = list(parts) if parts is not None else list(manifest["parts"])
+
+    unknown = [name for name in names if name not in manifest["parts"]]
+    if unknown:
+        raise ValueError(f"Bundle has no part(s): {', '.join(unknown)}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            name: pool.submit(_load_part, bundle_path, manifest, name, cache_dir)
+            for name in names
+        }
+        components = {name: future.result() for name, future in futures.items()}
+
+    return components, manifest
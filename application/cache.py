@@ -0,0 +1,114 @@
+# in-process LRU cache for predictions
+import threading
+import time
+from collections import OrderedDict
+
+
+def _normalize_text(value):
+    """Trim and collapse whitespace so ' Dubai  Marina ' == 'Dubai Marina'."""
+    return " ".join(str(value).split())
+
+
+def canonicalize_input(input_data, area_precision=2):
+    """
+    Canonical form of a predictor input dict: strings whitespace-normalized,
+    counts as ints and area rounded to area_precision decimal places.
+
+    Returns:
+        dict: Same keys as input_data, canonical values
+    """
+    return {
+        "Area_in_sqft": round(float(input_data["Area_in_sqft"]), area_precision),
+        "Beds": int(input_data["Beds"]),
+        "Baths": int(input_data["Baths"]),
+        "Age_of_listing_in_days": int(input_data["Age_of_listing_in_days"]),
+        "Furnishing": _normalize_text(input_data["Furnishing"]),
+        "Type": _normalize_text(input_data["Type"]),
+        "Location": _normalize_text(input_data["Location"]),
+        "City": _normalize_text(input_data["City"]),
+    }
+
+
+def cache_key(canonical):
+    """Hashable key for a canonical input dict."""
+    return (
+        canonical["Area_in_sqft"],
+        canonical["Beds"],
+        canonical["Baths"],
+        canonical["Age_of_listing_in_days"],
+        canonical["Furnishing"],
+        canonical["Type"],
+        canonical["Location"],
+        canonical["City"],
+    )
+
+
+class PredictionCache:
+    """
+    Thread-safe bounded LRU cache with a per-entry TTL.
+
+    Keeps hit / miss / eviction / expiration counters so the size and
+    TTL can be tuned against real traffic.
+    """
+
+    def __init__(self, maxsize=10000, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # bumped by clear(); stops a put() computed before a clear from landing after it
+        self.generation = 0
+
+    def get(self, key):
+        """Cached value for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, generation=None):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
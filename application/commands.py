@@ -0,0 +1,194 @@
+# flask CLI commands for preparing model artifacts and sizing the database (run with `flask <command>`)
+import click
+from sqlalchemy import func
+
+from application import app, db
+from application import predictor
+from application import datagen, queries
+from application.models import Prediction
+
+
+@app.cli.command("export-flat-model")
+@click.option("--out", "out_dir", default=None,
+              help="Output directory (default: FLAT_MODEL_DIR or Model/flat_forest)")
+@click.option("--compact", is_flag=True,
+              help="Use float32 thresholds/leaves, int16 features, int32 children")
+def export_flat_model_command(out_dir, compact):
+    """Write the forest as uncompressed node arrays for MODEL_STORAGE = "mmap"."""
+    out_dir = predictor.export_flat_model(out_dir, compact=compact)
+    click.echo(f"✓ {'Compact' if compact else 'Flat'} forest written to {out_dir}")
+
+
+@app.cli.command("compact-model-report")
+@click.option("--rows", default=5000, show_default=True,
+              help="Size of the randomized validation corpus")
+def compact_model_report_command(rows):
+    """Bytes saved by the compact forest and its max deviation in AED."""
+    report = predictor.compact_model_report(n_rows=rows)
+    click.echo(f"sklearn trees : {report['sklearn_bytes']:>14,} bytes")
+    click.echo(f"flat (64-bit) : {report['flat_bytes']:>14,} bytes")
+    click.echo(f"compact       : {report['compact_bytes']:>14,} bytes")
+    click.echo(f"saved         : {report['bytes_saved']:>14,} bytes")
+    click.echo(f"max deviation : {report['max_abs_deviation_aed']:.4f} AED "
+               f"({report['max_rel_deviation']:.2e} relative) over {rows} rows")
+
+
+@app.cli.command("build-model-bundle")
+@click.option("--out", "bundle_path", default="Model/model.bundle", show_default=True,
+              help="Bundle file to write")
+@click.option("--version", default=None,
+              help="Bundle version (default: derived from model_info training_date)")
+def build_model_bundle_command(bundle_path, version):
+    """Pack the separate Model/ files into one checksummed, versioned bundle."""
+    manifest = predictor.export_model_bundle(bundle_path, version=version)
+    click.echo(f"✓ Bundle {manifest['version']} written to {bundle_path}")
+    for name, part in manifest["parts"].items():
+        click.echo(f"  {name:<17} {part['size']:>12,} bytes  sha256 {part['sha256'][:16]}")
+
+
+@app.cli.command("dead-features")
+def dead_features_command():
+    """List features (locations, types, cities, ...) no tree ever splits on."""
+    report = predictor.dead_feature_report()
+    click.echo(f"{report['used']} of {report['total']} features are used by the forest")
+    if report["dead_continuous"]:
+        click.echo("Dead continuous features: " + ", ".join(report["dead_continuous"]))
+    for col, categories in report["dead_categories"].items():
+        click.echo(f"\nDead {col} categories ({len(categories)}):")
+        for category in categories:
+            click.echo(f"  {category}")
+
+
+@app.cli.command("build-rent-grid")
+@click.option("--out", "path", default=None,
+              help="Output file (default: RENT_GRID_FILE or Model/rent_grid.npz)")
+@click.option("--area-points", default=None, type=int, help="Area nodes (default: RENT_GRID_AREA_POINTS)")
+@click.option("--age-points", default=None, type=int, help="Age nodes (default: RENT_GRID_AGE_POINTS)")
+def build_rent_grid_command(path, area_points, age_points):
+    """Score the TOP_LOCATIONS rent grid for RENT_GRID_MODE = "file"."""
+    path, grid = predictor.export_rent_grid(path, area_points, age_points)
+    click.echo(f"✓ Rent grid ({grid.points:,} points, {grid.nbytes:,} bytes) written to {path}")
+
+
+@app.cli.command("rent-grid-report")
+@click.option("--rows", default=2000, show_default=True, help="Random in-grid inputs to compare")
+@click.option("--area-points", default=None, type=int, help="Build a grid with this many area nodes")
+@click.option("--age-points", default=None, type=int, help="Build a grid with this many age nodes")
+def rent_grid_report_command(rows, area_points, age_points):
+    """Compare grid answers with the forest, to pick a grid resolution."""
+    report = predictor.rent_grid_report(n_rows=rows, area_points=area_points, age_points=age_points)
+    click.echo(f"grid          : {report['area_points']} area x {report['age_points']} age nodes, "
+               f"{report['points']:,} points, {report['bytes']:,} bytes")
+    click.echo(f"mean deviation: {report['mean_abs_deviation_aed']:.2f} AED "
+               f"({report['mean_rel_deviation']:.2%})")
+    click.echo(f"p95 deviation : {report['p95_rel_deviation']:.2%}")
+    click.echo(f"max deviation : {report['max_abs_deviation_aed']:.2f} AED "
+               f"({report['max_rel_deviation']:.2%}) over {rows} rows")
+
+
+@app.cli.command("replay-predictions")
+@click.option("--bundle", "bundle_path", default=None,
+              help="Model bundle to replay with (default: MODEL_BUNDLE or the Model/ files)")
+@click.option("--chunk-size", default=None, type=int, help="Rows per query (default: REPLAY_CHUNK_SIZE)")
+@click.option("--limit", default=None, type=int, help="Replay at most this many stored predictions")
+def replay_predictions_command(bundle_path, chunk_size, limit):
+    """Rescore stored predictions with a model bundle and report the differences."""
+    report = predictor.replay_stored_predictions(
+        bundle_path, chunk_size=chunk_size, limit=limit,
+        progress=lambda done: click.echo(f"  {done:,} rows replayed", err=True),
+    )
+    deltas = report["deltas"]
+    click.echo(f"candidate     : {report['candidate_version']}")
+    click.echo(f"rows          : {report['rows']:,} ({report['skipped']:,} skipped)")
+    for version, count in sorted(report["stored_versions"].items()):
+        click.echo(f"  stored by {version}: {count:,}")
+    if deltas["count"]:
+        click.echo(f"mean delta    : {deltas['mean_delta_aed']:+.2f} AED ({deltas['mean_rel_delta']:+.2%})")
+        click.echo(f"p50 |delta|   : {deltas['p50_abs_delta_aed']:.2f} AED")
+        click.echo(f"p95 |delta|   : {deltas['p95_abs_delta_aed']:.2f} AED ({deltas['p95_abs_rel_delta']:.2%})")
+        click.echo(f"p99 |delta|   : {deltas['p99_abs_delta_aed']:.2f} AED")
+        click.echo(f"max |delta|   : {deltas['max_abs_delta_aed']:.2f} AED ({deltas['max_abs_rel_delta']:.2%})")
+        for bucket, count in deltas["abs_rel_buckets"].items():
+            click.echo(f"  |rel| {bucket:>7}: {count:,}")
+
+
+@app.cli.command("seed-history")
+@click.option("--predictions", default=1_000_000, show_default=True, help="Prediction rows to insert")
+@click.option("--users", default=10_000, show_default=True, help="Users to create (history is Zipf-skewed over them)")
+@click.option("--days", default=730, show_default=True, help="Spread created_at over this many past days")
+@click.option("--seed", default=0, show_default=True, help="Random seed")
+@click.option("--chunk-size", default=20_000, show_default=True, help="Rows per INSERT transaction")
+def seed_history_command(predictions, users, days, seed, chunk_size):
+    """Fill User / Prediction with synthetic history (set RESET_DB_ON_START = False to keep it)."""
+    report = datagen.generate_history(
+        predictions, users, predictor._model_dir(), days=days, seed=seed, chunk_size=chunk_size,
+        progress=lambda done: click.echo(f"  {done:,} predictions", err=True),
+    )
+    click.echo(f"✓ {report['users']:,} users and {report['predictions']:,} predictions "
+               f"inserted in {report['seconds']:.1f}s (password: {datagen.SEED_PASSWORD})")
+
+
+@app.cli.command("benchmark-history")
+@click.option("--user-rank", default=0, show_default=True,
+              help="Benchmark as the user with the n-th largest history (0 = heaviest)")
+@click.option("--user-id", default=None, type=int, help="Benchmark as this user instead")
+@click.option("--repeat", default=20, show_default=True, help="Timed runs per query")
+@click.option("--page", default=1, show_default=True, help="Page to fetch (deep pages show OFFSET cost)")
+@click.option("--pagination", type=click.Choice(["keyset", "offset"]), default="keyset", show_default=True,
+              help="Keyset cursors (as history() pages) or the old OFFSET pagination")
+@click.option("--explain", is_flag=True, help="Print each query plan")
+def benchmark_history_command(user_rank, user_id, repeat, page, pagination, explain):
+    """p50/p95/p99 of every history() filter and sort combination."""
+    if user_id is None:
+        user_id, rows = datagen.user_by_history_size(user_rank)
+        if user_id is None:
+            raise click.ClickException("No user has any predictions; run flask seed-history first")
+    else:
+        rows = db.session.scalar(db.select(func.count()).where(Prediction.user_id == user_id))
+    click.echo(f"user {user_id}: {rows:,} predictions, page {page}, {repeat} runs per query\n")
+
+    results = queries.benchmark_history(user_id, repeat=repeat, page=page, explain=explain,
+                                       pagination=pagination)
+    click.echo(f"{'query':<26} {'rows':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for result in results:
+        click.echo(f"{result['name']:<26} {result['total']:>9,} {result['p50_ms']:>9.2f} "
+                   f"{result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f}")
+        if explain:
+            for line in result["plan"]:
+                click.echo(f"    {line}")
+
+
+@app.cli.command("explain-history")
+@click.option("--user-rank", default=0, show_default=True,
+              help="Plan as the user with the n-th largest history (0 = heaviest)")
+@click.option("--user-id", default=None, type=int, help="Plan as this user instead")
+@click.option("--create-indexes", is_flag=True,
+              help="First create the Prediction indexes this database is missing")
+@click.option("--verbose", is_flag=True, help="Print every plan, not only the flagged ones")
+def explain_history_command(user_rank, user_id, create_indexes, verbose):
+    """Flag history() queries that still scan or sort the prediction table."""
+    if create_indexes:
+        for name in queries.create_missing_indexes():
+            click.echo(f"✓ Created index {name}")
+    missing = queries.missing_indexes()
+    if missing:
+        click.echo("Missing indexes (run with --create-indexes): " + ", ".join(i.name for i in missing) + "\n")
+
+    if user_id is None:
+        user_id, _ = datagen.user_by_history_size(user_rank)
+
+    # SORT after an index SEARCH (a range filter plus another sort key) only
+    # sorts the matching rows, so only full-table SCANs fail the command
+    report = queries.advise_history_indexes(user_id)
+    scans = [entry for entry in report if "scan" in entry["problems"]]
+    for entry in report:
+        status = ", ".join(entry["problems"]).upper() if entry["problems"] else "ok"
+        if entry["problems"] or verbose:
+            click.echo(f"{entry['case']:<26} {entry['statement']:<11} {status}")
+            for line in entry["plan"]:
+                click.echo(f"    {line}")
+
+    sorts = sum(bool(entry["problems"]) and "scan" not in entry["problems"] for entry in report)
+    click.echo(f"\n{len(report)} statements: {len(scans)} scan the table, {sorts} sort the matching rows")
+    if scans:
+        raise SystemExit(1)
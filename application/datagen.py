@@ -0,0 +1,153 @@
+# synthetic users + prediction history for sizing the database (flask seed-history)
+import os
+import time
+from datetime import datetime, timedelta
+
+import joblib
+import numpy as np
+from sqlalchemy import func, insert
+from werkzeug.security import generate_password_hash
+
+from application import db
+from application.forms import TOP_LOCATION_CITIES
+from application.models import Prediction, User
+
+# share of listings per city (the rest is split evenly over the others)
+CITY_WEIGHTS = {"Dubai": 0.55, "Abu Dhabi": 0.2, "Sharjah": 0.12}
+
+# rough AED/sqft/year by city, for believable predicted_rent values
+CITY_RENT_PER_SQFT = {"Dubai": 110.0, "Abu Dhabi": 90.0, "Sharjah": 45.0}
+DEFAULT_RENT_PER_SQFT = 55.0
+
+TYPES = {"Apartment": 0.7, "Villa": 0.15, "Townhouse": 0.1, "Penthouse": 0.05}
+
+SEED_PASSWORD = "password123"
+
+
+def vocabulary(model_dir):
+    """Locations, cities and property types the fitted encoder knows."""
+    encoder = joblib.load(os.path.join(model_dir, "encoder.pkl"))
+    types, locations, cities = (list(c) for c in encoder.categories_)
+    return types, locations, cities
+
+
+def _zipf_weights(n, s=1.1):
+    weights = 1.0 / np.arange(1, n + 1) ** s
+    return weights / weights.sum()
+
+
+def _city_weights(cities):
+    rest = (1.0 - sum(CITY_WEIGHTS.get(c, 0.0) for c in cities)) / max(1, sum(c not in CITY_WEIGHTS for c in cities))
+    weights = np.array([CITY_WEIGHTS.get(c, rest) for c in cities])
+    return weights / weights.sum()
+
+
+def generate_history(n_predictions, n_users, model_dir, days=730, anonymous_share=0.05,
+                     seed=0, chunk_size=20000, progress=None):
+    """
+    Insert n_users users and n_predictions predictions shaped like real use.
+
+    - A few power users own most of the history (Zipf over users)
+    - A few locations get most listings (Zipf over the encoder's
+      locations); each location belongs to one city, with Dubai most common
+    - created_at is spread over the last `days` days, denser recently
+    - area / beds / baths / age / rent are correlated like real listings
+
+    Users all get the password SEED_PASSWORD (hashed once). Rows are
+    inserted chunk_size at a time with executemany.
+
+    Returns:
+        dict: users, predictions and seconds taken
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    types, locations, cities = vocabulary(model_dir)
+    types = [t for t in TYPES if t in types] or types
+    type_weights = np.array([TYPES.get(t, 1.0) for t in types])
+    type_weights /= type_weights.sum()
+
+    # ---------- users ----------
+    first_user = (db.session.scalar(db.select(func.max(User.id))) or 0) + 1
+    password_hash = generate_password_hash(SEED_PASSWORD)
+    for offset in range(0, n_users, chunk_size):
+        db.session.execute(insert(User), [
+            {"username": f"seed{first_user + i}", "email": f"seed{first_user + i}@gmail.com",
+             "password_hash": password_hash}
+            for i in range(offset, min(n_users, offset + chunk_size))
+        ])
+    db.session.commit()
+    user_ids = np.arange(first_user, first_user + n_users)
+    user_weights = _zipf_weights(n_users) if n_users else None
+
+    # ---------- locations -> city (skewed) ----------
+    location_order = rng.permutation(len(locations))
+    location_names = [locations[i] for i in location_order]
+    location_weights = _zipf_weights(len(location_names))
+    city_weights = _city_weights(cities)
+    city_of_location = np.array([
+        TOP_LOCATION_CITIES.get(name) or cities[rng.choice(len(cities), p=city_weights)]
+        for name in location_names
+    ], dtype=object)
+    rent_per_sqft = np.array([CITY_RENT_PER_SQFT.get(c, DEFAULT_RENT_PER_SQFT) for c in city_of_location])
+
+    now = datetime.now()
+    inserted = 0
+    while inserted < n_predictions:
+        n = min(chunk_size, n_predictions - inserted)
+
+        loc = rng.choice(len(location_names), size=n, p=location_weights)
+        type_index = rng.choice(len(types), size=n, p=type_weights)
+        beds = np.clip(rng.poisson(1.6, n), 0, 7)
+        baths = np.clip(beds + rng.integers(-1, 2, n), 1, 8)
+        area = np.round(np.exp(rng.normal(6.4 + 0.28 * beds, 0.25)), 1)
+        age = np.minimum(rng.exponential(40, n), 365).astype(int)
+        furnished = rng.random(n) < 0.35
+        rent = area * rent_per_sqft[loc] * np.exp(rng.normal(0, 0.15, n)) * np.where(furnished, 1.1, 1.0)
+        # recent days are busier: squared uniform puts more mass near 0 days ago
+        seconds_ago = (rng.random(n) ** 2) * days * 86400
+        if n_users:
+            owners = rng.choice(user_ids, size=n, p=user_weights)
+            anonymous = rng.random(n) < anonymous_share
+        else:
+            owners = np.zeros(n, dtype=int)
+            anonymous = np.ones(n, dtype=bool)
+
+        db.session.execute(insert(Prediction), [
+            {
+                "area": float(area[i]),
+                "bedrooms": int(beds[i]),
+                "bathrooms": int(baths[i]),
+                "furnishing": "Furnished" if furnished[i] else "Unfurnished",
+                "age_of_listing": int(age[i]),
+                "property_type": types[type_index[i]],
+                "city": city_of_location[loc[i]],
+                "location": location_names[loc[i]],
+                "predicted_rent": float(round(rent[i], 2)),
+                "model_version": "synthetic",
+                "created_at": now - timedelta(seconds=float(seconds_ago[i])),
+                "user_id": None if anonymous[i] else int(owners[i]),
+            }
+            for i in range(n)
+        ])
+        db.session.commit()
+        inserted += n
+        if progress is not None:
+            progress(inserted)
+
+    return {"users": n_users, "predictions": n_predictions, "seconds": time.perf_counter() - started}
+
+
+def user_by_history_size(rank=0):
+    """
+    (user_id, rows) of the user with the rank-th largest history
+    (0 = the heaviest user), for picking who to benchmark as.
+    """
+    row = db.session.execute(
+        db.select(Prediction.user_id, func.count().label("rows"))
+        .where(Prediction.user_id.is_not(None))
+        .group_by(Prediction.user_id)
+        .order_by(func.count().desc())
+        .offset(rank)
+        .limit(1)
+    ).first()
+    return (row.user_id, row.rows) if row else (None, 0)
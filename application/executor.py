@@ -0,0 +1,228 @@
+# process-pool inference backend, so scoring is not serialized on one GIL
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ALL_COMPLETED, ProcessPoolExecutor
+from concurrent.futures import wait as wait_futures
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from threadpoolctl import threadpool_limits
+
+# env vars read by BLAS / OpenMP runtimes that start after the limit is set
+_THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+def _init_worker(threads):
+    """
+    Runs once in every pool process: cap native thread pools so N workers
+    don't each spin up one thread per core, then make sure the model is
+    loaded. Workers are forked, so a model the parent already loaded (or
+    memory-mapped) is shared rather than loaded again.
+    """
+    for name in _THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    threadpool_limits(limits=threads)
+
+    from application import app
+    from application import predictor
+
+    # the web process watches the model files and restarts the pool
+    if predictor._watcher is not None:
+        predictor._watcher.stop()
+
+    with app.app_context():
+        predictor.load_model_components()
+        # parallelism comes from the pool, not threads inside each worker
+        # (this process's copy of the version only)
+        predictor.current_version().parallel = None
+
+
+def _score_in_worker(records):
+    from application import app
+    from application import predictor
+
+    with app.app_context():
+        return predictor._score_aed_inline(records)
+
+
+class ProcessInferenceExecutor:
+    """
+    Runs predictions in a pool of forked worker processes.
+
+    At most max_in_flight requests are queued or running at once; callers
+    beyond that wait (up to task_timeout) for a free slot. Each request
+    must finish within task_timeout seconds.
+
+    Concurrent requests run on different workers. A batch of more than
+    chunk_rows records is also split into chunks of at least chunk_rows
+    (at most one per worker), scored in parallel; a smaller one runs as a
+    single task. chunk_rows = 0 never splits.
+    """
+
+    def __init__(self, max_workers=None, max_in_flight=64, task_timeout=10.0, threads_per_worker=1,
+                 chunk_rows=256):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight
+        self.task_timeout = task_timeout
+        self.threads_per_worker = threads_per_worker
+        self.chunk_rows = chunk_rows
+
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._slots = threading.Condition()
+        self._in_flight = 0    # requests holding a slot (under self._slots)
+
+        self.submitted = 0
+        self.completed = 0
+        self.chunks = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.restarts = 0
+
+    def _get_pool(self):
+        with self._lock:
+            # a pool created before a gunicorn fork belongs to the parent
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("fork"),
+                    initializer=_init_worker,
+                    initargs=(self.threads_per_worker,),
+                )
+                self._pid = os.getpid()
+            return self._pool
+
+    def restart(self):
+        """
+        Fork fresh workers on next use, e.g. after a new model version was
+        published. The old workers finish the tasks they already have.
+        """
+        with self._lock:
+            pool, self._pool = self._pool, None
+            owned = self._pid == os.getpid()
+        if pool is not None and owned:
+            pool.shutdown(wait=False)
+
+    def _reset_pool(self, pool):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+                self.restarts += 1
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _acquire_slot(self):
+        deadline = time.monotonic() + self.task_timeout
+        with self._slots:
+            while self._in_flight >= self.max_in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += 1
+                    return False
+                self._slots.wait(remaining)
+            self._in_flight += 1
+            return True
+
+    def _release_slot(self):
+        with self._slots:
+            self._in_flight -= 1
+            self._slots.notify()
+
+    def _release_when_done(self, futures):
+        # a chunk that could not be cancelled still occupies a worker
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def chunk_done(_):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._release_slot()
+
+        for future in futures:
+            future.add_done_callback(chunk_done)
+
+    def _chunks(self, records):
+        """records split into at most max_workers chunks of at least chunk_rows."""
+        if not self.chunk_rows or len(records) <= self.chunk_rows or self.max_workers < 2:
+            return [records]
+        n = min(self.max_workers, len(records) // self.chunk_rows)
+        size = -(-len(records) // n)
+        return [records[i:i + size] for i in range(0, len(records), size)]
+
+    def score(self, records):
+        """
+        Predictions in AED for records, computed in worker processes.
+
+        Raises:
+            TimeoutError: If no slot frees up within task_timeout (pool
+                overloaded) or the request does not finish within task_timeout
+        """
+        if not self._acquire_slot():
+            raise TimeoutError(
+                f"Inference backend overloaded ({self.max_in_flight} requests in flight)"
+            )
+
+        chunks = self._chunks(list(records))
+        pool = self._get_pool()
+        futures = []
+        try:
+            for chunk in chunks:
+                futures.append(pool.submit(_score_in_worker, chunk))
+        except BrokenProcessPool:
+            for future in futures:
+                future.cancel()
+            self._release_slot()
+            self._reset_pool(pool)
+            raise
+        self.submitted += 1
+        self.chunks += len(futures)
+
+        _, not_done = wait_futures(futures, timeout=self.task_timeout, return_when=ALL_COMPLETED)
+        if not_done:
+            self.timeouts += 1
+            for future in not_done:
+                future.cancel()
+            self._release_when_done(not_done)
+            raise TimeoutError(f"Prediction not finished within {self.task_timeout}s")
+        self._release_slot()
+
+        try:
+            result = [p for future in futures for p in future.result()]
+        except BrokenProcessPool:
+            # a worker died (e.g. OOM-killed); start a fresh pool next time
+            self._reset_pool(pool)
+            raise
+
+        self.completed += 1
+        return result
+
+    def stats(self):
+        with self._slots:
+            in_flight = self._in_flight
+        return {
+            "workers": self.max_workers,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": in_flight,
+            "chunk_rows": self.chunk_rows,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "chunks": self.chunks,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.shutdown(wait=True)
+            self._pool = None
@@ -0,0 +1,224 @@
+# array-backed inference for the fitted RandomForestRegressor
+import json
+import os
+
+import numpy as np
+
+# node tables written by FlatForest.save, one uncompressed .npy file each
+ARRAY_NAMES = ("feature", "threshold", "left", "right", "value", "roots")
+META_FILE = "flat_forest.json"
+
+
+class FlatForest:
+    """
+    All trees of a fitted forest flattened into contiguous node tables.
+
+    Node i of the forest has feature[i], threshold[i], left[i], right[i]
+    and value[i]. Leaves point to themselves, so traversal is a fixed
+    number of vectorized steps over every (row, tree) pair at once,
+    with no per-estimator Python calls.
+
+    Rows are compared as float32 against float64 thresholds, the same
+    way sklearn's tree code does, so each tree lands on the same leaf.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.n_trees = len(roots)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """
+        Flatten a fitted RandomForestRegressor (single output).
+        """
+        trees = [est.tree_ for est in model.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("FlatForest only supports single-output regressors")
+
+        sizes = [tree.node_count for tree in trees]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        n_nodes = int(sum(sizes))
+
+        feature = np.empty(n_nodes, dtype=np.int64)
+        threshold = np.empty(n_nodes, dtype=np.float64)
+        left = np.empty(n_nodes, dtype=np.int64)
+        right = np.empty(n_nodes, dtype=np.int64)
+        value = np.empty(n_nodes, dtype=np.float64)
+
+        for tree, offset, size in zip(trees, offsets, sizes):
+            nodes = np.arange(offset, offset + size)
+            is_leaf = tree.children_left == -1
+
+            feature[nodes] = np.where(is_leaf, 0, tree.feature)
+            threshold[nodes] = np.where(is_leaf, 0.0, tree.threshold)
+            left[nodes] = np.where(is_leaf, nodes, tree.children_left + offset)
+            right[nodes] = np.where(is_leaf, nodes, tree.children_right + offset)
+            value[nodes] = tree.value[:, 0, 0]
+
+        return cls(
+            feature=feature,
+            threshold=threshold,
+            left=left,
+            right=right,
+            value=value,
+            roots=offsets,
+            max_depth=max(tree.max_depth for tree in trees),
+            n_features=model.n_features_in_,
+        )
+
+    def compact(self):
+        """
+        Inference-only copy with narrow dtypes: int16 feature indices,
+        int32 child pointers and float32 thresholds and leaf values.
+
+        Each threshold is rounded *down* to the nearest float32, which is
+        lossless here: rows are float32, and for any float32 x,
+        x <= t exactly when x <= (largest float32 <= t). Only the float32
+        leaf values change predictions.
+        """
+        if self.n_features > np.iinfo(np.int16).max:
+            raise ValueError("Too many features for int16 indices")
+        if len(self.value) > np.iinfo(np.int32).max:
+            raise ValueError("Too many nodes for int32 child pointers")
+
+        threshold = self.threshold.astype(np.float32)
+        rounded_up = threshold.astype(np.float64) > self.threshold
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+
+        return FlatForest(
+            feature=self.feature.astype(np.int16),
+            threshold=threshold,
+            left=self.left.astype(np.int32),
+            right=self.right.astype(np.int32),
+            value=self.value.astype(np.float32),
+            roots=self.roots.astype(np.int32),
+            max_depth=self.max_depth,
+            n_features=self.n_features,
+        )
+
+    def used_features(self):
+        """Sorted indices of the features any internal node splits on."""
+        internal = self.left != np.arange(len(self.left))
+        return np.unique(self.feature[internal]).astype(np.intp)
+
+    def prune_features(self, used=None):
+        """
+        Copy of the forest that reads only the used features.
+
+        Feature indices are remapped so that column k of the input is the
+        k-th used feature, i.e. rows should be built as X_full[:, used].
+
+        Returns:
+            tuple: (pruned FlatForest, used feature indices)
+        """
+        used = self.used_features() if used is None else np.asarray(used, dtype=np.intp)
+        internal = self.left != np.arange(len(self.left))
+
+        feature = np.zeros_like(self.feature)
+        feature[internal] = np.searchsorted(used, self.feature[internal])
+
+        pruned = FlatForest(
+            feature=feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            roots=self.roots,
+            max_depth=self.max_depth,
+            n_features=len(used),
+        )
+        return pruned, used
+
+    @property
+    def nbytes(self):
+        """Bytes held by the node tables."""
+        return int(sum(getattr(self, name).nbytes for name in ARRAY_NAMES))
+
+    def save(self, directory):
+        """
+        Write the node tables as uncompressed .npy files plus a small JSON
+        header. The layout can be memory-mapped straight back by load().
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+
+        meta = {
+            "format": "flat-forest",
+            "version": 1,
+            "max_depth": self.max_depth,
+            "n_features": self.n_features,
+            "n_trees": self.n_trees,
+            "n_nodes": int(len(self.value)),
+            "dtypes": {name: str(getattr(self, name).dtype) for name in ARRAY_NAMES},
+        }
+        with open(os.path.join(directory, META_FILE), "w") as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """
+        Load a forest written by save(). With mmap_mode="r" the node tables
+        stay in the page cache and are shared by every process mapping them.
+        """
+        meta_path = os.path.join(directory, META_FILE)
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"Flat forest not found: {meta_path}")
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in ARRAY_NAMES
+        }
+        return cls(max_depth=meta["max_depth"], n_features=meta["n_features"], **arrays)
+
+    def leaves(self, X):
+        """
+        Leaf node index reached by every row in every tree.
+
+        Returns:
+            np.ndarray: Shape (n_rows, n_trees)
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(
+                f"X has shape {X.shape}, expected (n, {self.n_features})"
+            )
+
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_trees)).copy()
+
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            next_nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+            if np.array_equal(next_nodes, nodes):
+                break  # every row is already at a leaf in every tree
+            nodes = next_nodes
+
+        return nodes
+
+    def predict(self, X):
+        """Mean leaf value over all trees, like RandomForestRegressor.predict."""
+        return self.value[self.leaves(X)].sum(axis=1, dtype=np.float64) / self.n_trees
+
+    @staticmethod
+    def sklearn_nbytes(model):
+        """Bytes held by the fitted trees of a sklearn forest (nodes + values)."""
+        total = 0
+        for est in model.estimators_:
+            state = est.tree_.__getstate__()
+            total += state["nodes"].nbytes + state["values"].nbytes
+        return int(total)
+
+    def max_deviation(self, X, expected):
+        """Largest absolute difference from reference predictions on X."""
+        return float(np.max(np.abs(self.predict(X) - np.asarray(expected))))
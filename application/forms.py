@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
 from wtforms import FloatField, IntegerField, SelectField, StringField, SubmitField
-from wtforms.validators import DataRequired, NumberRange
+from wtforms.validators import DataRequired, NumberRange, ValidationError
 import os
 import pandas as pd
 
@@ -23,9 +23,34 @@ TOP_LOCATIONS = [
 
 ]
 
+# city each of the TOP_LOCATIONS belongs to
+TOP_LOCATION_CITIES = {
+    "Al Reem Island": "Abu Dhabi",
+    "Jumeirah Village Circle (JVC)": "Dubai",
+    "Downtown Dubai": "Dubai",
+    "Khalifa City": "Abu Dhabi",
+    "Dubai Marina": "Dubai",
+    "Mohammed Bin Zayed City": "Abu Dhabi",
+    "Business Bay": "Dubai",
+    "Muwailih Commercial": "Sharjah",
+    "Al Raha Beach": "Abu Dhabi",
+    "Dubai Creek Harbour": "Dubai",
+    "Meydan City": "Dubai",
+    "Palm Jumeirah": "Dubai",
+    "Muwailih": "Sharjah",
+    "Yas Island": "Abu Dhabi",
+    "Dubai Hills Estate": "Dubai",
+}
+
 def get_location_choices():
+    """Every location the model knows, for the form's datalist."""
+    # imported here: predictor imports this module
+    from application.predictor import location_index
 
-    return sorted(TOP_LOCATIONS)
+    try:
+        return location_index().names
+    except Exception:
+        return sorted(TOP_LOCATIONS)
 
 
 class PredictionForm(FlaskForm):
@@ -102,4 +127,13 @@ class PredictionForm(FlaskForm):
         validators=[DataRequired()]
     )
 
-    submit = SubmitField("Predict Rent")
\ No newline at end of file
+    submit = SubmitField("Predict Rent")
+
+    def validate_location(self, field):
+        """Replace the typed location with the model's spelling of it."""
+        from application.predictor import canonical_location
+
+        try:
+            field.data = canonical_location(field.data)
+        except ValueError:
+            raise ValidationError("Unknown location - pick one from the suggestions")
\ No newline at end of file
@@ -0,0 +1,114 @@
+# the model's location vocabulary: autocomplete (GET /api/locations) and
+# mapping typed names onto the exact spelling the encoder was fitted on
+import hashlib
+import re
+from bisect import bisect_left
+
+# "Jumeirah Lake Towers (JLT)" is also found as "JLT" and "Jumeirah Lake Towers"
+_PARENTHESES = re.compile(r"\s*\(([^)]*)\)\s*")
+
+
+def normalize_location(text):
+    """Case- and whitespace-insensitive form: ' dubai  MARINA ' -> 'dubai marina'."""
+    return " ".join(str(text).casefold().split())
+
+
+def _aliases(name):
+    aliases = {normalize_location(name)}
+    inner = _PARENTHESES.findall(name)
+    if inner:
+        aliases.add(normalize_location(_PARENTHESES.sub(" ", name)))
+        aliases.update(normalize_location(text) for text in inner)
+    aliases.discard("")
+    return aliases
+
+
+class LocationIndex:
+    """
+    Prefix index over the locations a model knows.
+
+    Every word of every name is a key ("marina" finds "Dubai Marina"),
+    kept in one sorted list, so a prefix is a binary search plus a walk
+    over its matches. canonical() is a dict lookup.
+
+    Args:
+        locations (list): Location names as the encoder knows them
+        city_of (dict): location -> city, for the ones whose city is known
+    """
+
+    def __init__(self, locations, city_of=None):
+        self.names = sorted(set(locations), key=lambda name: (normalize_location(name), name))
+        known = set(self.names)
+        self.city_of = {name: city for name, city in (city_of or {}).items() if name in known}
+
+        # alias -> name; an alias two names share is left out (not unambiguous)
+        canonical = {}
+        for name in self.names:
+            for alias in _aliases(name):
+                canonical[alias] = name if canonical.get(alias, name) == name else None
+        self._canonical = {alias: name for alias, name in canonical.items() if name is not None}
+
+        # (key, position in names, whether key is the start of the name), sorted by key
+        entries = []
+        for position, name in enumerate(self.names):
+            words = normalize_location(name.replace("(", " ").replace(")", " ")).split(" ")
+            for start in range(len(words)):
+                entries.append((" ".join(words[start:]), position, start == 0))
+        entries.sort()
+        self._keys = [key for key, _, _ in entries]
+        self._entries = [(position, whole) for _, position, whole in entries]
+
+        digest = hashlib.sha1()
+        for name in self.names:
+            digest.update(f"{name}\t{self.city_of.get(name, '')}\n".encode("utf-8"))
+        self.etag = digest.hexdigest()[:16]
+
+    @classmethod
+    def from_encoder(cls, encoder, categorical_cols, city_of=None):
+        """The index of the Location categories of a fitted OneHotEncoder."""
+        locations = encoder.categories_[list(categorical_cols).index("Location")]
+        return cls([str(name) for name in locations], city_of)
+
+    def __len__(self):
+        return len(self.names)
+
+    def canonical(self, text):
+        """The known name text refers to (any case / spacing, or an alias), or None."""
+        return self._canonical.get(normalize_location(text))
+
+    def _in_city(self, name, city):
+        # a location whose city is unknown could be in any city
+        known = self.city_of.get(name)
+        return known is None or known == city
+
+    def complete(self, prefix, city=None, limit=10):
+        """
+        Up to limit names with a word starting with prefix, names that
+        start with it first, each group alphabetical. With city, names
+        known to be elsewhere are left out and those known to be in it
+        come first.
+
+        Returns:
+            list: Location names
+        """
+        prefix = normalize_location(prefix)
+        # position in names -> whether the name itself starts with prefix
+        if not prefix:
+            matches = dict.fromkeys(range(len(self.names)), True)
+        else:
+            matches = {}
+            i = bisect_left(self._keys, prefix)
+            while i < len(self._keys) and self._keys[i].startswith(prefix):
+                position, whole = self._entries[i]
+                matches[position] = matches.get(position, False) or whole
+                i += 1
+
+        ranked = []
+        for position, whole in matches.items():
+            name = self.names[position]
+            if city and not self._in_city(name, city):
+                continue
+            unknown_city = bool(city) and name not in self.city_of
+            ranked.append((unknown_city, not whole, position))
+        ranked.sort()
+        return [self.names[position] for _, _, position in ranked[:limit]]
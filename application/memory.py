@@ -0,0 +1,84 @@
+# per-process memory usage, to check that mmap'd model files are shared
+import os
+
+# fields of /proc/<pid>/smaps_rollup reported by memory_report (values in kB)
+_ROLLUP_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+}
+
+
+def _parse_kb_fields(lines):
+    values = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].rstrip(":") in _ROLLUP_FIELDS:
+            values[_ROLLUP_FIELDS[parts[0].rstrip(":")]] = int(parts[1]) * 1024
+    return values
+
+
+def memory_report(mapped_dir=None):
+    """
+    Resident vs shared memory of this process, in bytes.
+
+    Reads /proc/self/smaps_rollup (Linux only). If mapped_dir is given,
+    also sums the mappings of files under it, so you can see how much of
+    the model is resident and how much of that is shared with other
+    workers.
+
+    Returns:
+        dict: pid, rss, pss, shared_*, private_* and optionally
+            "mapped_files"; "available": False where /proc is missing
+    """
+    report = {"pid": os.getpid(), "available": False}
+
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            report.update(_parse_kb_fields(f))
+        report["available"] = True
+    except OSError:
+        return report
+
+    report["shared"] = report.get("shared_clean", 0) + report.get("shared_dirty", 0)
+    report["private"] = report.get("private_clean", 0) + report.get("private_dirty", 0)
+
+    if mapped_dir:
+        report["mapped_files"] = _mapped_files_report(os.path.realpath(mapped_dir))
+
+    return report
+
+
+def _mapped_files_report(directory):
+    """Rss / shared / private of every mapping whose file lives under directory."""
+    totals = {"rss": 0, "pss": 0, "shared": 0, "private": 0, "files": 0}
+    seen = set()
+    in_target = False
+
+    try:
+        with open("/proc/self/smaps") as f:
+            for line in f:
+                parts = line.split()
+                # mapping header: "start-end perms offset dev inode path"
+                if parts and "-" in parts[0] and len(parts) >= 5 and not parts[0].endswith(":"):
+                    path = parts[5] if len(parts) >= 6 else ""
+                    in_target = path.startswith(directory + os.sep)
+                    if in_target:
+                        seen.add(path)
+                    continue
+
+                if in_target:
+                    values = _parse_kb_fields([line])
+                    for key, value in values.items():
+                        if key in ("rss", "pss"):
+                            totals[key] += value
+                        else:
+                            totals[key.split("_")[0]] += value
+    except OSError:
+        return None
+
+    totals["files"] = len(seen)
+    return totals
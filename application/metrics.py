@@ -0,0 +1,432 @@
+# request / stage / model-load metrics in the Prometheus text format
+#
+# Every process (gunicorn worker, inference pool worker) counts in memory.
+# With METRICS_DIR set, each one also writes its counts to
+# METRICS_DIR/metrics-<pid>.json every METRICS_FLUSH_INTERVAL seconds, and
+# /metrics adds up the files of all processes, so any worker can answer it.
+# The counts of a process that has exited are moved into
+# METRICS_DIR/metrics-archived.json, so the totals never go down.
+import bisect
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import fcntl
+except ImportError:  # Windows: no forking workers sharing a METRICS_DIR
+    fcntl = None
+
+# seconds; covers a cached answer (~50us) up to a slow batch
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# rows per write-behind commit
+ROW_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+MODEL_LOAD_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not _enabled:
+            return
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def reset(self):
+        # only in a freshly forked child, where the lock may have been held
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """A value that goes up and down; the processes' values are added up."""
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        if not _enabled:
+            return
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [per-bucket counts (last = +Inf), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        if _enabled:
+            self._observe(tuple(str(labels[name]) for name in self.labelnames), value)
+
+    def _observe(self, key, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def time(self, **labels):
+        """Context manager observing the seconds spent in its block."""
+        if not _enabled:
+            return nullcontext()
+        return _Timer(self, tuple(str(labels[name]) for name in self.labelnames))
+
+    def reset(self):
+        # only in a freshly forked child, where the lock may have been held
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), list(counts), total] for key, (counts, total) in self._values.items()]
+
+
+class _Timer:
+    __slots__ = ("histogram", "key", "start")
+
+    def __init__(self, histogram, key):
+        self.histogram = histogram
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram._observe(self.key, time.perf_counter() - self.start)
+        return False
+
+
+_metrics = []
+
+
+def counter(name, help, labelnames=()):
+    metric = Counter(name, help, labelnames)
+    _metrics.append(metric)
+    return metric
+
+
+def gauge(name, help, labelnames=()):
+    metric = Gauge(name, help, labelnames)
+    _metrics.append(metric)
+    return metric
+
+
+def histogram(name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+    metric = Histogram(name, help, labelnames, buckets)
+    _metrics.append(metric)
+    return metric
+
+
+# -------- the metrics themselves --------
+
+HTTP_REQUESTS = counter(
+    "rent_http_requests_total", "HTTP requests by endpoint, method and status", ["endpoint", "method", "status"])
+HTTP_SECONDS = histogram(
+    "rent_http_request_seconds", "Time to handle a request, by endpoint", ["endpoint"])
+STAGE_SECONDS = histogram(
+    "rent_prediction_stage_seconds", "Time spent in each stage of a prediction", ["stage"])
+PREDICTIONS = counter(
+    "rent_predictions_total", "Single predictions by where the answer came from (cache, grid, model)", ["source"])
+PREDICTION_ERRORS = counter(
+    "rent_prediction_errors_total", "Failed predictions by exception type", ["error"])
+MODEL_LOADS = counter(
+    "rent_model_loads_total", "Model version loads by result", ["result"])
+MODEL_LOAD_SECONDS = histogram(
+    "rent_model_load_seconds", "Time to load a model version", buckets=MODEL_LOAD_BUCKETS)
+WRITE_QUEUE_DEPTH = gauge(
+    "rent_write_queue_depth", "Prediction rows waiting in the write-behind queue")
+WRITE_ROWS = counter(
+    "rent_write_rows_total", "Write-behind prediction rows by result (queued, written, failed, rejected)", ["result"])
+WRITE_BATCH_ROWS = histogram(
+    "rent_write_batch_rows", "Rows written per write-behind commit", buckets=ROW_BUCKETS)
+
+
+def stage(name):
+    """Timer for one prediction stage: with metrics.stage("encode"): ..."""
+    return STAGE_SECONDS.time(stage=name)
+
+
+# -------- per-process snapshots, aggregated across workers --------
+
+_enabled = True
+_directory = None
+_interval = 5.0
+_flusher = None
+_flusher_pid = None
+
+
+def configure(app):
+    """
+    Read METRICS_ENABLED / METRICS_DIR / METRICS_FLUSH_INTERVAL, archive
+    the snapshot files of processes that no longer exist (an earlier run)
+    and start this process's flush thread.
+    """
+    global _enabled, _directory, _interval
+
+    _enabled = app.config.get("METRICS_ENABLED", True)
+    _directory = app.config.get("METRICS_DIR", "") or None
+    _interval = app.config.get("METRICS_FLUSH_INTERVAL", 5.0)
+
+    if _enabled and _directory:
+        os.makedirs(_directory, exist_ok=True)
+        with _directory_lock():
+            _archive([path for path in _snapshot_files() if _exited(path, time.time())])
+        _start_flusher()
+
+
+# counters and histograms of processes that have exited, added up
+ARCHIVE_NAME = "metrics-archived.json"
+
+
+def _snapshot_files():
+    return [path for path in glob.glob(os.path.join(_directory, "metrics-*.json"))
+            if os.path.basename(path) != ARCHIVE_NAME]
+
+
+def _pid_of(path):
+    try:
+        return int(os.path.basename(path)[len("metrics-"):-len(".json")])
+    except ValueError:
+        return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def snapshot():
+    """This process's counts, in a JSON-serializable form."""
+    return {metric.name: metric.snapshot() for metric in _metrics}
+
+
+def _write_json(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=_directory, prefix=".metrics-", suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def write_snapshot():
+    """Atomically replace this process's snapshot file."""
+    if not (_enabled and _directory):
+        return
+    _write_json(os.path.join(_directory, f"metrics-{os.getpid()}.json"), snapshot())
+
+
+def _start_flusher():
+    # threads do not survive fork, so each process flushes its own file
+    global _flusher, _flusher_pid
+    if _flusher is not None and _flusher_pid == os.getpid() and _flusher.is_alive():
+        return
+    _flusher_pid = os.getpid()
+    _flusher = threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True)
+    _flusher.start()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(_interval)
+        try:
+            write_snapshot()
+        except OSError as e:
+            print(f"Could not write metrics snapshot: {e}")
+
+
+def _after_fork_in_child():
+    """A forked worker starts from zero; the parent still reports its own counts."""
+    for metric in _metrics:
+        metric.reset()
+    if _enabled and _directory:
+        _start_flusher()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+# a live process rewrites its file every _interval; one this many intervals old is left over
+STALE_INTERVALS = 3
+
+
+def _exited(path, now):
+    """
+    True for the file of a process that has exited, or that has not been
+    rewritten for STALE_INTERVALS flushes (e.g. its pid now belongs to an
+    unrelated process).
+    """
+    pid = _pid_of(path)
+    if pid is None or pid == os.getpid():
+        return False
+    try:
+        return not _pid_alive(pid) or now - os.path.getmtime(path) > STALE_INTERVALS * _interval
+    except OSError:
+        return False  # archived by another worker in the meantime
+
+
+@contextmanager
+def _directory_lock():
+    """Serializes archiving and reading, so a scrape never counts a file twice (or not at all)."""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(_directory, ".metrics.lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read_snapshot(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _as_snapshot(merged):
+    """_merge() output back in the snapshot format."""
+    snap = {}
+    for metric in _metrics:
+        values = merged[metric.name].items()
+        if metric.kind == "histogram":
+            snap[metric.name] = [[list(key), list(counts), total] for key, (counts, total) in values]
+        else:
+            snap[metric.name] = [[list(key), value] for key, value in values]
+    return snap
+
+
+def _archive(paths):
+    """
+    Add the counters and histograms of exited processes' files to the
+    archive, so the totals /metrics reports never go down when a worker
+    goes away, and delete the files. Their gauges are dropped: a dead
+    process has no queue depth. Call with _directory_lock() held.
+    """
+    if not paths:
+        return
+    archive_path = os.path.join(_directory, ARCHIVE_NAME)
+    snapshots = [_read_snapshot(archive_path) or {}]
+    snapshots.extend(snap for snap in map(_read_snapshot, paths) if snap is not None)
+
+    archived = _as_snapshot(_merge(snapshots))
+    for metric in _metrics:
+        if metric.kind == "gauge":
+            archived[metric.name] = []
+    _write_json(archive_path, archived)
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def collect():
+    """
+    Snapshots of every live process plus the archive of exited ones
+    (gunicorn restarts, max_requests), read from METRICS_DIR after writing
+    this process's own; just this process when there is no METRICS_DIR.
+    """
+    if not (_enabled and _directory):
+        return [snapshot()]
+
+    write_snapshot()
+    now = time.time()
+    with _directory_lock():
+        _archive([path for path in _snapshot_files() if _exited(path, now)])
+        snapshots = [snap for snap in map(_read_snapshot, _snapshot_files()) if snap is not None]
+        archived = _read_snapshot(os.path.join(_directory, ARCHIVE_NAME))
+        if archived is not None:
+            snapshots.append(archived)
+    return snapshots
+
+
+def _merge(snapshots):
+    merged = {metric.name: {} for metric in _metrics}
+    for snap in snapshots:
+        for metric in _metrics:
+            values = merged[metric.name]
+            for entry in snap.get(metric.name, []):
+                key = tuple(entry[0])
+                if metric.kind != "histogram":
+                    values[key] = values.get(key, 0) + entry[1]
+                else:
+                    counts, total = values.get(key, ([0] * (len(metric.buckets) + 1), 0.0))
+                    values[key] = ([a + b for a, b in zip(counts, entry[1])], total + entry[2])
+    return merged
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshots=None):
+    """Prometheus text exposition of all processes' metrics."""
+    merged = _merge(collect() if snapshots is None else snapshots)
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for key, value in sorted(merged[metric.name].items()):
+            if metric.kind != "histogram":
+                lines.append(f"{metric.name}{_labels(metric.labelnames, key)} {_number(value)}")
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{metric.name}_bucket{_labels(metric.labelnames, key, ('le', le))} {cumulative}")
+            lines.append(f"{metric.name}_sum{_labels(metric.labelnames, key)} {_number(total)}")
+            lines.append(f"{metric.name}_count{_labels(metric.labelnames, key)} {cumulative}")
+    return "\n".join(lines) + "\n"
@@ -1,3 +1,5 @@
+import uuid
+
 from application import db
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
@@ -20,9 +22,33 @@ class User(db.Model, UserMixin):
         return check_password_hash(self.password_hash, password)
 
 
+def new_public_id():
+    return uuid.uuid4().hex
+
+
 # PREDICTION MODEL
 class Prediction(db.Model):
+    # every page query is "one user's rows (user_id = ? / IS NULL), ordered by
+    # <sort key>, id", so each sort key gets an index led by user_id; with id
+    # last, keyset pages (application/pagination.py) are an index range read
+    __table_args__ = (
+        db.Index("ix_prediction_user_id", "user_id", "id"),
+        db.Index("ix_prediction_user_created", "user_id", "created_at", "id"),
+        db.Index("ix_prediction_user_rent", "user_id", "predicted_rent", "id"),
+        db.Index("ix_prediction_user_area", "user_id", "area", "id"),
+        db.Index("ix_prediction_user_beds", "user_id", "bedrooms", "id"),
+        db.Index("ix_prediction_user_city", "user_id", "city", "id"),
+        # city is the most used filter; newest first within a city
+        db.Index("ix_prediction_user_city_created", "user_id", "city", "created_at", "id"),
+        # an index rather than a column constraint, so application/schema.py
+        # can add it to a table created before the column existed
+        db.Index("uq_prediction_public_id", "public_id", unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
+    # id handed to API clients before the row is written (write-behind mode
+    # has no database id yet); GET /api/predictions/ref/<public_id>
+    public_id = db.Column(db.String(32), default=new_public_id)
 
     area = db.Column(db.Float)
     bedrooms = db.Column(db.Integer)
@@ -34,11 +60,18 @@ class Prediction(db.Model):
     location = db.Column(db.String(100))
 
     predicted_rent = db.Column(db.Float)
+    # version of the model that produced predicted_rent
+    model_version = db.Column(db.String(64))
 
     created_at = db.Column(db.DateTime, server_default=db.func.now())
 
     # for user authentication - link prediction → user
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
 
+    def __init__(self, **kwargs):
+        # known as soon as the object exists, not only after a flush
+        kwargs.setdefault("public_id", new_public_id())
+        super().__init__(**kwargs)
+
     def __repr__(self):
         return f'<Prediction {self.id}: {self.predicted_rent}>'
@@ -0,0 +1,186 @@
+# keyset (cursor) pagination: each page continues after the last row of the
+# previous one, so page 500 costs the same as page 1 (no OFFSET scan)
+from datetime import datetime
+
+from flask import current_app
+from itsdangerous import BadData, URLSafeSerializer
+from sqlalchemy import DateTime, String, and_, func, or_, select, tuple_, type_coerce
+
+from application import db
+
+
+class KeysetPage:
+    """
+    One page of rows plus opaque cursors to the pages around it.
+    Mirrors the parts of Flask-SQLAlchemy's Pagination the templates use.
+    """
+
+    def __init__(self, items, page, per_page, has_prev, has_next, prev_cursor, next_cursor,
+                 total=None, total_is_estimate=False):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.has_prev = has_prev
+        self.has_next = has_next
+        self.prev_cursor = prev_cursor
+        self.next_cursor = next_cursor
+        self.total = total                      # None when not counted
+        self.total_is_estimate = total_is_estimate  # True: at least `total` rows
+
+    @property
+    def first_index(self):
+        """1-based position of the first row on this page."""
+        return (self.page - 1) * self.per_page + 1
+
+    @property
+    def last_index(self):
+        return self.first_index + len(self.items) - 1
+
+    @property
+    def total_label(self):
+        if self.total is None:
+            return "—"
+        return f"{self.total:,}+" if self.total_is_estimate else f"{self.total:,}"
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config["SECRET_KEY"], salt="keyset-cursor")
+
+
+def encode_cursor(data):
+    return _serializer().dumps(data)
+
+
+def decode_cursor(token):
+    """The cursor's contents, or None if it is missing, tampered with or garbled."""
+    if not token:
+        return None
+    try:
+        data = _serializer().loads(token)
+    except BadData:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _keyset_column(column):
+    # DateTimes are compared as stored: SQLite keeps server_default values
+    # without microseconds, so a re-bound datetime would not equal them
+    return type_coerce(column, String) if isinstance(column.type, DateTime) else column
+
+
+def _json_value(value):
+    return value.isoformat(" ") if isinstance(value, datetime) else value
+
+
+def _after(column, id_column, value, row_id, descending):
+    """
+    Rows after (value, row_id) in ORDER BY column, id (both desc or both
+    asc). NULL sorts as the smallest value, as in SQLite.
+    """
+    if descending:
+        if value is None:
+            return and_(column.is_(None), id_column < row_id)
+        return or_(tuple_(column, id_column) < (value, row_id), column.is_(None))
+    if value is None:
+        return or_(and_(column.is_(None), id_column > row_id), column.is_not(None))
+    return tuple_(column, id_column) > (value, row_id)
+
+
+def keyset_select(query, sort_column, id_column, descending, after=None):
+    """
+    query ordered by (sort_column, id_column), starting after the
+    (value, id) pair `after`; the sort value is added as keyset_value.
+    """
+    keyset_column = _keyset_column(sort_column)
+    paged = query.add_columns(keyset_column.label("keyset_value"))
+    if after is not None:
+        paged = paged.where(_after(keyset_column, id_column, *after, descending))
+    return paged.order_by(*(c.desc() if descending else c.asc() for c in (sort_column, id_column)))
+
+
+def count_rows(query, cap=None):
+    """
+    COUNT(*) of query's rows; with cap, stop counting after cap rows.
+
+    Returns:
+        tuple: (count, whether it hit cap)
+    """
+    inner = query.order_by(None)
+    if cap is not None:
+        inner = inner.limit(cap + 1)
+    total = db.session.scalar(select(func.count()).select_from(inner.subquery()))
+    if cap is not None and total > cap:
+        return cap, True
+    return total, False
+
+
+def keyset_paginate(query, sort_key, sort_column, id_column, order="desc", per_page=10,
+                    cursor=None, total_mode="exact", total_cap=10000):
+    """
+    One page of query (a select of one entity, without ORDER BY), ordered
+    by (sort_column, id_column).
+
+    Args:
+        query: Filtered select(Model)
+        sort_key (str): Name of the sort; a cursor made for another sort
+            or order is ignored (first page)
+        sort_column: Column to sort on
+        id_column: Unique tie-breaker (the primary key)
+        order (str): "asc" or "desc"
+        per_page (int): Rows per page
+        cursor (str): next_cursor / prev_cursor of an earlier page
+        total_mode (str): "exact" counts the rows, "capped" counts at most
+            total_cap rows, "off" does not count. The count is made on the
+            first page and carried along in the cursors.
+        total_cap (int): Limit for "capped"
+
+    Returns:
+        KeysetPage
+    """
+    state = decode_cursor(cursor)
+    if state is not None and (state.get("s"), state.get("o")) != (sort_key, order):
+        state = None
+
+    descending = order != "asc"
+    backwards = state is not None and state.get("d") == "prev"
+    after = (state["v"], state["i"]) if state is not None else None
+
+    paged = keyset_select(query, sort_column, id_column, descending != backwards, after)
+    rows = db.session.execute(paged.limit(per_page + 1)).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    page = state["p"] if state is not None else 1
+    if backwards:
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = state is not None, more
+
+    # ---------- total (counted once, then carried in the cursors) ----------
+    if state is not None and "t" in state:
+        total, estimate = state["t"], state.get("te", False)
+    elif total_mode == "exact":
+        total, estimate = count_rows(query)
+    elif total_mode == "capped":
+        total, estimate = count_rows(query, cap=total_cap)
+    else:
+        total, estimate = None, False
+
+    def make_cursor(row, direction, target_page):
+        data = {"s": sort_key, "o": order, "d": direction, "p": target_page,
+                "v": _json_value(row.keyset_value), "i": getattr(row[0], id_column.key)}
+        if total is not None:
+            data["t"], data["te"] = total, estimate
+        return encode_cursor(data)
+
+    next_cursor = make_cursor(rows[-1], "next", page + 1) if has_next and rows else None
+    prev_cursor = make_cursor(rows[0], "prev", page - 1) if has_prev and rows else None
+
+    return KeysetPage(
+        [row[0] for row in rows], page, per_page,
+        has_prev=prev_cursor is not None, has_next=next_cursor is not None,
+        prev_cursor=prev_cursor, next_cursor=next_cursor,
+        total=total, total_is_estimate=estimate,
+    )
@@ -0,0 +1,144 @@
+# intra-request parallelism: split one large scoring call across threads
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+STRATEGIES = ("rows", "trees")
+
+# batch sizes tried by calibrate(), smallest first
+CALIBRATION_SIZES = (32, 64, 128, 256, 512, 1024, 2048)
+
+
+# one thread pool per process and size, shared by every model version
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = None
+
+
+def _get_pool(workers):
+    global _pools_pid
+    with _pools_lock:
+        # pool threads do not survive fork, so each process makes its own
+        if _pools_pid != os.getpid():
+            _pools.clear()
+            _pools_pid = os.getpid()
+        if workers not in _pools:
+            _pools[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parallel-score")
+        return _pools[workers]
+
+
+class ParallelScorer:
+    """
+    Splits large batches across a persistent thread pool; anything below
+    threshold rows runs inline in the caller's thread.
+
+    "rows" gives each thread a contiguous chunk of rows. "trees" gives each
+    thread a subset of a sklearn forest's trees over all rows and sums the
+    partial results (models without estimators_ fall back to rows). Both
+    work because tree traversal in sklearn and NumPy releases the GIL.
+    """
+
+    def __init__(self, workers=None, threshold=1024, strategy="rows"):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown PARALLEL_STRATEGY: {strategy}")
+        self.workers = workers or os.cpu_count() or 1
+        self.threshold = threshold
+        self.strategy = strategy
+
+        self.inline_calls = 0
+        self.parallel_calls = 0
+
+    def should_split(self, n_rows):
+        return self.workers > 1 and n_rows >= self.threshold
+
+    def predict(self, model, X, predict_fn):
+        """
+        predict_fn(X) for the whole matrix, computed inline or split.
+
+        Args:
+            model: The forest behind predict_fn (used by the "trees" strategy)
+            X: Feature matrix (ndarray or DataFrame)
+            predict_fn: Callable scoring a slice of X, returning an ndarray
+        """
+        n_rows = X.shape[0]
+        if not self.should_split(n_rows):
+            self.inline_calls += 1
+            return predict_fn(X)
+
+        self.parallel_calls += 1
+        if self.strategy == "trees" and hasattr(model, "estimators_"):
+            return self._predict_trees(model, X)
+        return self._predict_rows(X, predict_fn)
+
+    def _predict_rows(self, X, predict_fn):
+        bounds = np.linspace(0, X.shape[0], min(self.workers, X.shape[0]) + 1).astype(int)
+        pool = _get_pool(self.workers)
+        futures = [pool.submit(predict_fn, X[start:stop]) for start, stop in zip(bounds[:-1], bounds[1:])]
+        return np.concatenate([f.result() for f in futures])
+
+    def _predict_trees(self, model, X):
+        # Same validation (float32 cast, feature-name check) as model.predict
+        X = model._validate_X_predict(X)
+        estimators = model.estimators_
+        groups = np.array_split(np.arange(len(estimators)), min(self.workers, len(estimators)))
+
+        def partial_sum(indices):
+            total = np.zeros(X.shape[0], dtype=np.float64)
+            for i in indices:
+                total += estimators[i].predict(X, check_input=False)
+            return total
+
+        pool = _get_pool(self.workers)
+        futures = [pool.submit(partial_sum, group) for group in groups]
+        # reduce in submission order so results are deterministic
+        total = futures[0].result()
+        for f in futures[1:]:
+            total += f.result()
+        return total / len(estimators)
+
+    def calibrate(self, model, X, predict_fn, repeats=3, margin=0.9):
+        """
+        Microbenchmark inline vs split scoring on growing slices of X and
+        set threshold to the smallest size where splitting is at least
+        (1 - margin) faster. Never splits if no tried size wins.
+
+        Returns:
+            float: The new threshold (inf if splitting never paid off)
+        """
+        def best_time(fn, rows):
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                fn(rows)
+                times.append(time.perf_counter() - start)
+            return min(times)
+
+        self.threshold = float("inf")
+        if self.workers <= 1:
+            return self.threshold
+
+        split = (lambda rows: self._predict_trees(model, rows)) \
+            if self.strategy == "trees" and hasattr(model, "estimators_") \
+            else (lambda rows: self._predict_rows(rows, predict_fn))
+
+        for size in CALIBRATION_SIZES:
+            if size > X.shape[0]:
+                break
+            rows = X[:size]
+            if best_time(split, rows) < margin * best_time(predict_fn, rows):
+                self.threshold = size
+                break
+
+        return self.threshold
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "strategy": self.strategy,
+            "threshold": None if self.threshold == float("inf") else self.threshold,
+            "inline_calls": self.inline_calls,
+            "parallel_calls": self.parallel_calls,
+        }
@@ -1,64 +1,1135 @@
 # load the model and preprocessing objects
 import os
+import shutil
+import tempfile
+import threading
+import time
 import joblib
 import numpy as np
 import pandas as pd
 from flask import current_app
+from application.preprocessing import CompiledPreprocessor
+from application.forest import META_FILE as FLAT_META_FILE, FlatForest
+from application.cache import PredictionCache, canonicalize_input, cache_key
+from application.memory import memory_report
+from application.bundle import PART_FILES, build_bundle, load_bundle, read_manifest
+from application.batching import MicroBatcher
+from application.executor import ProcessInferenceExecutor
+from application.parallel import ParallelScorer, CALIBRATION_SIZES
+from application.rent_grid import RentGrid
+from application import metrics
+from application.registry import ModelRegistry, ModelVersion, ModelWatcher, PredictedRent
+from application.shadow import ShadowEvaluator, replay_predictions
+from application.forms import TOP_LOCATIONS, TOP_LOCATION_CITIES
+from application.locations import LocationIndex
 
-# Global variables to store loaded components
-_model = None
-_scaler = None
-_encoder = None
-_categorical_cols = None
-_continuous_cols = None
-_feature_columns = None
-_furnish_map = None
+# The published model version (components + derived engines) lives in the
+# registry; a reload builds a new ModelVersion and swaps it in atomically.
+_registry = ModelRegistry()
+
+# Process-wide services, shared by every model version
+_cache = None     # PredictionCache, None when PREDICTION_CACHE_SIZE = 0
+_cache_area_precision = 2
+_batcher = None   # MicroBatcher, None unless MICRO_BATCH_ENABLED
+_executor = None  # ProcessInferenceExecutor, None unless INFERENCE_BACKEND = "process"
+_watcher = None   # ModelWatcher, None unless MODEL_WATCH_ENABLED
+_shadow = None    # ShadowEvaluator, None unless SHADOW_MODEL_BUNDLE is set
+_fallback_locations = None  # (encoder file, mtime, LocationIndex) until a model is published
+
+# Held while a version loads, so only one load runs at a time
+_load_lock = threading.Lock()
+
+
+def _after_fork_in_child():
+    """
+    A fork during a load would leave the child with a lock nobody releases,
+    and threads do not survive fork: with gunicorn --preload each worker
+    has to restart its own model file watch.
+    """
+    global _load_lock
+    _load_lock = threading.Lock()
+    if _watcher is not None and _watcher.running:
+        _watcher.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def current_version():
+    """The ModelVersion serving requests (None before the first load)."""
+    return _registry.current()
+
+
+def _active():
+    """The published version, loading it first if needed."""
+    mv = _registry.current()
+    if mv is None:
+        load_model_components()
+        mv = _registry.current()
+    return mv
 
 
 def load_model_components():
-    """Load all model components once when app starts."""
-    global _model, _scaler, _encoder, _categorical_cols, _continuous_cols, _feature_columns, _furnish_map
-    
-    if _model is not None:
+    """
+    Load all model components once when app starts.
+
+    Single-flight: concurrent callers wait for the one load in progress
+    instead of each starting their own. Nothing is published until every
+    component is ready.
+    """
+    if _registry.current() is not None:
         return  # Already loaded
 
+    with _load_lock:
+        if _registry.current() is not None:
+            return  # Loaded by another thread while we waited
+
+        _publish(_load_version())
+
+
+def reload_model_components(bundle_path=None, warm_rows=None):
+    """
+    Load a fresh version of every component and swap it in.
+
+    The current version keeps serving while the new one loads and warms
+    up; requests already running finish on the version they started with.
+
+    Args:
+        bundle_path (str): Bundle to load (default: MODEL_BUNDLE / MODEL_DIR)
+        warm_rows (int): Throwaway predictions before the swap
+            (default: MODEL_WARMUP_PREDICTIONS)
+
+    Returns:
+        ModelVersion: The version now serving
+    """
+    with _load_lock:
+        mv = _load_version(bundle_path)
+        if warm_rows is None:
+            warm_rows = current_app.config.get("MODEL_WARMUP_PREDICTIONS", 8)
+        _warm_version(mv, warm_rows)
+        _publish(mv)
+        return mv
+
+
+def _publish(mv):
+    """Swap mv in and retire what belonged to the previous version."""
+    previous = _registry.publish(mv)
+
+    # Keys carry the version, so old entries can no longer be hit; drop them
+    _configure_cache()
+
+    # Pool workers were forked with the previous version; fork new ones
+    if previous is not None and _executor is not None:
+        _executor.restart()
+
+
+def start_background_reload(app, bundle_path=None):
+    """
+    Reload in a daemon thread (see reload_model_components).
+
+    Returns:
+        bool: False if a reload is already running
+    """
+    state = _registry.reload
+    if state["status"] == "loading":
+        return False
+    state.update(status="loading", error=None, started_at=time.time(), finished_at=None)
+
+    def run():
+        try:
+            with app.app_context():
+                reload_model_components(bundle_path)
+        except Exception as e:
+            state.update(status="failed", error=str(e), finished_at=time.time())
+            print(f"Model reload failed, keeping the current version: {e}")
+            return
+        state.update(status="ready", finished_at=time.time())
+
+    threading.Thread(target=run, name="model-reload", daemon=True).start()
+    return True
+
+
+def model_registry_status():
+    """Current version, recently published versions and the last reload."""
+    return _registry.status()
+
+
+def _watched_paths():
+    """Files whose change means a new model has been dropped in."""
+    bundle_path = current_app.config.get("MODEL_BUNDLE")
+    if bundle_path:
+        return [bundle_path]
+    model_dir = _model_dir()
+    paths = [os.path.join(model_dir, filename) for filename in PART_FILES.values()]
+    if current_app.config.get("MODEL_STORAGE", "joblib") == "mmap":
+        paths.append(os.path.join(_flat_model_dir(model_dir), FLAT_META_FILE))
+    return paths
+
+
+def start_model_watch(app):
+    """Poll the model files every MODEL_WATCH_INTERVAL seconds and reload on change."""
+    global _watcher
+
+    def paths():
+        with app.app_context():
+            return _watched_paths()
+
+    if _watcher is None:
+        _watcher = ModelWatcher(
+            paths,
+            lambda: start_background_reload(app),
+            interval=app.config.get("MODEL_WATCH_INTERVAL", 5.0),
+        )
+    _watcher.start()
+    return _watcher
+
+
+def _load_version(bundle_path=None, with_grid=True):
+    """
+    Build a complete ModelVersion from the configured model files.
+    Nothing global is touched, so the published version keeps serving.
+    """
+    started = time.perf_counter()
     try:
-        MODEL_DIR = current_app.config.get(
-            'MODEL_DIR',
-            os.path.join(os.path.dirname(__file__), '..', 'Model')
+        MODEL_DIR = _model_dir()
+        bundle_path = bundle_path or current_app.config.get("MODEL_BUNDLE")
+        use_mmap = current_app.config.get("MODEL_STORAGE", "joblib") == "mmap"
+
+        flat_dir = _flat_model_dir(MODEL_DIR)
+        if bundle_path:
+            # -------- Load everything from one versioned bundle --------
+            print("Loading model bundle:", bundle_path)
+            if use_mmap:
+                # each bundle maps its own flattened forest, never the one in MODEL_DIR
+                flat_dir = _bundle_flat_dir(read_manifest(bundle_path))
+            flat_ready = use_mmap and os.path.exists(os.path.join(flat_dir, FLAT_META_FILE))
+            parts = [name for name in PART_FILES if not (flat_ready and name == "model")]
+            components, manifest = load_bundle(
+                bundle_path,
+                parts=parts,
+                cache_dir=_model_cache_dir(),
+                max_workers=current_app.config.get("MODEL_LOAD_WORKERS", 4),
+            )
+            model = components.get("model")
+            version = manifest["version"]
+            print(f"✓ Loaded bundle version {version}")
+        else:
+            print("Loading model components from:", MODEL_DIR)
+            components = None
+            model = None
+            version = None
+
+        mapped_dir = None
+        if use_mmap:
+            # -------- Memory-map the flattened forest --------
+            # Node tables stay in the page cache, shared by all workers
+            if model is not None:
+                _export_bundle_forest(model, flat_dir)
+            model = FlatForest.load(flat_dir, mmap_mode="r")
+            mapped_dir = flat_dir
+            print("✓ Memory-mapped flat forest from:", flat_dir)
+        elif model is None:
+            # -------- Load model with joblib --------
+            model_path = os.path.join(MODEL_DIR, "final_model_compressed_v2.joblib")
+
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(f"Model file not found: {model_path}")
+
+            print("Loading model (this may take a moment)...")
+            model = joblib.load(model_path)
+            print("✓ Loaded model from:", model_path)
+
+        if components is None:
+            # Load all other components with joblib
+            components = {
+                name: joblib.load(os.path.join(MODEL_DIR, filename))
+                for name, filename in PART_FILES.items() if name != "model"
+            }
+            version = _unbundled_version(components["model_info"])
+
+        mv = ModelVersion(
+            version,
+            model,
+            components["scaler"],
+            components["encoder"],
+            components["categorical_cols"],
+            components["continuous_cols"],
+            components["feature_columns"],
+            components["furnish_map"],
+            components["model_info"],
+            source=bundle_path or MODEL_DIR,
         )
 
-        print("Loading model components from:", MODEL_DIR)
-
-        # -------- Load model with joblib --------
-        model_path = os.path.join(MODEL_DIR, "final_model_compressed_v2.joblib")
-
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(f"Model file not found: {model_path}")
-
-        print("Loading model (this may take a moment)...")
-        _model = joblib.load(model_path)
-        print("✓ Loaded model from:", model_path)
-        
-        # Load all other components with joblib
-        _scaler = joblib.load(os.path.join(MODEL_DIR, "scaler.pkl"))
-        _encoder = joblib.load(os.path.join(MODEL_DIR, "encoder.pkl"))
-        _categorical_cols = joblib.load(os.path.join(MODEL_DIR, "categorical_cols.pkl"))
-        _continuous_cols = joblib.load(os.path.join(MODEL_DIR, "continuous_cols.pkl"))
-        _feature_columns = joblib.load(os.path.join(MODEL_DIR, "feature_columns.pkl"))
-        _furnish_map = joblib.load(os.path.join(MODEL_DIR, "furnish_map.pkl"))
-        
-        print("✓ All model components loaded successfully!")
-        
+        mv.flat_dir = mapped_dir
+
+        # Autocomplete + canonical location names, from the encoder's vocabulary
+        mv.locations = _build_location_index(mv.encoder, mv.categorical_cols, mv.model_info)
+
+        # Build the DataFrame-free feature builder once, up front
+        if current_app.config.get("PREPROCESS_ENGINE", "compiled") == "compiled":
+            mv.compiled = _compiled_preprocessor(mv)
+
+        # Optionally swap sklearn's predict for the flattened forest
+        # (a memory-mapped model already is one, and serves every size)
+        if isinstance(model, FlatForest):
+            mv.engine = model
+            mv.flat_engine_max_rows = float("inf")
+        elif current_app.config.get("INFERENCE_ENGINE", "sklearn") == "flat":
+            mv.engine = _build_flat_engine(mv)
+            mv.flat_engine_max_rows = current_app.config.get("FLAT_ENGINE_MAX_ROWS", 64)
+
+        # Only build the features some tree actually splits on
+        if mv.engine is not None and current_app.config.get("PRUNE_UNUSED_FEATURES", False):
+            mv.engine, mv.engine_columns = mv.engine.prune_features()
+            if mv.compiled is not None:
+                mv.engine_compiled = _compiled_preprocessor(
+                    mv, output_columns=[mv.feature_columns[i] for i in mv.engine_columns]
+                )
+            print(f"✓ Pruned features: {len(mv.engine_columns)} of {len(mv.feature_columns)} used")
+
+        # Large batches are split by our own policy, not sklearn's n_jobs
+        if hasattr(model, "n_jobs"):
+            model.n_jobs = 1
+        mv.parallel = _build_parallel(mv)
+
+        if with_grid:
+            mv.grid = _build_grid(mv)
+
+        metrics.MODEL_LOADS.inc(result="success")
+        metrics.MODEL_LOAD_SECONDS.observe(time.perf_counter() - started)
+        print(f"✓ All model components loaded successfully! (version {mv.version})")
+        return mv
+
     except Exception as e:
+        metrics.MODEL_LOADS.inc(result="failure")
         print(f"Error loading model components: {e}")
         raise
 
 
+def _unbundled_version(model_info):
+    """Version label for the separate Model/ files, from their training date."""
+    trained = str((model_info or {}).get("training_date", ""))
+    if not trained:
+        return "unbundled"
+    return "unbundled-" + "".join(c if c.isalnum() else "-" for c in trained)
+
+
+def _compiled_preprocessor(mv, output_columns=None):
+    return CompiledPreprocessor(
+        mv.encoder, mv.scaler, mv.categorical_cols, mv.continuous_cols,
+        mv.feature_columns, mv.furnish_map, output_columns=output_columns,
+    )
+
+
+# -------- location vocabulary (GET /api/locations, canonical names) --------
+
+def _build_location_index(encoder, categorical_cols, model_info):
+    """
+    LocationIndex of the encoder's locations. Cities come from the model's
+    own "location_cities" map when it has one, TOP_LOCATION_CITIES and
+    names that start with a city ("Ajman Marina"); the rest are unknown.
+    """
+    cols = list(categorical_cols)
+    locations = [str(name) for name in encoder.categories_[cols.index("Location")]]
+    cities = [str(city) for city in encoder.categories_[cols.index("City")]] if "City" in cols else []
+
+    city_of = {}
+    for name in locations:
+        for city in cities:
+            if name == city or name.startswith(city + " "):
+                city_of[name] = city
+    city_of.update(TOP_LOCATION_CITIES)
+    city_of.update((model_info or {}).get("location_cities") or {})
+    return LocationIndex(locations, city_of)
+
+
+def location_index():
+    """
+    The published model's LocationIndex. Before a model is loaded (or if
+    it cannot be), the one of the encoder file in MODEL_DIR, so the form
+    and autocomplete do not wait for the large model file.
+    """
+    global _fallback_locations
+
+    mv = _registry.current()
+    if mv is not None and mv.locations is not None:
+        return mv.locations
+
+    model_dir = _model_dir()
+    encoder_path = os.path.join(model_dir, PART_FILES["encoder"])
+    mtime = os.path.getmtime(encoder_path)
+    cached = _fallback_locations
+    if cached is None or cached[:2] != (encoder_path, mtime):
+        index = _build_location_index(
+            joblib.load(encoder_path),
+            joblib.load(os.path.join(model_dir, PART_FILES["categorical_cols"])),
+            joblib.load(os.path.join(model_dir, PART_FILES["model_info"])),
+        )
+        cached = _fallback_locations = (encoder_path, mtime, index)
+    return cached[2]
+
+
+def canonical_location(name, mv=None, strict=None):
+    """
+    The model's spelling of a location ("dubai  marina" -> "Dubai Marina",
+    "JLT" -> "Jumeirah Lake Towers (JLT)"). An unknown location is
+    returned whitespace-normalized, or rejected when strict.
+
+    Args:
+        strict (bool): Default LOCATION_STRICT. The forms and API check
+            their input with it; the predictor itself only canonicalizes
+            and still scores unknown locations (as all zeros)
+
+    Raises:
+        ValueError: For a location the model does not know, when strict
+    """
+    index = mv.locations if mv is not None and mv.locations is not None else location_index()
+    canonical = index.canonical(name)
+    if canonical is not None:
+        return canonical
+    if strict is None:
+        strict = current_app.config.get("LOCATION_STRICT", True)
+    if strict:
+        raise ValueError(f"Unknown location: {name!r}")
+    return " ".join(str(name).split())
+
+
+def _with_known_location(input_data, mv):
+    if not isinstance(input_data, dict) or "Location" not in input_data:
+        return input_data
+    return dict(input_data, Location=canonical_location(input_data["Location"], mv, strict=False))
+
+
+# Keys every input record must provide (see preprocess_and_predict)
+INPUT_FIELDS = [
+    "Area_in_sqft",
+    "Beds",
+    "Baths",
+    "Age_of_listing_in_days",
+    "Furnishing",
+    "Type",
+    "Location",
+    "City",
+]
+
+
+def _preprocess_frame(df, mv=None):
+    """
+    Run the training-time preprocessing on a DataFrame of raw inputs.
+
+    Works on any number of rows at once, so a single call to the encoder,
+    scaler and model can serve a whole batch.
+
+    Returns:
+        pd.DataFrame: Feature matrix in feature_columns order
+    """
+    mv = mv or _active()
+
+    # 1. Log transform area
+    df["Log_Area"] = np.log1p(df["Area_in_sqft"])
+    df.drop("Area_in_sqft", axis=1, inplace=True)
+
+    # 2. Binary encode furnishing
+    df["Furnishing"] = df["Furnishing"].map(mv.furnish_map).fillna(0).astype(float)
+
+    # 3. One-hot encode categorical features
+    with metrics.stage("encode"):
+        df_encoded = mv.encoder.transform(df[mv.categorical_cols])
+        encoded_cols = mv.encoder.get_feature_names_out(mv.categorical_cols)
+
+        df.drop(mv.categorical_cols, axis=1, inplace=True)
+        df_encoded = pd.DataFrame(df_encoded, columns=encoded_cols, index=df.index)
+        df = pd.concat([df, df_encoded], axis=1)
+
+    # 4. Scale continuous features
+    with metrics.stage("scale"):
+        df[mv.continuous_cols] = mv.scaler.transform(df[mv.continuous_cols])
+
+    # 5. Ensure correct column order
+    return df[mv.feature_columns]
+
+
+def _build_features(records, mv=None):
+    """
+    Feature matrix for a list of input dicts, using the compiled
+    preprocessor when available and the pandas path otherwise.
+    """
+    mv = mv or _active()
+    if mv.compiled is not None:
+        with metrics.stage("features"):
+            return mv.compiled.transform(records)
+    with metrics.stage("dataframe"):
+        df = pd.DataFrame(records, columns=INPUT_FIELDS)
+    return _preprocess_frame(df, mv)
+
+
+def _model_input(X, mv=None, model=None):
+    """Give the model a DataFrame only if it was fitted with feature names."""
+    mv = mv or _active()
+    model = mv.model if model is None else model
+    if isinstance(X, np.ndarray) and hasattr(model, "feature_names_in_"):
+        return pd.DataFrame(X, columns=mv.feature_columns, copy=False)
+    return X
+
+
+def _clean_record(record):
+    """
+    Validate one raw input record and coerce its values to model types.
+
+    Raises:
+        ValueError: If a field is missing or cannot be converted
+    """
+    if not isinstance(record, dict):
+        raise ValueError("Record must be an object")
+
+    missing = [field for field in INPUT_FIELDS if field not in record]
+    if missing:
+        raise ValueError("Missing fields: " + ", ".join(missing))
+
+    try:
+        area = float(record["Area_in_sqft"])
+        cleaned = {
+            "Area_in_sqft": area,
+            "Beds": int(record["Beds"]),
+            "Baths": int(record["Baths"]),
+            "Age_of_listing_in_days": int(record["Age_of_listing_in_days"]),
+            "Furnishing": str(record["Furnishing"]),
+            "Type": str(record["Type"]),
+            "Location": str(record["Location"]),
+            "City": str(record["City"]),
+        }
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid input values: {e}")
+
+    if not np.isfinite(area) or area < 0:
+        raise ValueError("Area_in_sqft must be a non-negative number")
+
+    return cleaned
+
+
+def _configure_cache():
+    """Create the prediction cache on first load, clear it on every reload."""
+    global _cache, _cache_area_precision
+
+    maxsize = current_app.config.get("PREDICTION_CACHE_SIZE", 10000)
+    _cache_area_precision = current_app.config.get("PREDICTION_CACHE_AREA_PRECISION", 2)
+
+    if not maxsize:
+        _cache = None
+    elif _cache is None or _cache.maxsize != maxsize:
+        _cache = PredictionCache(
+            maxsize=maxsize,
+            ttl=current_app.config.get("PREDICTION_CACHE_TTL", 3600),
+        )
+    else:
+        _cache.ttl = current_app.config.get("PREDICTION_CACHE_TTL", 3600)
+        _cache.clear()
+
+
+def _build_parallel(mv):
+    """
+    Set up the intra-request parallelism policy for a freshly loaded model.
+    PARALLEL_BATCH_THRESHOLD = "auto" (opt-in) measures where splitting
+    starts to pay off on this host; it runs on every load, in every worker.
+    """
+    workers = current_app.config.get("PARALLEL_WORKERS", 0) or os.cpu_count() or 1
+    if workers <= 1:
+        return None
+
+    threshold = current_app.config.get("PARALLEL_BATCH_THRESHOLD", 512)
+    parallel = ParallelScorer(
+        workers=workers,
+        threshold=float("inf") if threshold == "auto" else int(threshold),
+        strategy=current_app.config.get("PARALLEL_STRATEGY", "rows"),
+    )
+
+    if threshold == "auto":
+        records = sample_inputs(max(CALIBRATION_SIZES), seed=99, mv=mv)
+        scoring_model, X, predict_fn = _large_batch_path(records, mv)
+        parallel.calibrate(scoring_model, X, predict_fn)
+        print(f"✓ Parallel scoring threshold calibrated: {parallel.stats()['threshold']} rows")
+
+    return parallel
+
+
+def parallel_stats():
+    """Workers, strategy, threshold and call counts of the parallelism policy (None if off)."""
+    mv = current_version()
+    return mv.parallel.stats() if mv is not None and mv.parallel is not None else None
+
+
+def _rent_grid_path():
+    return current_app.config.get("RENT_GRID_FILE") or os.path.join(_model_dir(), "rent_grid.npz")
+
+
+def _build_grid(mv):
+    """Load or compute the rent grid according to RENT_GRID_MODE."""
+    mode = current_app.config.get("RENT_GRID_MODE", "off")
+    if mode == "compute":
+        grid = build_rent_grid(mv=mv)
+        print(f"✓ Rent grid computed: {grid.points:,} points")
+    elif mode == "file":
+        path = _rent_grid_path()
+        grid = RentGrid.load(path)
+        if grid.model_fingerprint != mv.fingerprint:
+            print(f"Rent grid {path} was built for another model, scoring with the forest")
+            grid = None
+        else:
+            print(f"✓ Loaded rent grid from: {path}")
+    else:
+        grid = None
+
+    return grid
+
+
+def build_rent_grid(area_points=None, age_points=None, mv=None):
+    """
+    Score the TOP_LOCATIONS grid with the loaded model.
+
+    Args:
+        area_points, age_points (int): Override RENT_GRID_AREA_POINTS /
+            RENT_GRID_AGE_POINTS
+
+    Returns:
+        RentGrid
+    """
+    mv = mv or _active()
+    config = current_app.config
+
+    tiler = mv.compiled or _compiled_preprocessor(mv)
+
+    def score(base, overrides):
+        return _score_matrix(tiler.tile(base, overrides), mv)
+
+    return RentGrid.build(
+        score,
+        TOP_LOCATIONS,
+        [TOP_LOCATION_CITIES[location] for location in TOP_LOCATIONS],
+        list(mv.encoder.categories_[list(mv.categorical_cols).index("Type")]),
+        list(mv.furnish_map),
+        max_beds=config.get("RENT_GRID_MAX_BEDS", 6),
+        max_baths=config.get("RENT_GRID_MAX_BATHS", 6),
+        area_range=config.get("RENT_GRID_AREA_RANGE", (300, 20000)),
+        area_points=area_points or config.get("RENT_GRID_AREA_POINTS", 16),
+        max_age=config.get("RENT_GRID_MAX_AGE", 365),
+        age_points=age_points or config.get("RENT_GRID_AGE_POINTS", 4),
+        model_fingerprint=mv.fingerprint,
+    )
+
+
+def export_rent_grid(path=None, area_points=None, age_points=None):
+    """
+    Build the rent grid and save it for RENT_GRID_MODE = "file".
+
+    Returns:
+        tuple: (path written, RentGrid)
+    """
+    path = path or _rent_grid_path()
+    grid = build_rent_grid(area_points, age_points)
+    grid.save(path)
+    return path, grid
+
+
+def rent_grid_report(n_rows=2000, seed=0, area_points=None, age_points=None):
+    """
+    How far grid answers are from the forest, on random in-grid inputs.
+
+    Uses the active grid, or builds one at the given resolution so
+    different resolutions can be compared before choosing one.
+
+    Returns:
+        dict: Grid size and deviation stats in AED and relative terms
+    """
+    mv = _active()
+    grid = mv.grid
+    if grid is None or area_points or age_points:
+        grid = build_rent_grid(area_points, age_points, mv=mv)
+
+    rng = np.random.default_rng(seed)
+    records = []
+    for _ in range(n_rows):
+        li = rng.integers(len(grid.locations))
+        records.append({
+            "Area_in_sqft": float(np.expm1(rng.uniform(grid.log_area[0], grid.log_area[-1]))),
+            "Beds": int(rng.integers(grid.max_beds + 1)),
+            "Baths": int(rng.integers(grid.max_baths + 1)),
+            "Age_of_listing_in_days": int(rng.integers(int(grid.ages[-1]) + 1)),
+            "Furnishing": grid.furnishings[rng.integers(len(grid.furnishings))],
+            "Type": grid.types[rng.integers(len(grid.types))],
+            "Location": grid.locations[li],
+            "City": grid.cities[li],
+        })
+
+    reference = np.exp(_score_records(records, mv))
+    approx = np.exp([grid._lookup(record) for record in records])
+    abs_diff = np.abs(approx - reference)
+    rel_diff = abs_diff / reference
+
+    return {
+        "rows": n_rows,
+        "points": grid.points,
+        "bytes": grid.nbytes,
+        "area_points": len(grid.log_area),
+        "age_points": len(grid.ages),
+        "mean_abs_deviation_aed": float(abs_diff.mean()),
+        "max_abs_deviation_aed": float(abs_diff.max()),
+        "mean_rel_deviation": float(rel_diff.mean()),
+        "p95_rel_deviation": float(np.percentile(rel_diff, 95)),
+        "max_rel_deviation": float(rel_diff.max()),
+    }
+
+
+def rent_grid_stats():
+    """Size and hit / miss counts of the rent grid (None if off)."""
+    mv = current_version()
+    return mv.grid.stats() if mv is not None and mv.grid is not None else None
+
+
+def _model_dir():
+    return current_app.config.get(
+        'MODEL_DIR',
+        os.path.join(os.path.dirname(__file__), '..', 'Model')
+    )
+
+
+def allowed_bundle_path(path):
+    """
+    The resolved path of a bundle file if it lies inside MODEL_DIR or
+    MODEL_BUNDLE_DIR, else None. Symlinks are followed before checking, so
+    a link in MODEL_DIR cannot point outside it.
+    """
+    resolved = os.path.realpath(path)
+    for directory in (_model_dir(), current_app.config.get("MODEL_BUNDLE_DIR", "")):
+        if not directory:
+            continue
+        directory = os.path.realpath(directory)
+        if os.path.commonpath([resolved, directory]) == directory and resolved != directory:
+            return resolved
+    return None
+
+
+def _model_cache_dir():
+    """Where decompressed bundle parts are kept ("" disables the cache)."""
+    cache_dir = current_app.config.get("MODEL_CACHE_DIR")
+    if cache_dir is None:
+        # app-owned, not the shared temp dir: cached parts are unpickled
+        cache_dir = os.path.join(current_app.instance_path, "model-cache")
+    return cache_dir or None
+
+
+def _flat_model_dir(model_dir):
+    return current_app.config.get("FLAT_MODEL_DIR") or os.path.join(model_dir, "flat_forest")
+
+
+def _bundle_flat_dir(manifest):
+    """Where a bundle's forest is flattened for mmap: one directory per version + model checksum."""
+    version = "".join(c if c.isalnum() or c in "-_." else "-" for c in str(manifest["version"]))
+    key = f"{version}-{manifest['parts']['model']['sha256'][:16]}"
+    return os.path.join(_flat_model_dir(_model_dir()), "bundles", key)
+
+
+def _export_bundle_forest(model, flat_dir):
+    """Flatten a bundle's forest into flat_dir, all at once (a rename), so no worker maps half of it."""
+    parent = os.path.dirname(flat_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".flat-")
+    try:
+        FlatForest.from_sklearn(model).save(tmp_dir)
+        os.replace(tmp_dir, flat_dir)
+        print("✓ Flattened bundle forest into:", flat_dir)
+    except OSError:
+        # another worker got there first
+        if not os.path.exists(os.path.join(flat_dir, FLAT_META_FILE)):
+            raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _load_sklearn_model():
+    """The joblib forest from MODEL_DIR (reused if it is already loaded)."""
+    mv = current_version()
+    if mv is not None and not isinstance(mv.model, FlatForest):
+        return mv.model
+    return joblib.load(os.path.join(_model_dir(), "final_model_compressed_v2.joblib"))
+
+
+def export_flat_model(out_dir=None, compact=False):
+    """
+    Flatten the joblib forest in MODEL_DIR and save it in the uncompressed
+    layout used by MODEL_STORAGE = "mmap". With compact=True the node
+    tables use the narrow dtypes of FlatForest.compact().
+
+    Returns:
+        str: Directory the forest was written to
+    """
+    out_dir = out_dir or _flat_model_dir(_model_dir())
+
+    forest = FlatForest.from_sklearn(_load_sklearn_model())
+    if compact:
+        forest = forest.compact()
+    forest.save(out_dir)
+    return out_dir
+
+
+def compact_model_report(n_rows=5000, seed=0):
+    """
+    Memory saved by the compact forest and what it costs in accuracy.
+
+    Scores a randomized corpus of realistic inputs with the original
+    sklearn forest and the compact flat forest and compares them in AED.
+
+    Returns:
+        dict: Byte sizes of each representation and deviation stats
+    """
+    mv = _active()
+    model = _load_sklearn_model()
+    flat = FlatForest.from_sklearn(model)
+    compact = flat.compact()
+
+    X = _build_features(sample_inputs(n_rows, seed=seed, mv=mv), mv)
+    reference = np.exp(model.predict(_model_input(X, mv, model)))
+    candidate = np.exp(compact.predict(X))
+    abs_diff = np.abs(candidate - reference)
+
+    sklearn_bytes = FlatForest.sklearn_nbytes(model)
+    return {
+        "rows": n_rows,
+        "sklearn_bytes": sklearn_bytes,
+        "flat_bytes": flat.nbytes,
+        "compact_bytes": compact.nbytes,
+        "bytes_saved": sklearn_bytes - compact.nbytes,
+        "max_abs_deviation_aed": float(abs_diff.max()),
+        "mean_abs_deviation_aed": float(abs_diff.mean()),
+        "max_rel_deviation": float((abs_diff / reference).max()),
+    }
+
+
+def dead_feature_report():
+    """
+    Features that no tree in the forest splits on, grouped by input.
+
+    Returns:
+        dict: used / total counts, dead continuous columns and, per
+            categorical input, the categories whose one-hot column is dead
+    """
+    mv = _active()
+    model = mv.model if isinstance(mv.model, FlatForest) else FlatForest.from_sklearn(mv.model)
+    used = set(model.used_features().tolist())
+
+    dead = [col for i, col in enumerate(mv.feature_columns) if i not in used]
+    dead_set = set(dead)
+
+    encoded_cols = list(mv.encoder.get_feature_names_out(mv.categorical_cols))
+    drop_idx = getattr(mv.encoder, "drop_idx_", None)
+    dead_categories = {}
+    position = 0
+    for j, (col, categories) in enumerate(zip(mv.categorical_cols, mv.encoder.categories_)):
+        dead_categories[col] = []
+        for k, category in enumerate(categories):
+            if drop_idx is not None and drop_idx[j] is not None and k == drop_idx[j]:
+                continue  # baseline category, has no column of its own
+            if encoded_cols[position] in dead_set:
+                dead_categories[col].append(str(category))
+            position += 1
+
+    return {
+        "used": len(used),
+        "total": len(mv.feature_columns),
+        "dead_columns": dead,
+        "dead_continuous": [col for col in mv.continuous_cols if col in dead_set],
+        "dead_categories": dead_categories,
+    }
+
+
+def export_model_bundle(bundle_path, version=None):
+    """
+    Convert the separate files in MODEL_DIR into a single model bundle.
+
+    Returns:
+        dict: The bundle manifest
+    """
+    return build_bundle(_model_dir(), bundle_path, version=version)
+
+
+def model_memory_report():
+    """Resident vs shared memory of this worker, plus the mmap'd model files."""
+    mapped_dir = None
+    mv = current_version()
+    if mv is not None and isinstance(mv.model, FlatForest):
+        mapped_dir = mv.flat_dir or _flat_model_dir(_model_dir())
+    report = memory_report(mapped_dir)
+    report["storage"] = current_app.config.get("MODEL_STORAGE", "joblib")
+    return report
+
+
+def _score_aed_inline(records, mv=None):
+    """Predictions in AED for a list of input dicts, scored in this process."""
+    mv = mv or _active()
+    return [PredictedRent(p, mv.version) for p in np.exp(_score_records(records, mv))]
+
+
+def _score_aed(records, mv=None):
+    """
+    Predictions in AED for a list of input dicts, from the configured
+    INFERENCE_BACKEND: "inline" scores in the calling thread, "process"
+    hands the records to a worker process of the inference pool.
+    """
+    executor = _get_executor()
+    if executor is not None:
+        # round trip, including the wait for a free worker
+        with metrics.stage("inference_pool"):
+            return executor.score(records)
+    return _score_aed_inline(records, mv)
+
+
+def _get_executor():
+    """The process-pool executor if INFERENCE_BACKEND = "process", created on first use."""
+    global _executor
+
+    if current_app.config.get("INFERENCE_BACKEND", "inline") != "process":
+        return None
+    if _executor is None:
+        _executor = ProcessInferenceExecutor(
+            max_workers=current_app.config.get("INFERENCE_POOL_WORKERS", 0) or None,
+            max_in_flight=current_app.config.get("INFERENCE_MAX_IN_FLIGHT", 64),
+            task_timeout=current_app.config.get("INFERENCE_TASK_TIMEOUT", 10.0),
+            threads_per_worker=current_app.config.get("INFERENCE_WORKER_THREADS", 1),
+            chunk_rows=current_app.config.get("INFERENCE_CHUNK_ROWS", 256),
+        )
+    return _executor
+
+
+def executor_stats():
+    """In-flight / completed / timed-out task counts of the inference pool (None if inline)."""
+    return _executor.stats() if _executor is not None else None
+
+
+def _get_batcher():
+    """The micro-batcher if MICRO_BATCH_ENABLED, created on first use."""
+    global _batcher
+
+    if not current_app.config.get("MICRO_BATCH_ENABLED", False):
+        return None
+    if _batcher is None:
+        _batcher = MicroBatcher(
+            current_app._get_current_object(),
+            _score_aed,
+            window_ms=current_app.config.get("MICRO_BATCH_WINDOW_MS", 3),
+            max_batch=current_app.config.get("MICRO_BATCH_MAX_SIZE", 64),
+            timeout=current_app.config.get("MICRO_BATCH_TIMEOUT", 10.0),
+        )
+    return _batcher
+
+
+def batching_stats():
+    """Queue depth, batch sizes and latency of the micro-batcher (None if off)."""
+    return _batcher.stats() if _batcher is not None else None
+
+
+def load_candidate(bundle_path):
+    """
+    Load a model bundle to compare against the published model, without
+    publishing it. No rent grid: a candidate is always scored by its forest.
+    """
+    return _load_version(bundle_path, with_grid=False)
+
+
+def _score_candidate(records, mv):
+    return np.exp(_score_records(records, mv))
+
+
+def _get_shadow():
+    """The shadow evaluator if SHADOW_MODEL_BUNDLE is set, created on first use."""
+    global _shadow
+
+    bundle_path = current_app.config.get("SHADOW_MODEL_BUNDLE", "")
+    sample_rate = current_app.config.get("SHADOW_SAMPLE_RATE", 0.1)
+    if not bundle_path or sample_rate <= 0:
+        return None
+    if _shadow is None:
+        app = current_app._get_current_object()
+
+        def load():
+            with app.app_context():
+                return load_candidate(bundle_path)
+
+        _shadow = ShadowEvaluator(
+            load,
+            _score_candidate,
+            sample_rate=sample_rate,
+            max_queue=current_app.config.get("SHADOW_QUEUE_SIZE", 1000),
+            history=current_app.config.get("SHADOW_HISTORY", 10000),
+        )
+    return _shadow
+
+
+def _offer_to_shadow(input_data, prediction_aed):
+    shadow = _get_shadow()
+    if shadow is not None:
+        shadow.offer(input_data, prediction_aed)
+
+
+def shadow_stats():
+    """Sampled / dropped counts and the candidate-vs-primary deltas (None if off)."""
+    return _shadow.stats() if _shadow is not None else None
+
+
+def replay_stored_predictions(bundle_path=None, chunk_size=None, limit=None, progress=None):
+    """
+    Rescore the stored Prediction rows with a model bundle (default: the
+    configured model) and report how far it is from what was predicted.
+
+    Args:
+        bundle_path (str): Bundle to replay with (None = MODEL_BUNDLE / Model/)
+        chunk_size (int): Rows per query and model call (default: REPLAY_CHUNK_SIZE)
+        limit (int): Replay at most this many rows
+        progress: Optional callable(rows_done)
+
+    Returns:
+        dict: See shadow.replay_predictions
+    """
+    candidate = load_candidate(bundle_path)
+    return replay_predictions(
+        candidate,
+        _score_candidate,
+        _clean_record,
+        chunk_size=chunk_size or current_app.config.get("REPLAY_CHUNK_SIZE", 5000),
+        limit=limit,
+        progress=progress,
+    )
+
+
+def cache_stats():
+    """Hit / miss / eviction counters of the prediction cache (None if disabled)."""
+    return _cache.stats() if _cache is not None else None
+
+
+def _build_flat_engine(mv):
+    """
+    Flatten the loaded forest and check it against model.predict on a
+    randomized corpus. Falls back to sklearn (returns None) on mismatch.
+    """
+    engine = FlatForest.from_sklearn(mv.model)
+
+    n_rows = current_app.config.get("INFERENCE_VERIFY_ROWS", 256)
+    if n_rows:
+        X = _build_features(sample_inputs(n_rows, mv=mv), mv)
+        deviation = engine.max_deviation(X, mv.model.predict(_model_input(X, mv)))
+        if deviation > current_app.config.get("INFERENCE_VERIFY_TOLERANCE", 1e-9):
+            print(f"Flat forest deviates from model by {deviation}, using sklearn predict")
+            return None
+        print(f"✓ Flat forest verified on {n_rows} rows (max deviation {deviation:.2e})")
+
+    return engine
+
+
+def sample_inputs(n, seed=0, mv=None):
+    """
+    Random but realistic input dicts drawn from the encoder's categories.
+    Used to verify engines and to warm the model up.
+    """
+    mv = mv or _active()
+    rng = np.random.default_rng(seed)
+    categories = dict(zip(mv.categorical_cols, (list(c) for c in mv.encoder.categories_)))
+    furnishings = list(mv.furnish_map)
+
+    records = []
+    for _ in range(n):
+        record = {
+            "Area_in_sqft": float(rng.uniform(300, 10000)),
+            "Beds": int(rng.integers(0, 8)),
+            "Baths": int(rng.integers(0, 8)),
+            "Age_of_listing_in_days": int(rng.integers(0, 365)),
+            "Furnishing": furnishings[rng.integers(len(furnishings))],
+        }
+        for col, values in categories.items():
+            record[col] = values[rng.integers(len(values))]
+        records.append(record)
+    return records
+
+
+def _warm_version(mv, n_rows):
+    """Throwaway predictions so mv's pages are resident before it serves."""
+    if not n_rows:
+        return
+    records = sample_inputs(n_rows, seed=1234, mv=mv)
+    for record in records:
+        _score_records([record], mv)
+    _score_records(records, mv)
+
+
+def warm_up(n_rows=8):
+    """
+    Load the components and run a few throwaway predictions, so the
+    model's pages are resident and first-call overheads are paid before
+    real traffic arrives. Does not touch the prediction cache.
+    """
+    _warm_version(_active(), n_rows)
+
+
+def _engine_features(records, mv):
+    """Feature matrix in the (possibly pruned) layout the flat engine reads."""
+    if mv.engine_compiled is not None:
+        with metrics.stage("features"):
+            return mv.engine_compiled.transform(records)
+    X = np.asarray(_build_features(records, mv))
+    return X if mv.engine_columns is None else X[:, mv.engine_columns]
+
+
+def _score_records(records, mv=None):
+    """
+    Log-scale predictions for a list of input dicts, from the active
+    inference engine. The flat forest wins on single rows and small
+    batches; past FLAT_ENGINE_MAX_ROWS sklearn's compiled tree loop is
+    faster.
+    """
+    mv = mv or _active()
+    if mv.engine is not None and len(records) <= mv.flat_engine_max_rows:
+        X = _engine_features(records, mv)
+        scoring_model, predict_fn = mv.engine, mv.engine.predict
+    else:
+        scoring_model, X, predict_fn = _large_batch_path(records, mv)
+
+    return _run_scoring(mv, scoring_model, X, predict_fn)
+
+
+def _score_matrix(X, mv=None):
+    """
+    Log-scale predictions for a feature matrix already in the full
+    feature_columns layout, routed like _score_records.
+    """
+    mv = mv or _active()
+    if mv.engine is not None and len(X) <= mv.flat_engine_max_rows:
+        X = np.asarray(X)
+        if mv.engine_columns is not None:
+            X = X[:, mv.engine_columns]
+        return _run_scoring(mv, mv.engine, X, mv.engine.predict)
+    return _run_scoring(mv, mv.model, _model_input(X, mv), mv.model.predict)
+
+
+def _run_scoring(mv, scoring_model, X, predict_fn):
+    with metrics.stage("predict"):
+        if mv.parallel is None:
+            return predict_fn(X)
+        # Below PARALLEL_BATCH_THRESHOLD rows this is just predict_fn(X)
+        return mv.parallel.predict(scoring_model, X, predict_fn)
+
+
+def _large_batch_path(records, mv):
+    """
+    (model, feature matrix, predict function) used for inputs too large
+    for the flat engine's small-batch path.
+    """
+    if isinstance(mv.model, FlatForest):
+        return mv.engine, _engine_features(records, mv), mv.engine.predict
+    return mv.model, _model_input(_build_features(records, mv), mv), mv.model.predict
+
+
 def preprocess_and_predict(input_data):
     """
     Preprocess input data and make prediction.
-    
+
     Args:
         input_data (dict): Dictionary with keys:
             - Area_in_sqft (float)
@@ -69,49 +1140,181 @@ def preprocess_and_predict(input_data):
             - Type (str): Property type
             - Location (str): Location name
             - City (str): City name
-    
+
     Returns:
-        float: Predicted annual rent in AED
+        PredictedRent: Predicted annual rent in AED (a float), with the
+            version of the model that produced it in .model_version
     """
-    global _model, _scaler, _encoder, _categorical_cols, _continuous_cols, _feature_columns, _furnish_map
-    
-    # Ensure components are loaded
-    if _model is None:
-        load_model_components()
-    
+    # Ensure components are loaded; this request stays on this version
+    mv = _active()
+
     try:
-        # Convert to DataFrame
-        df = pd.DataFrame([input_data])
-        
-        # 1. Log transform area
-        df["Log_Area"] = np.log1p(df["Area_in_sqft"])
-        df.drop("Area_in_sqft", axis=1, inplace=True)
-        
-        # 2. Binary encode furnishing
-        df["Furnishing"] = df["Furnishing"].map(_furnish_map).fillna(0).astype(float)
-        
-        # 3. One-hot encode categorical features
-        df_encoded = _encoder.transform(df[_categorical_cols])
-        encoded_cols = _encoder.get_feature_names_out(_categorical_cols)
-        
-        df.drop(_categorical_cols, axis=1, inplace=True)
-        for i, col in enumerate(encoded_cols):
-            df[col] = df_encoded[:, i]
-        
-        # 4. Scale continuous features
-        df[_continuous_cols] = _scaler.transform(df[_continuous_cols])
-        
-        # 5. Ensure correct column order
-        df = df[_feature_columns]
-        
-        # 6. Predict (log scale)
-        prediction_log = _model.predict(df)[0]
-        
-        # 7. Convert back to original scale (AED)
-        prediction_aed = float(np.exp(prediction_log))
-        
+        # The model's spelling of the location, so it doesn't encode as zeros
+        input_data = _with_known_location(input_data, mv)
+
+        # Repeated inputs are answered from the cache. The canonical form
+        # (normalized strings, rounded area) is also what gets scored, so a
+        # hit returns exactly what a miss would have computed.
+        cache = _cache
+        if cache is not None:
+            input_data = canonicalize_input(input_data, _cache_area_precision)
+            key = (mv.version,) + cache_key(input_data)
+            generation = cache.generation
+            with metrics.stage("cache_lookup"):
+                cached = cache.get(key)
+            if cached is not None:
+                metrics.PREDICTIONS.inc(source="cache")
+                _offer_to_shadow(input_data, cached)
+                return cached
+
+        # In-grid inputs are answered by lookup + interpolation
+        prediction_log = None
+        if mv.grid is not None:
+            with metrics.stage("grid_lookup"):
+                prediction_log = mv.grid.lookup(input_data)
+
+        batcher = _get_batcher()
+        if prediction_log is not None:
+            metrics.PREDICTIONS.inc(source="grid")
+            prediction_aed = PredictedRent(np.exp(prediction_log), mv.version)
+        elif batcher is not None:
+            # Coalesced with other concurrent requests into one model call
+            metrics.PREDICTIONS.inc(source="model")
+            with metrics.stage("micro_batch"):
+                prediction_aed = batcher.submit(input_data)
+        else:
+            # Steps 1-5 (log, furnish, encode, scale, order) + 6. Predict (log scale)
+            # + 7. Convert back to original scale (AED), inline or in the pool
+            metrics.PREDICTIONS.inc(source="model")
+            prediction_aed = _score_aed([input_data], mv)[0]
+
+        if cache is not None:
+            cache.put(key, prediction_aed, generation)
+
+        # A sampled fraction is also scored by the shadow model, off this thread
+        _offer_to_shadow(input_data, prediction_aed)
+
         return prediction_aed
-        
+
     except Exception as e:
+        metrics.PREDICTION_ERRORS.inc(error=type(e).__name__)
         print(f"Error during prediction: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+# Inputs a sweep can vary (the others stay fixed at the base value)
+SWEEP_FIELDS = ["Area_in_sqft", "Beds", "Baths", "Age_of_listing_in_days"]
+
+
+def predict_sweep(base, axes):
+    """
+    Predict rent over a grid where one or two inputs vary and the rest
+    stay fixed, in a single model call. The base record is encoded once
+    and only the varying continuous columns are rewritten per row.
+
+    Args:
+        base (dict): Input dict with the same keys as preprocess_and_predict
+            (the varying fields may be omitted)
+        axes (list[tuple]): One or two (field, values) pairs, field in
+            SWEEP_FIELDS
+
+    Returns:
+        tuple: (np.ndarray of predicted annual rent in AED, shaped
+            (len(values),) for one axis or (len(values_1), len(values_2))
+            for two; model version that produced it)
+
+    Raises:
+        ValueError: If the axes or the base record are invalid
+    """
+    mv = _active()
+
+    if not 1 <= len(axes) <= 2:
+        raise ValueError("A sweep needs one or two varying fields")
+    fields = [field for field, _ in axes]
+    if len(set(fields)) != len(fields):
+        raise ValueError("Varying fields must be different")
+
+    grids = []
+    for field, values in axes:
+        if field not in SWEEP_FIELDS:
+            raise ValueError(f"Cannot vary {field}; choose from: " + ", ".join(SWEEP_FIELDS))
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim != 1 or len(values) == 0 or not np.all(np.isfinite(values)) or np.any(values < 0):
+            raise ValueError(f"{field} needs a non-empty list of non-negative numbers")
+        grids.append(values)
+
+    record = dict(base)
+    for field, values in zip(fields, grids):
+        record[field] = values[0]
+    record = _clean_record(record)
+    record["Location"] = canonical_location(record["Location"], mv, strict=False)
+
+    mesh = np.meshgrid(*grids, indexing="ij")
+    overrides = {field: grid.ravel() for field, grid in zip(fields, mesh)}
+
+    if mv.compiled is not None:
+        X = mv.compiled.tile(record, overrides)
+    else:
+        n = mesh[0].size
+        records = [dict(record, **{f: v[i] for f, v in overrides.items()}) for i in range(n)]
+        X = _build_features(records, mv)
+
+    return np.exp(_score_matrix(X, mv)).reshape(mesh[0].shape), mv.version
+
+
+def preprocess_and_predict_batch(records):
+    """
+    Preprocess many input records as one matrix and predict them together.
+
+    Every valid record that is not already cached goes through a single
+    encoder, scaler and model call. Invalid records do not fail the
+    batch; they get an error entry in their slot instead.
+
+    Args:
+        records (list[dict]): Records with the same keys as
+            preprocess_and_predict
+
+    Returns:
+        list[dict]: One result per record, in input order. Each is either
+            {"predicted_rent": PredictedRent} or {"error": str}
+    """
+    mv = _active()
+
+    results = [None] * len(records)
+    valid_rows = []
+    valid_positions = []
+
+    # Rows already in the prediction cache are answered from it. Batch
+    # results are not written back, so a large revaluation job does not
+    # evict the entries that serve interactive traffic.
+    cache = _cache
+
+    for i, record in enumerate(records):
+        try:
+            cleaned = _clean_record(record)
+            cleaned["Location"] = canonical_location(cleaned["Location"], mv, strict=False)
+        except ValueError as e:
+            results[i] = {"error": str(e)}
+            continue
+
+        if cache is not None:
+            cleaned = canonicalize_input(cleaned, _cache_area_precision)
+            cached = cache.get((mv.version,) + cache_key(cleaned))
+            if cached is not None:
+                results[i] = {"predicted_rent": cached}
+                continue
+
+        valid_rows.append(cleaned)
+        valid_positions.append(i)
+
+    if valid_rows:
+        try:
+            predictions = _score_aed(valid_rows, mv)
+        except Exception as e:
+            print(f"Error during batch prediction: {e}")
+            raise
+
+        for position, prediction in zip(valid_positions, predictions):
+            results[position] = {"predicted_rent": prediction}
+
+    return results
@@ -0,0 +1,136 @@
+# compiled (DataFrame-free) version of the preprocessing in predictor.py
+import numpy as np
+
+
+class CompiledPreprocessor:
+    """
+    Feature builder compiled once from the fitted encoder and scaler.
+
+    Does the same work as predictor._preprocess_frame (log area, furnishing
+    map, one-hot encode, scale, reorder) but writes straight into a NumPy
+    row laid out in feature_columns order, without building a DataFrame.
+
+    The scaler is applied as (x - mean) / scale, exactly like
+    StandardScaler.transform, so float64 output is bit-for-bit identical
+    to the pandas path.
+    """
+
+    def __init__(self, encoder, scaler, categorical_cols, continuous_cols,
+                 feature_columns, furnish_map, dtype=np.float64, output_columns=None):
+        """
+        output_columns (optional) restricts the output to a subset of
+        feature_columns, in that order; one-hot columns outside it are
+        never written. Used to skip features no tree splits on.
+        """
+        self.categorical_cols = list(categorical_cols)
+        self.continuous_cols = list(continuous_cols)
+        self.feature_columns = list(feature_columns if output_columns is None else output_columns)
+        self.furnish_map = dict(furnish_map)
+        self.dtype = dtype
+        self.n_features = len(self.feature_columns)
+        self.handle_unknown = encoder.handle_unknown
+
+        column_index = {col: i for i, col in enumerate(self.feature_columns)}
+
+        # -------- one-hot: category value -> feature column index --------
+        encoded_cols = list(encoder.get_feature_names_out(self.categorical_cols))
+        drop_idx = getattr(encoder, "drop_idx_", None)
+        self.category_index = []
+        self.known_categories = []
+        position = 0
+        for j, categories in enumerate(encoder.categories_):
+            dropped = None if drop_idx is None else drop_idx[j]
+            lookup = {}
+            for k, category in enumerate(categories):
+                if dropped is not None and k == dropped:
+                    continue  # drop='first' category encodes as all zeros
+                if encoded_cols[position] in column_index:
+                    lookup[category] = column_index[encoded_cols[position]]
+                position += 1
+            self.category_index.append(lookup)
+            self.known_categories.append(set(categories))
+
+        # -------- scaling: gathered into continuous_cols order --------
+        n_cont = len(self.continuous_cols)
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(n_cont)
+        scale = scaler.scale_ if scaler.with_std else np.ones(n_cont)
+
+        kept = [j for j, col in enumerate(self.continuous_cols) if col in column_index]
+        self.continuous_cols = [self.continuous_cols[j] for j in kept]
+        self.continuous_index = np.array(
+            [column_index[col] for col in self.continuous_cols], dtype=np.intp
+        )
+        self.mean = mean[kept]
+        self.scale = scale[kept]
+
+    def _raw_continuous(self, records):
+        """Unscaled continuous matrix (n, len(continuous_cols))."""
+        raw = np.empty((len(records), len(self.continuous_cols)), dtype=np.float64)
+        for j, col in enumerate(self.continuous_cols):
+            if col == "Log_Area":
+                areas = np.array([r["Area_in_sqft"] for r in records], dtype=np.float64)
+                raw[:, j] = np.log1p(areas)
+            elif col == "Furnishing":
+                raw[:, j] = [self.furnish_map.get(r["Furnishing"], 0) for r in records]
+            else:
+                raw[:, j] = [r[col] for r in records]
+        return raw
+
+    def transform(self, records):
+        """
+        Build the feature matrix for a list of raw input dicts.
+
+        Args:
+            records (list[dict]): Same keys as preprocess_and_predict
+
+        Returns:
+            np.ndarray: Shape (len(records), n_features)
+        """
+        X = np.zeros((len(records), self.n_features), dtype=self.dtype)
+
+        # 1-2, 4. log area + furnishing, then scale
+        X[:, self.continuous_index] = (self._raw_continuous(records) - self.mean) / self.scale
+
+        # 3. one-hot encode categorical features
+        for j, col in enumerate(self.categorical_cols):
+            lookup = self.category_index[j]
+            for i, record in enumerate(records):
+                index = lookup.get(record[col])
+                if index is not None:
+                    X[i, index] = 1.0
+                elif self.handle_unknown == "error" and record[col] not in self.known_categories[j]:
+                    raise ValueError(f"Found unknown category {record[col]!r} in column {col}")
+
+        return X
+
+    def transform_one(self, record):
+        """Feature row (1, n_features) for a single input dict."""
+        return self.transform([record])
+
+    def tile(self, record, overrides):
+        """
+        Feature matrix of n copies of record, with some continuous inputs
+        replaced row by row. The one-hot block is encoded once and copied.
+
+        Args:
+            record (dict): Base input dict
+            overrides (dict): Input field (Area_in_sqft, Beds, Baths,
+                Age_of_listing_in_days) -> 1-D array of n per-row values
+
+        Returns:
+            np.ndarray: Shape (n, n_features)
+        """
+        n = len(next(iter(overrides.values())))
+        X = np.repeat(self.transform_one(record), n, axis=0)
+
+        for field, values in overrides.items():
+            col = "Log_Area" if field == "Area_in_sqft" else field
+            if col not in self.continuous_cols:
+                continue  # not an output column (pruned)
+            j = self.continuous_cols.index(col)
+            raw = np.asarray(values, dtype=np.float64)
+            if col == "Log_Area":
+                raw = np.log1p(raw)
+            X[:, self.continuous_index[j]] = (raw - self.mean[j]) / self.scale[j]
+
+        return X
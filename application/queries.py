@@ -0,0 +1,384 @@
+# the prediction history query (shared by history() and the query benchmark)
+import re
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, inspect
+
+from application import db
+from application.models import Prediction
+from application.pagination import keyset_paginate, keyset_select
+from application.search import location_filter, location_rank
+
+# ?sort_by= values and the column each one sorts on
+SORT_MAP = {
+    "created_at": Prediction.created_at,
+    "rent":       Prediction.predicted_rent,
+    "area":       Prediction.area,
+    "beds":       Prediction.bedrooms,
+    "city":       Prediction.city,
+}
+
+# query string parameter -> type, for the history filters
+HISTORY_FILTER_ARGS = {
+    "start_date": str,
+    "end_date": str,
+    "city": str,
+    "furnishing": str,
+    "property_type": str,
+    "location": str,
+    "min_beds": int,
+    "max_beds": int,
+    "min_baths": int,
+    "max_baths": int,
+    "min_area": int,
+    "max_area": int,
+    "min_age": int,
+    "max_age": int,
+}
+
+# (filter, column, operator) for the min/max range filters
+RANGE_FILTERS = [
+    ("min_beds", Prediction.bedrooms, ">="),
+    ("max_beds", Prediction.bedrooms, "<="),
+    ("min_baths", Prediction.bathrooms, ">="),
+    ("max_baths", Prediction.bathrooms, "<="),
+    ("min_area", Prediction.area, ">="),
+    ("max_area", Prediction.area, "<="),
+    ("min_age", Prediction.age_of_listing, ">="),
+    ("max_age", Prediction.age_of_listing, "<="),
+]
+
+
+def history_filters(args):
+    """
+    Read the history filters from request.args (or any dict).
+
+    Returns:
+        dict: Every key of HISTORY_FILTER_ARGS; missing / invalid
+            numbers are None, missing strings "" (city, furnishing
+            and property_type default to "all")
+    """
+    filters = {}
+    for name, type_ in HISTORY_FILTER_ARGS.items():
+        if type_ is int:
+            value = args.get(name)
+            try:
+                filters[name] = int(value) if value not in (None, "") else None
+            except (TypeError, ValueError):
+                filters[name] = None
+        else:
+            filters[name] = args.get(name, "")
+    for name in ("city", "furnishing", "property_type"):
+        filters[name] = filters[name] or "all"
+    return filters
+
+
+def history_sort(sort_by, filters=None):
+    """
+    (sort key, column) for ?sort_by=, falling back to created_at.
+    "relevance" ranks by how well location matches the location filter
+    (exact, prefix, word start, anywhere) and needs one.
+    """
+    location = ((filters or {}).get("location") or "").strip()
+    if sort_by == "relevance" and location:
+        return "relevance", location_rank(location)
+    return (sort_by, SORT_MAP[sort_by]) if sort_by in SORT_MAP else ("created_at", Prediction.created_at)
+
+
+def filtered_history_query(user_id, filters):
+    """
+    The history() query without its ORDER BY: one user's predictions
+    (user_id None = the anonymous ones) with the filters applied.
+
+    Args:
+        user_id (int): Owner of the predictions, or None
+        filters (dict): As returned by history_filters()
+
+    Returns:
+        tuple: (select statement, whether a date could not be parsed)
+    """
+    query = db.select(Prediction)
+    if user_id is not None:
+        query = query.where(Prediction.user_id == user_id)
+    else:
+        query = query.where(Prediction.user_id.is_(None))
+
+    # ---------- date range filter ----------
+    date_error = False
+    try:
+        if filters.get("start_date"):
+            start_date = datetime.strptime(filters["start_date"], "%Y-%m-%d")
+            query = query.where(Prediction.created_at >= start_date)
+
+        if filters.get("end_date"):
+            end_date = datetime.strptime(filters["end_date"], "%Y-%m-%d")
+            end_date = end_date.replace(hour=23, minute=59, second=59)
+            query = query.where(Prediction.created_at <= end_date)
+    except ValueError:
+        date_error = True
+
+    # ---------- field filters ----------
+    if filters.get("city", "all") != "all":
+        query = query.where(Prediction.city == filters["city"])
+
+    if filters.get("furnishing", "all") != "all":
+        query = query.where(Prediction.furnishing == filters["furnishing"])
+
+    if filters.get("property_type", "all") != "all":
+        query = query.where(Prediction.property_type == filters["property_type"])
+
+    location = filters.get("location") or ""
+    if location.strip():
+        # FTS5 trigram index on SQLite, ILIKE elsewhere (application/search.py)
+        query = query.where(location_filter(location))
+
+    for name, column, op in RANGE_FILTERS:
+        value = filters.get(name)
+        if value is not None:
+            query = query.where(column >= value if op == ">=" else column <= value)
+
+    return query, date_error
+
+
+def build_history_query(user_id, filters, sort_by="created_at", order="desc"):
+    """
+    filtered_history_query() in sort order (for OFFSET pagination).
+
+    Returns:
+        tuple: (select statement, whether a date could not be parsed)
+    """
+    query, date_error = filtered_history_query(user_id, filters)
+    _, sort_col = history_sort(sort_by, filters)
+    query = query.order_by(sort_col.asc() if order == "asc" else sort_col.desc())
+    return query, date_error
+
+
+def history_page(user_id, filters, sort_by="created_at", order="desc", per_page=10, cursor=None,
+                 total_mode="exact", total_cap=10000):
+    """
+    One keyset page of a user's filtered history.
+
+    Returns:
+        tuple: (KeysetPage, whether a date could not be parsed)
+    """
+    query, date_error = filtered_history_query(user_id, filters)
+    sort_key, sort_col = history_sort(sort_by, filters)
+    page = keyset_paginate(query, sort_key, sort_col, Prediction.id, order, per_page, cursor,
+                           total_mode=total_mode, total_cap=total_cap)
+    return page, date_error
+
+
+def history_page_statements(user_id, filters, sort_by="created_at", order="desc", per_page=10):
+    """
+    The statements history_page() runs, by name: "count" (the total, on
+    the first page), "first page" and "next page" (after a cursor).
+
+    Returns:
+        dict: name -> select statement
+    """
+    query, _ = filtered_history_query(user_id, filters)
+    _, sort_col = history_sort(sort_by, filters)
+    descending = order != "asc"
+    first = keyset_select(query, sort_col, Prediction.id, descending).limit(per_page + 1)
+
+    # a real row to continue after, so the comparison binds the column's type
+    row = db.session.execute(first.limit(1)).first()
+    after = (row.keyset_value, row[0].id) if row is not None else ("", 0)
+
+    return {
+        "count": db.select(func.count()).select_from(query.subquery()),
+        "first page": first,
+        "next page": keyset_select(query, sort_col, Prediction.id, descending, after).limit(per_page + 1),
+    }
+
+
+# -------- indexes + plan advisor (flask explain-history) --------
+
+# plan lines that read the whole table, or sort it instead of reading an index in order
+_SCAN_LINE = re.compile(rf"^(SCAN (TABLE )?{Prediction.__tablename__}\b|.*Seq Scan on {Prediction.__tablename__}\b)")
+_SORT_LINE = re.compile(r"(USE TEMP B-TREE FOR (RIGHT PART OF )?ORDER BY|^\s*(->\s*)?Sort\b)")
+
+
+def plan_problems(plan):
+    """
+    What is wrong with an explain_query() plan.
+
+    Returns:
+        list: "scan" if the table is read in full, "sort" if the rows
+            are sorted instead of read in index order
+    """
+    problems = []
+    if any(_SCAN_LINE.search(line) for line in plan):
+        problems.append("scan")
+    if any(_SORT_LINE.search(line) for line in plan):
+        problems.append("sort")
+    return problems
+
+
+def missing_indexes():
+    """Prediction indexes declared in the model but not in the database."""
+    existing = {index["name"] for index in inspect(db.engine).get_indexes(Prediction.__tablename__)}
+    return [index for index in Prediction.__table__.indexes if index.name not in existing]
+
+
+def create_missing_indexes():
+    """
+    Create the declared Prediction indexes a database made before they
+    existed is missing (db.create_all() skips tables that exist).
+
+    Returns:
+        list: Names of the indexes created
+    """
+    created = []
+    # on the session's connection, so its open transaction sees them too
+    for index in missing_indexes():
+        index.create(db.session.connection())
+        created.append(index.name)
+    db.session.commit()
+    return created
+
+
+def advise_history_indexes(user_id, cases=None, per_page=10):
+    """
+    Explain every statement history() runs, for every history_bench_cases()
+    shape, and flag the ones that still scan or sort the table.
+
+    Args:
+        user_id (int): Whose history to plan for (None = anonymous)
+        cases (list): (name, filters, sort_by, order); default history_bench_cases()
+        per_page (int): Rows per page, as in history()
+
+    Returns:
+        list: One dict per statement: case, statement, plan, problems
+    """
+    report = []
+    for name, filters, sort_by, order in cases or history_bench_cases():
+        for statement, query in history_page_statements(user_id, filters, sort_by, order, per_page).items():
+            plan = explain_query(query)
+            report.append(dict(case=name, statement=statement, plan=plan, problems=plan_problems(plan)))
+    return report
+
+
+# -------- query benchmark (flask benchmark-history) --------
+
+def history_bench_cases(today=None):
+    """
+    The filter / sort combinations history() is used with, as
+    (name, filters, sort_by, order).
+    """
+    today = today or datetime.now()
+    month_ago = (today - timedelta(days=30)).strftime("%Y-%m-%d")
+    year_ago = (today - timedelta(days=365)).strftime("%Y-%m-%d")
+    today = today.strftime("%Y-%m-%d")
+    no_filters = history_filters({})
+
+    def case(name, sort_by="created_at", order="desc", **filters):
+        return name, dict(no_filters, **filters), sort_by, order
+
+    cases = [case(f"sort {key} {order}", key, order) for key in SORT_MAP for order in ("desc", "asc")]
+    cases += [
+        case("last 30 days", start_date=month_ago, end_date=today),
+        case("last year by rent", "rent", start_date=year_ago, end_date=today),
+        case("city", city="Dubai"),
+        case("city by rent", "rent", city="Dubai"),
+        case("furnishing + type", furnishing="Furnished", property_type="Apartment"),
+        case("location ilike", location="marina"),
+        case("location ilike by area", "area", location="jumeirah"),
+        case("beds range", min_beds=2, max_beds=3),
+        case("baths range", min_baths=2, max_baths=4),
+        case("area range", "area", min_area=800, max_area=1500),
+        case("age range", min_age=0, max_age=30),
+        case("city + beds + area", "rent", city="Dubai", min_beds=1, max_beds=2, min_area=500, max_area=1200),
+        case("everything", "created_at", start_date=year_ago, end_date=today, city="Dubai",
+             furnishing="Unfurnished", property_type="Apartment", location="a", min_beds=1, max_beds=4,
+             min_baths=1, max_baths=4, min_area=300, max_area=5000, min_age=0, max_age=180),
+    ]
+    return cases
+
+
+def explain_query(query):
+    """
+    The database's plan for query: EXPLAIN QUERY PLAN on SQLite,
+    EXPLAIN elsewhere.
+
+    Returns:
+        list: One string per plan line
+    """
+    dialect = db.engine.dialect
+    if dialect.name == "sqlite":
+        compiled = query.compile(dialect=dialect)
+        params = []
+        for name in compiled.positiontup:
+            value = compiled.params[name]
+            params.append(value.isoformat(" ") if isinstance(value, datetime) else value)
+        rows = db.session.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), tuple(params))
+        return [row[-1] for row in rows]
+
+    compiled = query.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    rows = db.session.connection().exec_driver_sql("EXPLAIN " + str(compiled))
+    return [str(row[0]) for row in rows]
+
+
+def _percentiles(times):
+    times = np.array(times) * 1000
+    return {
+        "p50_ms": float(np.percentile(times, 50)),
+        "p95_ms": float(np.percentile(times, 95)),
+        "p99_ms": float(np.percentile(times, 99)),
+    }
+
+
+def benchmark_history(user_id, repeat=20, page=1, per_page=10, cases=None, explain=False, pagination="keyset"):
+    """
+    Time every history query shape for one user, the way history() runs
+    it: a keyset page (history_page, total counted on the first page), or
+    with pagination="offset" db.paginate (a COUNT + one OFFSET page).
+
+    Args:
+        user_id (int): Whose history to query (None = anonymous)
+        repeat (int): Timed runs per case
+        page (int): Page to fetch (deep pages show OFFSET cost)
+        per_page (int): Rows per page, as in history()
+        cases (list): (name, filters, sort_by, order); default history_bench_cases()
+        explain (bool): Also return each query's plan
+        pagination (str): "keyset" or "offset"
+
+    Returns:
+        list: One dict per case: name, total rows, p50/p95/p99 in ms (and plan)
+    """
+    results = []
+    for name, filters, sort_by, order in cases or history_bench_cases():
+        query, _ = build_history_query(user_id, filters, sort_by, order)
+
+        if pagination == "keyset":
+            # follow next cursors (untimed) to the page being measured
+            cursor = None
+            current, _ = history_page(user_id, filters, sort_by, order, per_page)
+            while current.page < page and current.next_cursor:
+                cursor = current.next_cursor
+                current, _ = history_page(user_id, filters, sort_by, order, per_page, cursor)
+
+            def fetch():
+                return history_page(user_id, filters, sort_by, order, per_page, cursor)[0]
+        else:
+            def fetch():
+                return db.paginate(query, page=page, per_page=per_page, error_out=False)
+
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result_page = fetch()
+            times.append(time.perf_counter() - started)
+        total = result_page.total
+
+        result = dict(name=name, sort_by=sort_by, order=order, total=total, **_percentiles(times))
+        if explain:
+            if pagination == "keyset":
+                statements = history_page_statements(user_id, filters, sort_by, order, per_page)
+                result["plan"] = explain_query(statements["first page"])
+            else:
+                result["plan"] = explain_query(query)
+        results.append(result)
+    return results
@@ -0,0 +1,180 @@
+# versioned model registry: a new model loads while the current one serves
+import os
+import threading
+import time
+from collections import deque
+
+
+class PredictedRent(float):
+    """A prediction in AED that remembers which model version produced it."""
+
+    __slots__ = ("model_version",)
+
+    def __new__(cls, value, model_version=None):
+        obj = super().__new__(cls, value)
+        obj.model_version = model_version
+        return obj
+
+    def __reduce__(self):
+        return (PredictedRent, (float(self), self.model_version))
+
+
+class ModelVersion:
+    """
+    Every component of one loaded model, plus what was derived from them
+    (compiled preprocessor, flat engine, rent grid, ...).
+
+    A version is fully built and warmed before it is published and is
+    never changed afterwards, so a request that took a reference to it
+    finishes on it even if a newer version is swapped in meanwhile.
+    """
+
+    def __init__(self, version, model, scaler, encoder, categorical_cols, continuous_cols,
+                 feature_columns, furnish_map, model_info, source=None):
+        self.version = version
+        self.model = model
+        self.scaler = scaler
+        self.encoder = encoder
+        self.categorical_cols = categorical_cols
+        self.continuous_cols = continuous_cols
+        self.feature_columns = feature_columns
+        self.furnish_map = furnish_map
+        self.model_info = model_info
+        self.source = source  # bundle or directory it was loaded from
+        self.loaded_at = time.time()
+
+        # derived, filled in by predictor before publishing
+        self.compiled = None         # CompiledPreprocessor, None when PREPROCESS_ENGINE = "pandas"
+        self.engine = None           # FlatForest, None when INFERENCE_ENGINE = "sklearn"
+        self.flat_engine_max_rows = 64
+        self.engine_columns = None   # feature indices engine reads, None = all
+        self.engine_compiled = None  # CompiledPreprocessor building only engine_columns
+        self.parallel = None         # ParallelScorer, None when PARALLEL_WORKERS = 1
+        self.grid = None             # RentGrid, None when RENT_GRID_MODE = "off"
+        self.locations = None        # LocationIndex of the encoder's locations
+        self.flat_dir = None         # directory of the memory-mapped forest (MODEL_STORAGE = "mmap")
+
+    @property
+    def fingerprint(self):
+        """Identifies the model, so artifacts built for another one are not reused."""
+        return f"{self.version}:{(self.model_info or {}).get('training_date', '')}"
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "source": self.source,
+            "model_type": (self.model_info or {}).get("model_type"),
+            "training_date": str((self.model_info or {}).get("training_date", "")) or None,
+            "loaded_at": self.loaded_at,
+        }
+
+
+class ModelRegistry:
+    """
+    Holds the published ModelVersion and swaps in new ones atomically.
+
+    Readers call current() once per request and use that version
+    throughout; publish() replaces the reference in one assignment.
+    """
+
+    def __init__(self, history=10):
+        self._current = None
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history)
+        self.reload = {"status": "idle", "error": None, "started_at": None, "finished_at": None}
+
+    def current(self):
+        return self._current
+
+    def publish(self, version):
+        """Make version the one serving requests; returns the previous one."""
+        with self._lock:
+            previous = self._current
+            self._current = version
+            self._history.append(dict(version.describe(), published_at=time.time()))
+        if previous is not None:
+            print(f"✓ Model version {version.version} replaced {previous.version}")
+        return previous
+
+    def clear(self):
+        with self._lock:
+            self._current = None
+
+    def status(self):
+        current = self._current
+        return {
+            "current": current.describe() if current is not None else None,
+            "history": list(self._history),
+            "reload": dict(self.reload),
+        }
+
+
+class ModelWatcher:
+    """
+    Polls the modification times of the model files and calls on_change()
+    once they changed and then stayed the same for one more interval (so
+    a file still being copied is not loaded half-written).
+    """
+
+    def __init__(self, paths_fn, on_change, interval=5.0):
+        self.paths_fn = paths_fn
+        self.on_change = on_change
+        self.interval = interval
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self.running = False
+
+    def _snapshot(self):
+        stamps = {}
+        for path in self.paths_fn():
+            try:
+                stat = os.stat(path)
+                stamps[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                stamps[path] = None
+        return stamps
+
+    def start(self):
+        # threads do not survive fork, so each worker process polls on its own
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name="model-watch", daemon=True)
+        self._thread.start()
+        self.running = True
+
+    def stop(self):
+        self._stop.set()
+        self.running = False
+
+    def _try_snapshot(self):
+        # a broken paths_fn must not kill the thread: log it, try again next interval
+        try:
+            return self._snapshot()
+        except Exception as e:
+            print(f"Model watch could not check the model files: {e}")
+            return None
+
+    def _run(self, stop):
+        seen = self._try_snapshot()
+        pending = None
+        while not stop.wait(self.interval):
+            now = self._try_snapshot()
+            if now is None:
+                continue
+            if seen is None:
+                seen = now
+                continue
+            if now != seen:
+                if now == pending:
+                    seen, pending = now, None
+                    try:
+                        self.on_change()
+                    except Exception as e:
+                        print(f"Model reload after file change failed: {e}")
+                else:
+                    pending = now  # changed; wait one interval for it to settle
+            else:
+                pending = None
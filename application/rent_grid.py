@@ -0,0 +1,199 @@
+# precomputed rent grid: lookup + interpolation for the most common inputs
+import itertools
+import os
+
+import numpy as np
+
+
+class RentGrid:
+    """
+    Log-scale model output precomputed over a fixed grid of inputs.
+
+    Categorical and small integer inputs (location + city, type, beds,
+    baths, furnishing) index the grid exactly. Area and listing age are
+    continuous, so the grid samples them at nodes (area spaced evenly in
+    log1p(area), as the model sees it) and answers in between by bilinear
+    interpolation. Anything outside the grid gets None from lookup() and
+    is scored by the forest.
+    """
+
+    def __init__(self, locations, cities, types, furnishings, max_beds, max_baths,
+                 log_area, ages, values, model_fingerprint=""):
+        self.locations = list(locations)
+        self.cities = list(cities)  # city of each location
+        self.types = list(types)
+        self.furnishings = list(furnishings)
+        self.max_beds = int(max_beds)
+        self.max_baths = int(max_baths)
+        self.log_area = np.asarray(log_area, dtype=np.float64)
+        self.ages = np.asarray(ages, dtype=np.float64)
+        # (location, type, beds, baths, furnishing, area node, age node)
+        self.values = np.asarray(values, dtype=np.float32)
+        self.model_fingerprint = model_fingerprint
+
+        self._location_index = {loc: i for i, loc in enumerate(self.locations)}
+        self._type_index = {t: i for i, t in enumerate(self.types)}
+        self._furnishing_index = {f: i for i, f in enumerate(self.furnishings)}
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def build(cls, score_fn, locations, cities, types, furnishings, max_beds=6, max_baths=6,
+              area_range=(300, 20000), area_points=16, max_age=365, age_points=4,
+              model_fingerprint=""):
+        """
+        Score every grid point.
+
+        Args:
+            score_fn: score_fn(base_record, overrides) -> log predictions,
+                one per row of the overrides (see CompiledPreprocessor.tile)
+            locations, cities: Grid locations and the city of each
+            types, furnishings: Grid property types and furnishing values
+            area_range (tuple): Smallest and largest area node (sqft)
+            area_points, age_points (int): Nodes along area and age
+
+        Returns:
+            RentGrid
+        """
+        log_area = np.linspace(np.log1p(area_range[0]), np.log1p(area_range[1]), area_points)
+        ages = np.linspace(0, max_age, age_points)
+
+        beds = np.arange(max_beds + 1)
+        baths = np.arange(max_baths + 1)
+        mesh = np.meshgrid(beds, baths, np.expm1(log_area), ages, indexing="ij")
+        overrides = {
+            "Beds": mesh[0].ravel(),
+            "Baths": mesh[1].ravel(),
+            "Area_in_sqft": mesh[2].ravel(),
+            "Age_of_listing_in_days": mesh[3].ravel(),
+        }
+
+        values = np.empty(
+            (len(locations), len(types), len(beds), len(baths), len(furnishings), area_points, age_points),
+            dtype=np.float32,
+        )
+        # one model call per (location, type, furnishing), over all numeric nodes
+        for (li, (location, city)), (ti, ptype), (fi, furnishing) in itertools.product(
+                enumerate(zip(locations, cities)), enumerate(types), enumerate(furnishings)):
+            base = {
+                "Area_in_sqft": float(overrides["Area_in_sqft"][0]),
+                "Beds": 0,
+                "Baths": 0,
+                "Age_of_listing_in_days": 0,
+                "Furnishing": furnishing,
+                "Type": ptype,
+                "Location": location,
+                "City": city,
+            }
+            predictions = np.asarray(score_fn(base, overrides))
+            values[li, ti, :, :, fi] = predictions.reshape(mesh[0].shape)
+
+        return cls(locations, cities, types, furnishings, max_beds, max_baths,
+                   log_area, ages, values, model_fingerprint)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    @property
+    def points(self):
+        return self.values.size
+
+    def lookup(self, record):
+        """
+        Interpolated log-scale prediction for an input dict, or None if
+        the record falls outside the grid.
+        """
+        result = self._lookup(record)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def _lookup(self, record):
+        li = self._location_index.get(record["Location"])
+        if li is None or record["City"] != self.cities[li]:
+            return None
+        ti = self._type_index.get(record["Type"])
+        fi = self._furnishing_index.get(record["Furnishing"])
+        if ti is None or fi is None:
+            return None
+
+        beds, baths = record["Beds"], record["Baths"]
+        if beds != int(beds) or baths != int(baths):
+            return None
+        if not (0 <= beds <= self.max_beds and 0 <= baths <= self.max_baths):
+            return None
+
+        x = np.log1p(float(record["Area_in_sqft"]))
+        y = float(record["Age_of_listing_in_days"])
+        if not (self.log_area[0] <= x <= self.log_area[-1] and self.ages[0] <= y <= self.ages[-1]):
+            return None
+
+        i, tx = self._cell(self.log_area, x)
+        j, ty = self._cell(self.ages, y)
+        v = self.values[li, ti, int(beds), int(baths), fi]
+        return float(
+            (1 - tx) * (1 - ty) * v[i, j]
+            + tx * (1 - ty) * v[i + 1, j]
+            + (1 - tx) * ty * v[i, j + 1]
+            + tx * ty * v[i + 1, j + 1]
+        )
+
+    @staticmethod
+    def _cell(nodes, x):
+        """Index of the cell containing x and x's position inside it (0-1)."""
+        if len(nodes) == 1:
+            return 0, 0.0
+        i = min(int(np.searchsorted(nodes, x, side="right")) - 1, len(nodes) - 2)
+        return i, (x - nodes[i]) / (nodes[i + 1] - nodes[i])
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            locations=np.array(self.locations),
+            cities=np.array(self.cities),
+            types=np.array(self.types),
+            furnishings=np.array(self.furnishings),
+            max_beds=self.max_beds,
+            max_baths=self.max_baths,
+            log_area=self.log_area,
+            ages=self.ages,
+            values=self.values,
+            model_fingerprint=np.array(self.model_fingerprint),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Rent grid not found: {path}")
+        with np.load(path) as data:
+            return cls(
+                data["locations"].tolist(),
+                data["cities"].tolist(),
+                data["types"].tolist(),
+                data["furnishings"].tolist(),
+                int(data["max_beds"]),
+                int(data["max_baths"]),
+                data["log_area"],
+                data["ages"],
+                data["values"],
+                str(data["model_fingerprint"]),
+            )
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "points": self.points,
+            "bytes": self.nbytes,
+            "area_points": len(self.log_area),
+            "age_points": len(self.ages),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,13 +1,38 @@
 from application import app, db
-from flask import render_template, request, flash, redirect, url_for, jsonify
+from flask import render_template, request, flash, redirect, url_for, jsonify, g, Response
 from application.forms import PredictionForm, get_location_choices
 # user auth
 from application.models import User, Prediction
-from application.predictor import preprocess_and_predict
+from application.predictor import (
+    preprocess_and_predict,
+    preprocess_and_predict_batch,
+    predict_sweep,
+    cache_stats,
+    batching_stats,
+    executor_stats,
+    parallel_stats,
+    rent_grid_stats,
+    shadow_stats,
+    model_memory_report,
+    model_registry_status,
+    reload_model_components,
+    start_background_reload,
+    allowed_bundle_path,
+    canonical_location,
+    location_index,
+)
 from datetime import datetime
+import hmac
+import time
+import numpy as np
 from application.forms import get_location_choices
 # user auth imports 
 from application.auth_forms import LoginForm, RegisterForm
+from application import warmup
+from application import metrics
+from application.writebehind import prediction_values, write_queue, write_queue_stats
+from application.queries import history_filters, history_page, history_sort
+from application.pagination import keyset_paginate
 from flask_login import (
     login_user,
     logout_user,
@@ -29,12 +54,12 @@ def index_page():
     form = PredictionForm()
     locations = get_location_choices()
 
-    # 1) Read page number from query string (?page=2 etc.)
-    page = request.args.get("page", 1, type=int)
+    # 1) Cursor of the page to show (?cursor=..., from the Prev / Next links)
+    cursor = request.args.get("cursor")
     per_page = 5    
 
-    # 2) Base query (newest first)
-    query = db.select(Prediction).order_by(Prediction.id.desc())
+    # 2) Base query (newest first, by id)
+    query = db.select(Prediction)
     
     # Onlt show current user's predictions if logged in
     if current_user.is_authenticated:
@@ -42,12 +67,19 @@ def index_page():
     else:
         query = query.where(Prediction.user_id.is_(None))
 
-    # 3) Paginate
-    pagination = db.paginate(query, page=page, per_page=per_page, error_out=False)
+    # 3) Paginate (keyset on id, application/pagination.py)
+    pagination = keyset_paginate(
+        query, "id", Prediction.id, Prediction.id, "desc", per_page, cursor,
+        total_mode=app.config.get("HISTORY_TOTAL_MODE", "exact"),
+        total_cap=app.config.get("HISTORY_TOTAL_CAP", 10000),
+    )
     entries = pagination.items
 
     # 4) True latest prediction (for big card + "Latest" badge)
-    latest = db.session.execute(query.limit(1)).scalars().first()
+    if pagination.page == 1 and not pagination.has_prev:
+        latest = entries[0] if entries else None
+    else:
+        latest = db.session.execute(query.order_by(Prediction.id.desc()).limit(1)).scalars().first()
 
     return render_template(
         "index.html",
@@ -62,15 +94,46 @@ def index_page():
 
 
 
+def store_predictions(preds, write_behind=True):
+    """
+    Save new Prediction objects: queued for the write-behind thread when
+    WRITE_BEHIND_ENABLED (and write_behind), else added and committed in
+    one transaction.
+
+    Returns:
+        list: Their ids, in order (None while queued; their public_id
+        already identifies them)
+
+    Raises:
+        TimeoutError: If the write-behind queue stays full
+    """
+    queue = write_queue() if write_behind else None
+    if queue is not None:
+        queue.submit(prediction_values(pred) for pred in preds)
+        return [None] * len(preds)
+
+    for pred in preds:
+        db.session.add(pred)
+    with metrics.stage("db_commit"):
+        db.session.commit()
+    return [pred.id for pred in preds]
+
+
 def add_entry(new_entry):
+    """
+    Save one Prediction, flashing the error if it can't be.
+
+    Returns:
+        bool: Whether it was saved (or queued for write-behind)
+    """
     try:
-        db.session.add(new_entry)
-        db.session.commit()
-        return new_entry.id
+        # the page the form redirects to shows this row, so it can't wait in the queue
+        store_predictions([new_entry], write_behind=False)
+        return True
     except Exception as error:
         db.session.rollback()
         flash(str(error), "danger")
-        return None
+        return False
 
 
 def get_entries():
@@ -131,137 +194,34 @@ def history():
     form = PredictionForm()
 
     # ---------- query params ----------
-    sort_by = request.args.get("sort_by", "created_at")
-    order = request.args.get("order", "desc")
-    page = request.args.get("page", 1, type=int)
+    order = "asc" if request.args.get("order") == "asc" else "desc"
+    cursor = request.args.get("cursor")
     per_page = 10
 
     # ---------- ALL FILTERS ----------
-    start_date_str = request.args.get("start_date", "")
-    end_date_str   = request.args.get("end_date", "")
-    city_filter        = request.args.get("city", "all")
-    furnishing_filter  = request.args.get("furnishing", "all")
-    type_filter        = request.args.get("property_type", "all")
-    min_beds           = request.args.get("min_beds", type=int)
-    max_beds           = request.args.get("max_beds", type=int)
-    min_area           = request.args.get("min_area", type=int)
-    max_area           = request.args.get("max_area", type=int)
-    location_filter    = request.args.get('location', '')
-    min_baths          = request.args.get('min_baths', type=int)
-    max_baths          = request.args.get('max_baths', type=int)
-    min_age            = request.args.get('min_age', type=int)
-    max_age            = request.args.get('max_age', type=int)
+    filters = history_filters(request.args)
+    # unknown sorts (or relevance without a location) fall back to created_at
+    sort_by, _ = history_sort(request.args.get("sort_by", "created_at"), filters)
 
     # DEBUG: Print all filter values
     print("=" * 50)
     print("FILTER VALUES:")
-    print(f"city_filter: {city_filter}")
-    print(f"furnishing_filter: {furnishing_filter}")
-    print(f"type_filter: {type_filter}")
-    print(f"location_filter: '{location_filter}'")
-    print(f"min_beds: {min_beds}")
-    print(f"max_beds: {max_beds}")
-    print(f"min_baths: {min_baths}")
-    print(f"max_baths: {max_baths}")
-    print(f"min_area: {min_area}")
-    print(f"max_area: {max_area}")
-    print(f"min_age: {min_age}")
-    print(f"max_age: {max_age}")
+    for name, value in filters.items():
+        print(f"{name}: {value!r}")
     print("=" * 50)
 
-    # ---------- base query ----------
-    query = db.select(Prediction)
-    # limit to current user's predictions if logged in
-    if current_user.is_authenticated:
-        query = query.where(Prediction.user_id == current_user.id)
-    else:
-        query = query.where(Prediction.user_id.is_(None))
-    # ---------- date range filter ----------
-    try:
-        if start_date_str:
-            start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
-            query = query.where(Prediction.created_at >= start_date)
-            print(f"Applied start_date filter: {start_date}")
-
-        if end_date_str:
-            end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
-            end_date = end_date.replace(hour=23, minute=59, second=59)
-            query = query.where(Prediction.created_at <= end_date)
-            print(f"Applied end_date filter: {end_date}")
-    except ValueError:
+    # ---------- filtered query, one keyset page (application/queries.py) ----------
+    pagination, date_error = history_page(
+        current_user.id if current_user.is_authenticated else None,
+        filters, sort_by, order, per_page, cursor,
+        total_mode=app.config.get("HISTORY_TOTAL_MODE", "exact"),
+        total_cap=app.config.get("HISTORY_TOTAL_CAP", 10000),
+    )
+    if date_error:
         flash("Invalid date format. Please use the date picker.", "warning")
-
-    # ---------- ALL FIELD FILTERS ----------
-    if city_filter and city_filter != "all":
-        query = query.where(Prediction.city == city_filter)
-        print(f"Applied city filter: {city_filter}")
-
-    if furnishing_filter and furnishing_filter != "all":
-        query = query.where(Prediction.furnishing == furnishing_filter)
-        print(f"Applied furnishing filter: {furnishing_filter}")
-
-    if type_filter and type_filter != "all":
-        query = query.where(Prediction.property_type == type_filter)
-        print(f"Applied type filter: {type_filter}")
-
-    
-    if location_filter and location_filter.strip():  
-        query = query.where(Prediction.location.ilike(f'%{location_filter}%'))
-        print(f"Applied location filter: {location_filter}")
-
-    # Beds filter
-    if min_beds is not None:
-        query = query.where(Prediction.bedrooms >= min_beds)
-        print(f"Applied min_beds filter: {min_beds}")
-    if max_beds is not None:
-        query = query.where(Prediction.bedrooms <= max_beds)
-        print(f"Applied max_beds filter: {max_beds}")
-
-    # Baths filter
-    if min_baths is not None:
-        query = query.where(Prediction.bathrooms >= min_baths)
-        print(f"Applied min_baths filter: {min_baths}")
-    if max_baths is not None:
-        query = query.where(Prediction.bathrooms <= max_baths)
-        print(f"Applied max_baths filter: {max_baths}")
-
-    # Area filter
-    if min_area is not None:
-        query = query.where(Prediction.area >= min_area)
-        print(f"Applied min_area filter: {min_area}")
-    if max_area is not None:
-        query = query.where(Prediction.area <= max_area)
-        print(f"Applied max_area filter: {max_area}")
-
-    # Age of listing filter
-    if min_age is not None:
-        query = query.where(Prediction.age_of_listing >= min_age)
-        print(f"Applied min_age filter: {min_age}")
-    if max_age is not None:
-        query = query.where(Prediction.age_of_listing <= max_age)
-        print(f"Applied max_age filter: {max_age}")
-
-    # ---------- sorting ----------
-    sort_map = {
-        "created_at": Prediction.created_at,
-        "rent":       Prediction.predicted_rent,
-        "area":       Prediction.area,
-        "beds":       Prediction.bedrooms,
-        "city":       Prediction.city,
-    }
-    sort_col = sort_map.get(sort_by, Prediction.created_at)
-    sort_expr = sort_col.asc() if order == "asc" else sort_col.desc()
-    query = query.order_by(sort_expr)
-
-
-    print(f"\nFinal query: {query}")
-    
-    # ---------- pagination ----------
-    pagination = db.paginate(query, page=page, per_page=per_page, error_out=False)
     entries = pagination.items
-    
 
-    print(f"Total items found: {pagination.total}")
+    print(f"Total items found: {pagination.total_label}")
     print(f"Items on this page: {len(entries)}")
     print("=" * 50)
 
@@ -273,20 +233,20 @@ def history():
         pagination=pagination,
         sort_by=sort_by,
         order=order,
-        start_date=start_date_str,
-        end_date=end_date_str,
-        city_filter=city_filter,
-        furnishing_filter=furnishing_filter,
-        type_filter=type_filter,
-        min_beds=min_beds,
-        max_beds=max_beds,
-        min_area=min_area,
-        max_area=max_area,
-        location_filter=location_filter,
-        min_baths=min_baths,
-        max_baths=max_baths,
-        min_age=min_age,
-        max_age=max_age
+        start_date=filters["start_date"],
+        end_date=filters["end_date"],
+        city_filter=filters["city"],
+        furnishing_filter=filters["furnishing"],
+        type_filter=filters["property_type"],
+        min_beds=filters["min_beds"],
+        max_beds=filters["max_beds"],
+        min_area=filters["min_area"],
+        max_area=filters["max_area"],
+        location_filter=filters["location"],
+        min_baths=filters["min_baths"],
+        max_baths=filters["max_baths"],
+        min_age=filters["min_age"],
+        max_age=filters["max_age"]
     )
     
 # Routes for user registration and login 
@@ -337,11 +297,14 @@ def predict():
                 city=city,
                 location=location,
                 predicted_rent=predicted_rent,
+                model_version=model_version_of(predicted_rent),
                 created_at=created_at,
                 user_id=current_user.id if current_user.is_authenticated else None
             )
 
-            add_entry(new_entry)
+            if not add_entry(new_entry):
+                # not saved (add_entry flashed why): stay at form
+                return redirect(url_for("index_page", _anchor="predict-form"))
 
             flash("Prediction successful!", "success")
             
@@ -452,6 +415,207 @@ def logout():
 # REST API ENDPOINTS (CA1 PART 3)
 # ==============================
 
+API_REQUIRED_FIELDS = [
+    "area",
+    "bedrooms",
+    "bathrooms",
+    "age_of_listing",
+    "furnishing",
+    "property_type",
+    "city",
+    "location",
+]
+
+
+# API field name -> predictor input key
+API_TO_MODEL_FIELDS = {
+    "area": "Area_in_sqft",
+    "bedrooms": "Beds",
+    "bathrooms": "Baths",
+    "age_of_listing": "Age_of_listing_in_days",
+    "furnishing": "Furnishing",
+    "property_type": "Type",
+    "location": "Location",
+    "city": "City",
+}
+
+
+def api_item_to_input(item):
+    """
+    Map an API prediction item (area, bedrooms, ...) to the model input
+    dict used by the predictor (Area_in_sqft, Beds, ...).
+    Values are passed through as-is; the predictor validates them.
+    """
+    if not isinstance(item, dict):
+        return item
+
+    return {model_key: item[api_key] for api_key, model_key in API_TO_MODEL_FIELDS.items() if api_key in item}
+
+def model_version_of(predicted_rent):
+    """Model version a prediction came from (None for a plain float)."""
+    return getattr(predicted_rent, "model_version", None)
+
+
+# ---- shared by the Flask views below and the ASGI fast path (asgi.py) ----
+
+def missing_api_fields(data):
+    return [field for field in API_REQUIRED_FIELDS if field not in data]
+
+
+def api_prediction_input(data):
+    """
+    Convert a validated API body to the predictor input dict.
+
+    Raises:
+        ValueError, TypeError: If a value cannot be converted
+    """
+    return {
+        "Area_in_sqft": float(data["area"]),
+        "Beds": int(data["bedrooms"]),
+        "Baths": int(data["bathrooms"]),
+        "Age_of_listing_in_days": int(data["age_of_listing"]),
+        "Furnishing": data["furnishing"],
+        "Type": data["property_type"],
+        "Location": canonical_location(data["location"]),
+        "City": data["city"],
+    }
+
+
+def new_prediction(input_data, predicted_rent, created_at, user_id):
+    """Prediction row for a scored predictor input dict."""
+    return Prediction(
+        area=input_data["Area_in_sqft"],
+        bedrooms=input_data["Beds"],
+        bathrooms=input_data["Baths"],
+        furnishing=input_data["Furnishing"],
+        age_of_listing=input_data["Age_of_listing_in_days"],
+        property_type=input_data["Type"],
+        city=input_data["City"],
+        location=input_data["Location"],
+        predicted_rent=predicted_rent,
+        model_version=model_version_of(predicted_rent),
+        created_at=created_at,
+        user_id=user_id,
+    )
+
+
+def created_prediction_body(prediction_id, predicted_rent, created_at, public_id=None):
+    # id is None while the row waits in the write-behind queue
+    return {
+        "success": True,
+        "message": "Prediction created successfully",
+        "id": prediction_id,
+        "public_id": public_id,
+        "queued": prediction_id is None,
+        "predicted_rent": float(predicted_rent),
+        "currency": "AED",
+        "model_version": model_version_of(predicted_rent),
+        "created_at": created_at.isoformat()
+    }
+
+
+def api_batch_items(data):
+    """
+    The items of a /api/predictions/batch body.
+
+    Returns:
+        tuple: (items, None), or (None, error message)
+    """
+    items = data.get("items")
+
+    if not isinstance(items, list) or not items:
+        return None, "Field 'items' must be a non-empty list"
+
+    max_items = app.config.get("BATCH_MAX_ITEMS", 50000)
+    if len(items) > max_items:
+        return None, f"Too many items: {len(items)} (max {max_items})"
+
+    return items, None
+
+
+def api_batch_save(data):
+    """
+    The "save" flag of a /api/predictions/batch body. Only JSON true /
+    false (or leaving it out) is accepted; bool("false") would be True.
+
+    Returns:
+        tuple: (save, None), or (None, error message)
+    """
+    save = data.get("save", False)
+    if not isinstance(save, bool):
+        return None, "Field 'save' must be true or false"
+    return save, None
+
+
+def score_api_batch(items):
+    """
+    Score /api/predictions/batch items in one model call. An item whose
+    location the model does not know gets an error entry (LOCATION_STRICT)
+    instead of being scored as all zeros.
+
+    Returns:
+        list: preprocess_and_predict_batch results, in the order of items
+    """
+    records = []
+    location_errors = {}
+    for index, item in enumerate(items):
+        record = api_item_to_input(item)
+        if isinstance(record, dict) and "Location" in record:
+            try:
+                record["Location"] = canonical_location(record["Location"])
+            except ValueError as e:
+                location_errors[index] = str(e)
+                record = None
+        records.append(record)
+
+    results = preprocess_and_predict_batch(records)
+    for index, message in location_errors.items():
+        results[index] = {"error": message}
+    return results
+
+
+def saved_batch_rows(items, results):
+    """(position, input_data, predicted_rent) of the batch items that were scored."""
+    return [
+        (position, api_prediction_input(item), result["predicted_rent"])
+        for position, (item, result) in enumerate(zip(items, results))
+        if "error" not in result
+    ]
+
+
+def batch_response_items(results):
+    """Per-item response entries, in the order of the batch results."""
+    response_items = []
+    for index, result in enumerate(results):
+        if "error" in result:
+            response_items.append({
+                "index": index,
+                "success": False,
+                "message": result["error"]
+            })
+        else:
+            response_items.append({
+                "index": index,
+                "success": True,
+                "predicted_rent": result["predicted_rent"],
+                "model_version": model_version_of(result["predicted_rent"])
+            })
+    return response_items
+
+
+def batch_response_body(response_items, saved):
+    succeeded = sum(1 for r in response_items if r["success"])
+    return {
+        "success": True,
+        "count": len(response_items),
+        "succeeded": succeeded,
+        "failed": len(response_items) - succeeded,
+        "saved": saved,
+        "currency": "AED",
+        "results": response_items
+    }
+
+
 @app.route("/api/predictions", methods=["POST"])
 def api_create_prediction():
     """
@@ -464,18 +628,7 @@ def api_create_prediction():
     """
     data = request.get_json(silent=True) or {}
 
-    required_fields = [
-        "area",
-        "bedrooms",
-        "bathrooms",
-        "age_of_listing",
-        "furnishing",
-        "property_type",
-        "city",
-        "location",
-    ]
-
-    missing = [field for field in required_fields if field not in data]
+    missing = missing_api_fields(data)
     if missing:
         return jsonify({
             "success": False,
@@ -483,27 +636,8 @@ def api_create_prediction():
         }), 400
 
     try:
-        # basic type conversion
-        area = float(data["area"])
-        bedrooms = int(data["bedrooms"])
-        bathrooms = int(data["bathrooms"])
-        age_of_listing = int(data["age_of_listing"])
-        furnishing = data["furnishing"]
-        property_type = data["property_type"]
-        city = data["city"]
-        location = data["location"]
-
         # ========== Prepare input for ML model ==========
-        input_data = {
-            "Area_in_sqft": area,
-            "Beds": bedrooms,
-            "Baths": bathrooms,
-            "Age_of_listing_in_days": age_of_listing,
-            "Furnishing": furnishing,
-            "Type": property_type,
-            "Location": location,
-            "City": city,
-        }
+        input_data = api_prediction_input(data)
 
         # Call ML pipeline
         predicted_rent = preprocess_and_predict(input_data)
@@ -513,45 +647,225 @@ def api_create_prediction():
         created_at = datetime.now(singapore_tz)
 
         # Save to DB
-        new_pred = Prediction(
-            area=area,
-            bedrooms=bedrooms,
-            bathrooms=bathrooms,
-            furnishing=furnishing,
-            age_of_listing=age_of_listing,
-            property_type=property_type,
-            city=city,
-            location=location,
-            predicted_rent=predicted_rent,
-            created_at=created_at,
-            user_id=current_user.id if current_user.is_authenticated else None,
+        new_pred = new_prediction(
+            input_data, predicted_rent, created_at,
+            current_user.id if current_user.is_authenticated else None,
         )
 
-        db.session.add(new_pred)
-        db.session.commit()
+        prediction_id, = store_predictions([new_pred])
+
+        return jsonify(created_prediction_body(prediction_id, predicted_rent, created_at, new_pred.public_id)), 200
+
+    except (ValueError, TypeError) as e:
+        return jsonify({
+            "success": False,
+            "message": f"Invalid input values: {e}"
+        }), 400
+    except TimeoutError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Prediction service busy: {e}"
+        }), 503
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "success": False,
+            "message": f"Unexpected server error: {e}"
+        }), 500
+
+
+@app.route("/api/predictions/batch", methods=["POST"])
+def api_create_predictions_batch():
+    """
+    REST API: Score many properties in one call.
+    - Expects JSON body with:
+      items: list of objects with the same fields as /api/predictions
+      save (optional, default false): also store the predictions in DB
+    - All valid items are preprocessed and scored together in one
+      model call; invalid items get a per-item error instead
+    - Results are returned in the same order as items
+    """
+    data = request.get_json(silent=True) or {}
+    items, error = api_batch_items(data)
+    if error:
+        return jsonify({
+            "success": False,
+            "message": error
+        }), 400
+
+    save, error = api_batch_save(data)
+    if error:
+        return jsonify({
+            "success": False,
+            "message": error
+        }), 400
+
+    try:
+        results = score_api_batch(items)
+        response_items = batch_response_items(results)
+
+        new_preds = []
+        if save:
+            singapore_tz = pytz.timezone("Asia/Singapore")
+            created_at = datetime.now(singapore_tz)
+            user_id = current_user.id if current_user.is_authenticated else None
+            new_preds = [
+                (position, new_prediction(input_data, predicted_rent, created_at, user_id))
+                for position, input_data, predicted_rent in saved_batch_rows(items, results)
+            ]
+
+        # Save all rows in one transaction (or one write-behind submit)
+        if new_preds:
+            ids = store_predictions([pred for _, pred in new_preds])
+            for (position, pred), prediction_id in zip(new_preds, ids):
+                response_items[position]["id"] = prediction_id
+                response_items[position]["public_id"] = pred.public_id
+
+        return jsonify(batch_response_body(response_items, bool(new_preds))), 200
+
+    except TimeoutError as e:
+        return jsonify({
+            "success": False,
+            "message": f"Prediction service busy: {e}"
+        }), 503
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "success": False,
+            "message": f"Unexpected server error: {e}"
+        }), 500
+
+
+# API fields a sweep can vary, and whether their values are whole numbers
+SWEEP_API_FIELDS = {
+    "area": False,
+    "bedrooms": True,
+    "bathrooms": True,
+    "age_of_listing": True,
+}
+
+
+def sweep_axis_values(axis, max_points):
+    """
+    Values of one sweep axis: either an explicit "values" list or
+    "start", "stop" and "steps" (evenly spaced, both ends included).
+    Whole-number fields are rounded and de-duplicated.
+
+    Raises:
+        ValueError: If the axis spec is malformed, or asks for more than
+            max_points values (checked before any array is built)
+    """
+    if not isinstance(axis, dict) or axis.get("field") not in SWEEP_API_FIELDS:
+        raise ValueError("Each vary entry needs a field: " + ", ".join(SWEEP_API_FIELDS))
+
+    if "values" in axis:
+        if not isinstance(axis["values"], list) or not axis["values"]:
+            raise ValueError(f"values for {axis['field']} must be a non-empty list")
+        if len(axis["values"]) > max_points:
+            raise ValueError(f"Too many points: {len(axis['values'])} (max {max_points})")
+        values = np.array([float(v) for v in axis["values"]])
+    else:
+        try:
+            start, stop, steps = float(axis["start"]), float(axis["stop"]), int(axis["steps"])
+        except KeyError as e:
+            raise ValueError(f"Missing {e.args[0]} for {axis['field']}")
+        if steps < 1:
+            raise ValueError("steps must be at least 1")
+        if steps > max_points:
+            raise ValueError(f"Too many points: {steps} (max {max_points})")
+        values = np.linspace(start, stop, steps)
+
+    if SWEEP_API_FIELDS[axis["field"]]:
+        values = np.unique(np.round(values)).astype(int)
+    return values
+
+
+@app.route("/api/predictions/sweep", methods=["POST"])
+def api_prediction_sweep():
+    """
+    REST API: What-if sweep over one or two inputs of a property.
+    - Expects JSON body with:
+      base: object with the /api/predictions fields (varying ones optional)
+      vary: list of one or two axes, each
+            {"field": "area", "start": 500, "stop": 5000, "steps": 10}
+            or {"field": "bedrooms", "values": [0, 1, 2]}
+    - The whole grid is scored in one model call; nothing is saved
+    - predicted_rent is a list (one axis) or a list of rows, one row per
+      value of the first axis (two axes)
+    """
+    data = request.get_json(silent=True) or {}
+    base = data.get("base")
+    vary = data.get("vary")
+
+    if not isinstance(base, dict) or not isinstance(vary, list) or not 1 <= len(vary) <= 2:
+        return jsonify({
+            "success": False,
+            "message": "Expected 'base' object and 'vary' list of one or two axes"
+        }), 400
+
+    max_points = app.config.get("SWEEP_MAX_POINTS", 10000)
+    try:
+        axes = [(axis["field"], sweep_axis_values(axis, max_points)) for axis in vary]
+
+        varying = {field for field, _ in axes}
+        missing = [field for field in API_REQUIRED_FIELDS if field not in base and field not in varying]
+        if missing:
+            return jsonify({
+                "success": False,
+                "message": "Missing fields: " + ", ".join(missing)
+            }), 400
+
+        points = int(np.prod([len(values) for _, values in axes]))
+        if points > max_points:
+            return jsonify({
+                "success": False,
+                "message": f"Too many points: {points} (max {max_points})"
+            }), 400
+
+        model_axes = [(API_TO_MODEL_FIELDS[field], values) for field, values in axes]
+        predictions, model_version = predict_sweep(api_item_to_input(base), model_axes)
 
         return jsonify({
             "success": True,
-            "message": "Prediction created successfully",
-            "id": new_pred.id,
-            "predicted_rent": float(predicted_rent),
+            "fields": [field for field, _ in axes],
+            "values": {field: values.tolist() for field, values in axes},
+            "points": points,
+            "predicted_rent": predictions.tolist(),
             "currency": "AED",
-            "created_at": created_at.isoformat()
+            "model_version": model_version
         }), 200
 
     except (ValueError, TypeError) as e:
         return jsonify({
             "success": False,
-            "message": f"Invalid input values: {e}"
+            "message": f"Invalid sweep: {e}"
         }), 400
     except Exception as e:
-        db.session.rollback()
         return jsonify({
             "success": False,
             "message": f"Unexpected server error: {e}"
         }), 500
 
 
+def prediction_item(pred):
+    """JSON form of a stored Prediction."""
+    return {
+        "id": pred.id,
+        "public_id": pred.public_id,
+        "area": pred.area,
+        "bedrooms": pred.bedrooms,
+        "bathrooms": pred.bathrooms,
+        "furnishing": pred.furnishing,
+        "age_of_listing": pred.age_of_listing,
+        "property_type": pred.property_type,
+        "city": pred.city,
+        "location": pred.location,
+        "predicted_rent": float(pred.predicted_rent),
+        "model_version": pred.model_version,
+        "created_at": pred.created_at.isoformat() if pred.created_at else None,
+    }
+
+
 @app.route("/api/predictions/<int:prediction_id>", methods=["GET"])
 def api_get_prediction(prediction_id):
     """
@@ -566,22 +880,38 @@ def api_get_prediction(prediction_id):
 
     return jsonify({
         "success": True,
-        "item": {
-            "id": pred.id,
-            "area": pred.area,
-            "bedrooms": pred.bedrooms,
-            "bathrooms": pred.bathrooms,
-            "furnishing": pred.furnishing,
-            "age_of_listing": pred.age_of_listing,
-            "property_type": pred.property_type,
-            "city": pred.city,
-            "location": pred.location,
-            "predicted_rent": float(pred.predicted_rent),
-            "created_at": pred.created_at.isoformat() if pred.created_at else None,
-        }
+        "item": prediction_item(pred)
     }), 200
 
 
+@app.route("/api/predictions/ref/<public_id>", methods=["GET"])
+def api_get_prediction_by_ref(public_id):
+    """
+    REST API: Get a prediction by the public_id returned when it was
+    created. 202 with pending = true while it is still in the
+    write-behind queue.
+    """
+    pred = Prediction.query.filter_by(public_id=public_id).first()
+    if pred:
+        return jsonify({
+            "success": True,
+            "item": prediction_item(pred)
+        }), 200
+
+    queue = write_queue()
+    if queue is not None and queue.is_pending(public_id):
+        return jsonify({
+            "success": True,
+            "pending": True,
+            "public_id": public_id
+        }), 202
+
+    return jsonify({
+        "success": False,
+        "message": "Prediction not found"
+    }), 404
+
+
 @app.route("/api/predictions/<int:prediction_id>", methods=["DELETE"])
 def api_delete_prediction(prediction_id):
     """
@@ -609,3 +939,265 @@ def api_delete_prediction(prediction_id):
             "success": False,
             "message": f"Error deleting prediction: {e}"
         }), 500
+
+
+@app.route("/api/locations", methods=["GET"])
+def api_locations():
+    """
+    REST API: Location autocomplete from the model's vocabulary.
+    - Query string: q (prefix of the name or of any word in it, any case),
+      city (optional), limit (optional, max LOCATION_SUGGEST_MAX)
+    - Names the model knows only; their spelling is the one to submit
+    - The ETag changes only when the model's vocabulary does
+    """
+    prefix = request.args.get("q", "")
+    city = request.args.get("city") or None
+    limit = request.args.get("limit", app.config.get("LOCATION_SUGGEST_LIMIT", 10), type=int)
+    limit = max(1, min(limit, app.config.get("LOCATION_SUGGEST_MAX", 50)))
+
+    try:
+        index = location_index()
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Location index unavailable: {e}"
+        }), 503
+
+    names = index.complete(prefix, city=city, limit=limit)
+    resp = jsonify({
+        "success": True,
+        "query": prefix,
+        "city": city,
+        "locations": [{"name": name, "city": index.city_of.get(name)} for name in names],
+    })
+    resp.set_etag(index.etag)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = app.config.get("LOCATION_CACHE_MAX_AGE", 300)
+    return resp.make_conditional(request)
+
+
+@app.route("/api/model/cache", methods=["GET"])
+def api_cache_stats():
+    """
+    REST API: Prediction cache counters (size, hits, misses, evictions),
+    used to size PREDICTION_CACHE_SIZE / PREDICTION_CACHE_TTL.
+    """
+    stats = cache_stats()
+    return jsonify({
+        "success": True,
+        "enabled": stats is not None,
+        "cache": stats
+    }), 200
+
+
+@app.route("/api/model/batching", methods=["GET"])
+def api_batching_stats():
+    """
+    REST API: Micro-batching scheduler metrics (queue depth, batch sizes,
+    queueing and end-to-end latency).
+    """
+    stats = batching_stats()
+    return jsonify({
+        "success": True,
+        "enabled": stats is not None,
+        "batching": stats
+    }), 200
+
+
+@app.route("/api/model/executor", methods=["GET"])
+def api_executor_stats():
+    """
+    REST API: Process-pool inference backend metrics (tasks in flight,
+    completed, timed out, rejected and pool restarts), plus the policy
+    that splits large batches across threads.
+    """
+    stats = executor_stats()
+    return jsonify({
+        "success": True,
+        "enabled": stats is not None,
+        "executor": stats,
+        "parallel": parallel_stats()
+    }), 200
+
+
+@app.route("/api/model/grid", methods=["GET"])
+def api_rent_grid_stats():
+    """
+    REST API: Precomputed rent grid size and how many single predictions
+    it answered (hits) or passed on to the forest (misses).
+    """
+    stats = rent_grid_stats()
+    return jsonify({
+        "success": True,
+        "enabled": stats is not None,
+        "grid": stats
+    }), 200
+
+
+@app.route("/api/model/shadow", methods=["GET"])
+def api_shadow_stats():
+    """
+    REST API: How far the shadow (candidate) model is from the serving
+    model on the sampled live requests it scored.
+    """
+    stats = shadow_stats()
+    return jsonify({
+        "success": True,
+        "enabled": stats is not None,
+        "shadow": stats
+    }), 200
+
+
+@app.route("/api/model/writer", methods=["GET"])
+def api_write_queue_stats():
+    """
+    REST API: Write-behind queue depth, rows written / failed / rejected,
+    rows per commit and commit times (WRITE_BEHIND_ENABLED).
+    """
+    stats = write_queue_stats()
+    return jsonify({
+        "success": True,
+        "enabled": stats is not None,
+        "writer": stats
+    }), 200
+
+
+@app.route("/api/model/memory", methods=["GET"])
+def api_model_memory():
+    """
+    REST API: Resident vs shared memory of the worker serving this request.
+    With MODEL_STORAGE = "mmap" the mapped model files should show up as
+    shared once several workers have touched them.
+    """
+    return jsonify({
+        "success": True,
+        "memory": model_memory_report()
+    }), 200
+
+
+# ==============================
+# MODEL ADMIN (hot reload)
+# ==============================
+
+def admin_token_ok():
+    """True if the request carries the configured ADMIN_TOKEN (never if unset)."""
+    expected = app.config.get("ADMIN_TOKEN", "")
+    supplied = request.headers.get("X-Admin-Token", "")
+    return bool(expected) and hmac.compare_digest(expected, supplied)
+
+
+@app.route("/api/admin/model", methods=["GET"])
+def api_admin_model_status():
+    """
+    REST API (admin): Model version serving this worker, recently
+    published versions and the state of the last reload.
+    - Requires header X-Admin-Token
+    """
+    if not admin_token_ok():
+        return jsonify({"success": False, "message": "Forbidden"}), 403
+
+    return jsonify({
+        "success": True,
+        "model": model_registry_status()
+    }), 200
+
+
+@app.route("/api/admin/model/reload", methods=["POST"])
+def api_admin_model_reload():
+    """
+    REST API (admin): Load a new model version and swap it in.
+    - Requires header X-Admin-Token
+    - Optional JSON body:
+      bundle: bundle file to load, inside MODEL_DIR or MODEL_BUNDLE_DIR
+      (default: MODEL_BUNDLE / MODEL_DIR)
+      wait (default false): reload before responding instead of in the
+      background
+    - The current version keeps serving until the new one is warmed up.
+      Reloads the worker process handling this request only; with several
+      workers use MODEL_WATCH_ENABLED instead.
+    """
+    if not admin_token_ok():
+        return jsonify({"success": False, "message": "Forbidden"}), 403
+
+    data = request.get_json(silent=True) or {}
+    bundle_path = data.get("bundle") or None
+    if bundle_path is not None:
+        # the bundle is unpickled, so only load one from a directory we trust
+        resolved = allowed_bundle_path(bundle_path) if isinstance(bundle_path, str) else None
+        if resolved is None:
+            return jsonify({
+                "success": False,
+                "message": "bundle must be a file inside MODEL_DIR or MODEL_BUNDLE_DIR"
+            }), 400
+        bundle_path = resolved
+
+    if data.get("wait"):
+        try:
+            version = reload_model_components(bundle_path)
+        except Exception as e:
+            return jsonify({
+                "success": False,
+                "message": f"Reload failed, current version kept: {e}"
+            }), 500
+        return jsonify({
+            "success": True,
+            "model_version": version.version
+        }), 200
+
+    if not start_background_reload(app, bundle_path):
+        return jsonify({
+            "success": False,
+            "message": "A reload is already running"
+        }), 409
+
+    return jsonify({
+        "success": True,
+        "message": "Reload started"
+    }), 202
+
+
+# ==============================
+# METRICS (Prometheus)
+# ==============================
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop("request_started", None)
+    if started is not None and request.endpoint not in (None, "static", "prometheus_metrics"):
+        metrics.HTTP_SECONDS.observe(time.perf_counter() - started, endpoint=request.endpoint)
+        metrics.HTTP_REQUESTS.inc(endpoint=request.endpoint, method=request.method, status=response.status_code)
+    return response
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """
+    Request counts and latencies, per-stage prediction timings and model
+    load times, summed over every worker process (see METRICS_DIR).
+    """
+    return Response(metrics.render(), mimetype=None, content_type=metrics.CONTENT_TYPE)
+
+
+# ==============================
+# HEALTH CHECKS (load balancer)
+# ==============================
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({"status": "alive"}), 200
+
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    """
+    Readiness: 200 only once the model is loaded and warmed up,
+    503 while it is still loading (or if loading failed).
+    """
+    state = warmup.status()
+    return jsonify(state), 200 if state["ready"] else 503
@@ -0,0 +1,58 @@
+# columns added to the prediction table after it was first shipped;
+# db.create_all() only creates missing tables, so a database kept with
+# RESET_DB_ON_START = False gets them here (idempotent, run at start)
+from sqlalchemy import bindparam, inspect, select, update
+
+from application import db
+from application.models import Prediction, new_public_id
+
+# column -> DDL type; ALTER TABLE ... ADD COLUMN works on every backend we run on
+_ADDED_COLUMNS = {
+    "model_version": "VARCHAR(64)",
+    "public_id": "VARCHAR(32)",
+}
+
+_TABLE = Prediction.__tablename__
+
+
+def upgrade_prediction_table(connection):
+    """
+    Add missing prediction columns, give existing rows a public_id and
+    create the unique public_id index.
+
+    Returns:
+        list: Names of the columns added
+    """
+    inspector = inspect(connection)
+    if not inspector.has_table(_TABLE):
+        return []
+    existing = {column["name"] for column in inspector.get_columns(_TABLE)}
+
+    added = []
+    for name, ddl_type in _ADDED_COLUMNS.items():
+        if name not in existing:
+            connection.exec_driver_sql(f"ALTER TABLE {_TABLE} ADD COLUMN {name} {ddl_type}")
+            added.append(name)
+
+    # rows stored before public_id existed (or written with it NULL)
+    table = Prediction.__table__
+    missing = connection.execute(select(table.c.id).where(table.c.public_id.is_(None))).scalars().all()
+    if missing:
+        connection.execute(
+            update(table).where(table.c.id == bindparam("row_id")).values(public_id=bindparam("new_id")),
+            [{"row_id": row_id, "new_id": new_public_id()} for row_id in missing],
+        )
+
+    for index in table.indexes:
+        if index.name == "uq_prediction_public_id":
+            index.create(connection, checkfirst=True)
+    return added
+
+
+def ensure_schema():
+    """upgrade_prediction_table() for the app's database."""
+    with db.engine.begin() as connection:
+        added = upgrade_prediction_table(connection)
+    if added:
+        print(f"✓ Added prediction columns: {', '.join(added)}")
+    return added
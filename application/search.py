@@ -0,0 +1,124 @@
+# location search for the history filter: an SQLite FTS5 trigram index over
+# Prediction.location (kept in sync by triggers), so "%marina%" style
+# substring matches no longer scan the user's rows; ILIKE on other backends
+from sqlalchemy import DDL, case, event, func, inspect, literal_column, or_, select, text
+
+from application import db
+from application.models import Prediction
+
+LOCATION_FTS_TABLE = "prediction_location_fts"
+
+# the trigram tokenizer indexes 3-character windows; shorter terms can't use it
+MIN_FTS_TERM = 3
+
+_TABLE = Prediction.__tablename__
+
+# external-content FTS5 table: it stores only the index, the text stays in prediction
+_CREATE_STATEMENTS = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {LOCATION_FTS_TABLE} USING fts5("
+    f"location, content='{_TABLE}', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {LOCATION_FTS_TABLE}_ai AFTER INSERT ON {_TABLE} BEGIN "
+    f"INSERT INTO {LOCATION_FTS_TABLE}(rowid, location) VALUES (new.id, new.location); END",
+    f"CREATE TRIGGER IF NOT EXISTS {LOCATION_FTS_TABLE}_ad AFTER DELETE ON {_TABLE} BEGIN "
+    f"INSERT INTO {LOCATION_FTS_TABLE}({LOCATION_FTS_TABLE}, rowid, location) "
+    f"VALUES ('delete', old.id, old.location); END",
+    f"CREATE TRIGGER IF NOT EXISTS {LOCATION_FTS_TABLE}_au AFTER UPDATE OF location ON {_TABLE} BEGIN "
+    f"INSERT INTO {LOCATION_FTS_TABLE}({LOCATION_FTS_TABLE}, rowid, location) "
+    f"VALUES ('delete', old.id, old.location); "
+    f"INSERT INTO {LOCATION_FTS_TABLE}(rowid, location) VALUES (new.id, new.location); END",
+]
+
+# engine url -> whether the FTS table is there (checked once per database)
+_available = {}
+
+
+def _fts5_trigram_supported(connection):
+    # trigram needs SQLite 3.34+, built with FTS5
+    try:
+        connection.exec_driver_sql("CREATE VIRTUAL TABLE temp._fts_probe USING fts5(x, tokenize='trigram')")
+        connection.exec_driver_sql("DROP TABLE temp._fts_probe")
+        return True
+    except Exception:
+        return False
+
+
+def install_location_search(connection):
+    """
+    Create the FTS table and its triggers if this database can have them,
+    filling the index from the rows already stored.
+
+    Returns:
+        bool: Whether location search uses the FTS index
+    """
+    if connection.dialect.name != "sqlite" or not _fts5_trigram_supported(connection):
+        return False
+    existed = inspect(connection).has_table(LOCATION_FTS_TABLE)
+    for statement in _CREATE_STATEMENTS:
+        connection.exec_driver_sql(statement)
+    if not existed:
+        connection.exec_driver_sql(f"INSERT INTO {LOCATION_FTS_TABLE}({LOCATION_FTS_TABLE}) VALUES ('rebuild')")
+    _available.clear()
+    return True
+
+
+def _after_create(target, connection, **kw):
+    install_location_search(connection)
+
+
+event.listen(Prediction.__table__, "after_create", _after_create)
+# the triggers go with the prediction table, the virtual table has to be dropped
+event.listen(Prediction.__table__, "before_drop",
+             DDL(f"DROP TABLE IF EXISTS {LOCATION_FTS_TABLE}").execute_if(dialect="sqlite"))
+event.listen(Prediction.__table__, "after_drop", lambda *args, **kw: _available.clear())
+
+
+def ensure_location_search():
+    """install_location_search() for a database created before the index existed."""
+    with db.engine.begin() as connection:
+        return install_location_search(connection)
+
+
+def location_search_available():
+    key = str(db.engine.url)
+    if key not in _available:
+        _available[key] = (
+            db.engine.dialect.name == "sqlite"
+            and inspect(db.engine).has_table(LOCATION_FTS_TABLE)
+        )
+    return _available[key]
+
+
+def _fts_phrase(term):
+    # one quoted phrase: FTS5 operators and punctuation in the term are literal
+    return '"' + term.replace('"', '""') + '"'
+
+
+def location_filter(term):
+    """
+    WHERE clause for "location contains term" (case-insensitive), using
+    the FTS index when there is one and term is long enough for trigrams.
+    """
+    if len(term.strip()) >= MIN_FTS_TERM and location_search_available():
+        phrase = _fts_phrase(term.strip())
+        matches = select(literal_column("rowid")).select_from(text(LOCATION_FTS_TABLE)).where(
+            text(f"{LOCATION_FTS_TABLE} MATCH :location_match").bindparams(location_match=phrase)
+        )
+        return Prediction.id.in_(matches)
+    return Prediction.location.ilike(f"%{term}%")
+
+
+def location_rank(term):
+    """
+    Relevance of Prediction.location for term, larger is better (so the
+    default descending order puts the best matches first): 3 exact,
+    2 prefix, 1 start of a later word, 0 anywhere else.
+    """
+    term = term.strip().lower()
+    location = func.lower(Prediction.location)
+    return case(
+        (location == term, 3),
+        (location.startswith(term, autoescape=True), 2),
+        (or_(location.contains(" " + term, autoescape=True),
+             location.contains("-" + term, autoescape=True)), 1),
+        else_=0,
+    )
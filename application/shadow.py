@@ -0,0 +1,243 @@
+# shadow evaluation of a candidate model, live (sampled) and offline (replay)
+import os
+import queue
+import random
+import threading
+from collections import Counter, deque
+
+import numpy as np
+from sqlalchemy import select
+
+from application import db
+from application.models import Prediction
+
+# upper edges of the |relative difference| buckets in DeltaStats.summary()
+REL_BUCKETS = (0.001, 0.01, 0.05, 0.10)
+
+
+class DeltaStats:
+    """
+    Differences between a candidate and the primary prediction, in AED
+    and relative to the primary. With maxlen, only the most recent
+    differences are kept for the percentiles (count keeps growing).
+    """
+
+    def __init__(self, maxlen=None):
+        self.count = 0
+        self._delta = deque(maxlen=maxlen)
+        self._rel = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def add(self, primary, candidate):
+        primary = np.asarray(primary, dtype=np.float64)
+        delta = np.asarray(candidate, dtype=np.float64) - primary
+        with self._lock:
+            self.count += len(delta)
+            self._delta.extend(delta.tolist())
+            self._rel.extend((delta / primary).tolist())
+
+    def summary(self):
+        with self._lock:
+            delta = np.array(self._delta)
+            rel = np.array(self._rel)
+            count = self.count
+
+        if not len(delta):
+            return {"count": count}
+
+        abs_delta = np.abs(delta)
+        abs_rel = np.abs(rel)
+        edges = (0.0,) + REL_BUCKETS + (np.inf,)
+        buckets = {}
+        for low, high in zip(edges[:-1], edges[1:]):
+            label = f"<{high:.1%}" if np.isfinite(high) else f">={low:.1%}"
+            buckets[label] = int(((abs_rel >= low) & (abs_rel < high)).sum())
+
+        return {
+            "count": count,
+            "mean_delta_aed": float(delta.mean()),
+            "mean_abs_delta_aed": float(abs_delta.mean()),
+            "p50_abs_delta_aed": float(np.percentile(abs_delta, 50)),
+            "p95_abs_delta_aed": float(np.percentile(abs_delta, 95)),
+            "p99_abs_delta_aed": float(np.percentile(abs_delta, 99)),
+            "max_abs_delta_aed": float(abs_delta.max()),
+            "mean_rel_delta": float(rel.mean()),
+            "p95_abs_rel_delta": float(np.percentile(abs_rel, 95)),
+            "max_abs_rel_delta": float(abs_rel.max()),
+            "abs_rel_buckets": buckets,
+        }
+
+
+class ShadowEvaluator:
+    """
+    Scores a sampled fraction of live requests with a candidate model in
+    a background thread and records how far it is from the primary.
+
+    offer() never blocks the request: it samples, then drops the record
+    if the queue is full. The candidate is loaded by load_fn() on the
+    background thread, the first time there is work.
+    """
+
+    def __init__(self, load_fn, score_fn, sample_rate=0.1, max_queue=1000, max_batch=64, history=10000):
+        self.load_fn = load_fn
+        self.score_fn = score_fn  # score_fn(records, candidate) -> AED values
+        self.sample_rate = sample_rate
+        self.max_batch = max_batch
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+        self.candidate = None
+        self.error = None
+        self.deltas = DeltaStats(maxlen=history)
+        self.offered = 0
+        self.sampled = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def _ensure_thread(self):
+        # threads do not survive fork, so each worker process starts its own
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="shadow-model", daemon=True)
+            self._thread.start()
+
+    def offer(self, record, primary):
+        """Maybe queue record for shadow scoring (never blocks)."""
+        self.offered += 1
+        if random.random() >= self.sample_rate:
+            return
+        self.sampled += 1
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((record, float(primary)))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        if self.candidate is None:
+            try:
+                self.candidate = self.load_fn()
+            except Exception as e:
+                self.error = str(e)
+                print(f"Shadow model could not be loaded: {e}")
+                return
+
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            records = [record for record, _ in batch]
+            try:
+                candidate = self.score_fn(records, self.candidate)
+            except Exception as e:
+                self.failed += len(batch)
+                print(f"Shadow scoring failed: {e}")
+                continue
+            self.deltas.add([primary for _, primary in batch], candidate)
+
+    def stats(self):
+        return {
+            "candidate_version": self.candidate.version if self.candidate is not None else None,
+            "error": self.error,
+            "sample_rate": self.sample_rate,
+            "offered": self.offered,
+            "sampled": self.sampled,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "queue_depth": self._queue.qsize(),
+            "deltas": self.deltas.summary(),
+        }
+
+
+def _row_to_record(row):
+    return {
+        "Area_in_sqft": row.area,
+        "Beds": row.bedrooms,
+        "Baths": row.bathrooms,
+        "Age_of_listing_in_days": row.age_of_listing,
+        "Furnishing": row.furnishing,
+        "Type": row.property_type,
+        "Location": row.location,
+        "City": row.city,
+    }
+
+
+def replay_predictions(candidate, score_fn, clean_fn, chunk_size=1000, limit=None, progress=None):
+    """
+    Rescore stored Prediction rows with a candidate model and compare
+    with the predicted_rent saved at the time.
+
+    Rows are read in id order, chunk_size at a time (keyset, so memory
+    stays flat however large the table is), and each chunk is scored in
+    one vectorized call.
+
+    Args:
+        candidate: ModelVersion to score with
+        score_fn: score_fn(records, candidate) -> AED values
+        clean_fn: Validates / coerces a record, raising ValueError
+        chunk_size (int): Rows per query and per model call
+        limit (int): Stop after this many rows (None = all)
+        progress: Optional callable(rows_done)
+
+    Returns:
+        dict: Delta distribution, rows skipped and rows per stored
+            model version
+    """
+    columns = (
+        Prediction.id, Prediction.area, Prediction.bedrooms, Prediction.bathrooms,
+        Prediction.age_of_listing, Prediction.furnishing, Prediction.property_type,
+        Prediction.location, Prediction.city, Prediction.predicted_rent, Prediction.model_version,
+    )
+    deltas = DeltaStats()
+    by_version = Counter()
+    skipped = 0
+    done = 0
+    last_id = 0
+
+    while limit is None or done < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - done)
+        rows = db.session.execute(
+            select(*columns).where(Prediction.id > last_id).order_by(Prediction.id).limit(size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        done += len(rows)
+
+        records, primary = [], []
+        for row in rows:
+            try:
+                if not row.predicted_rent:
+                    raise ValueError("no stored prediction")
+                records.append(clean_fn(_row_to_record(row)))
+            except ValueError:
+                skipped += 1
+                continue
+            primary.append(row.predicted_rent)
+            by_version[row.model_version or "unknown"] += 1
+
+        if records:
+            deltas.add(primary, score_fn(records, candidate))
+        if progress is not None:
+            progress(done)
+
+    return {
+        "candidate_version": candidate.version,
+        "rows": done,
+        "skipped": skipped,
+        "stored_versions": dict(by_version),
+        "deltas": deltas.summary(),
+    }
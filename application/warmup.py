@@ -0,0 +1,75 @@
+# background model warm-up, backing the /readyz endpoint
+import os
+import threading
+import time
+
+from application import predictor
+
+# status: "idle" -> "loading" -> "ready" | "failed"
+_state = {
+    "status": "idle",
+    "error": None,
+    "started_at": None,
+    "load_seconds": None,
+}
+_state_lock = threading.Lock()
+_app = None  # app passed to start_warmup, reused after a fork
+
+
+def start_warmup(app):
+    """
+    Start loading + warming the model in a daemon thread.
+    Returns immediately; poll is_ready() or GET /readyz.
+    """
+    global _app
+    _app = app
+
+    with _state_lock:
+        if _state["status"] in ("loading", "ready"):
+            return
+        _state.update(status="loading", error=None, started_at=time.time(), load_seconds=None)
+
+    thread = threading.Thread(target=_run, args=(app,), name="model-warmup", daemon=True)
+    thread.start()
+
+
+def _run(app):
+    started = time.perf_counter()
+    try:
+        with app.app_context():
+            predictor.warm_up(app.config.get("MODEL_WARMUP_PREDICTIONS", 8))
+    except Exception as e:
+        with _state_lock:
+            _state.update(status="failed", error=str(e))
+        print(f"Model warm-up failed: {e}")
+        return
+
+    with _state_lock:
+        _state.update(status="ready", load_seconds=time.perf_counter() - started)
+    print(f"✓ Model warm-up finished in {_state['load_seconds']:.1f}s")
+
+
+def is_ready():
+    return _state["status"] == "ready" and predictor.current_version() is not None
+
+
+def status():
+    with _state_lock:
+        return dict(_state, ready=is_ready())
+
+
+def _after_fork_in_child():
+    """
+    Threads do not survive fork. With gunicorn --preload a worker can be
+    forked while the master is still loading; restart the warm-up there.
+    """
+    global _state_lock
+    _state_lock = threading.Lock()
+    if _state["status"] == "loading":
+        _state["status"] = "idle"
+        if _app is not None:
+            start_warmup(_app)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,282 @@
+# write-behind persistence: API requests queue their Prediction rows and
+# return at once; one background thread per process writes them in batched
+# transactions (one INSERT ... executemany + one commit per batch)
+import atexit
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import insert
+
+from application import db
+from application import metrics
+from application.models import Prediction
+
+_queue = None   # WriteBehindQueue, None unless WRITE_BEHIND_ENABLED
+
+
+def prediction_values(pred):
+    """
+    Column values of an unsaved Prediction, as a row for insert(Prediction).
+    Unset columns with a default (created_at) are left out, so the
+    default applies instead of NULL.
+    """
+    values = {}
+    for column in Prediction.__table__.columns:
+        value = getattr(pred, column.key)
+        if column.primary_key or (value is None and (column.default or column.server_default)):
+            continue
+        values[column.key] = value
+    return values
+
+
+class WriteBehindQueue:
+    """
+    Bounded queue of Prediction rows (dicts keyed by column) and the
+    thread that writes them.
+
+    The writer waits up to flush_interval seconds after the first row for
+    more to arrive (or until batch_size are waiting), then inserts them
+    with one commit. A batch that fails is retried row by row, so one bad
+    row does not lose its neighbours.
+
+    submit() blocks while the queue holds max_size rows, for at most
+    put_timeout seconds, then gives up with TimeoutError: when the
+    database falls behind, requests slow down and then fail instead of
+    memory growing without bound.
+    """
+
+    def __init__(self, app, max_size=10000, batch_size=500, flush_interval=0.05,
+                 put_timeout=1.0, history=1000):
+        self.app = app
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+
+        self._cond = threading.Condition()
+        self._rows = deque()
+        self._pending = {}     # public_id -> row, until it is written (or dropped)
+        self._in_flight = 0    # rows taken by the writer, not committed yet
+        self._flushing = 0     # flush() calls waiting: write without waiting for more rows
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+        # metrics (under self._cond)
+        self.queued = 0
+        self.written = 0
+        self.failed = 0
+        self.rejected = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+        self._commit_times = deque(maxlen=history)  # seconds per batch commit
+
+    def _ensure_thread(self):
+        # threads do not survive fork, so each worker process starts its own
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # the parent's rows are the parent's to write
+                self._cond = threading.Condition()
+                self._rows = deque()
+                self._pending = {}
+                self._in_flight = 0
+                self._flushing = 0
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def submit(self, rows):
+        """
+        Queue rows for writing. Each needs a public_id, the only id a
+        client has until the row is written.
+
+        Raises:
+            TimeoutError: If the queue stays full for put_timeout seconds
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        self._ensure_thread()
+
+        deadline = time.monotonic() + self.put_timeout
+        with self._cond:
+            # more rows than max_size still fit into an empty queue
+            while self._rows and len(self._rows) + len(rows) > self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += len(rows)
+                    metrics.WRITE_ROWS.inc(len(rows), result="rejected")
+                    raise TimeoutError(f"Write queue full ({len(self._rows)} of {self.max_size} rows)")
+                self._cond.wait(remaining)
+
+            self._rows.extend(rows)
+            self._pending.update((row["public_id"], row) for row in rows)
+            self.queued += len(rows)
+            metrics.WRITE_ROWS.inc(len(rows), result="queued")
+            metrics.WRITE_QUEUE_DEPTH.set(len(self._rows))
+            self._cond.notify_all()
+
+    def is_pending(self, public_id):
+        """True while the row with this public_id is queued or being written."""
+        with self._cond:
+            return public_id in self._pending
+
+    def _take(self):
+        """Block for the first row, then gather more until the interval ends."""
+        with self._cond:
+            while not self._rows:
+                self._cond.wait()
+
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._rows) < self.batch_size and not self._flushing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = [self._rows.popleft() for _ in range(min(self.batch_size, len(self._rows)))]
+            self._in_flight = len(batch)
+            metrics.WRITE_QUEUE_DEPTH.set(len(self._rows))
+            # room for submitters waiting on a full queue
+            self._cond.notify_all()
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take()
+            started = time.perf_counter()
+            with self.app.app_context():
+                written = self._write(batch)
+            elapsed = time.perf_counter() - started
+
+            with self._cond:
+                for row in batch:
+                    self._pending.pop(row["public_id"], None)
+                self._in_flight = 0
+                self.batches += 1
+                self.written += written
+                self.failed += len(batch) - written
+                self.max_batch_seen = max(self.max_batch_seen, len(batch))
+                self._commit_times.append(elapsed)
+                self._cond.notify_all()
+
+            metrics.WRITE_BATCH_ROWS.observe(len(batch))
+            metrics.WRITE_ROWS.inc(written, result="written")
+            if written < len(batch):
+                metrics.WRITE_ROWS.inc(len(batch) - written, result="failed")
+
+    def _write(self, batch):
+        """Insert batch in one transaction, falling back to one row at a time."""
+        try:
+            with metrics.stage("write_behind_commit"):
+                db.session.execute(insert(Prediction), batch)
+                db.session.commit()
+            return len(batch)
+        except Exception as error:
+            db.session.rollback()
+            self.app.logger.warning(
+                "Write-behind batch of %d failed (%s), writing rows one by one", len(batch), error)
+
+        written = 0
+        for row in batch:
+            try:
+                db.session.execute(insert(Prediction), [row])
+                db.session.commit()
+                written += 1
+            except Exception as error:
+                db.session.rollback()
+                self.app.logger.error("Write-behind dropped prediction %s: %s", row["public_id"], error)
+        return written
+
+    def flush(self, timeout=None):
+        """
+        Write everything queued so far without waiting for more rows.
+
+        Returns:
+            bool: True if the queue was drained within timeout seconds
+        """
+        with self._cond:
+            if not self._rows and not self._in_flight:
+                return True
+        self._ensure_thread()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                while self._rows or self._in_flight:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                return True
+            finally:
+                self._flushing -= 1
+
+    def stats(self):
+        with self._cond:
+            commits = np.array(self._commit_times) * 1000.0
+            return {
+                "queue_depth": len(self._rows),
+                "max_size": self.max_size,
+                "in_flight": self._in_flight,
+                "queued": self.queued,
+                "written": self.written,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "batches": self.batches,
+                "mean_batch_size": (self.written + self.failed) / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_batch_seen,
+                "batch_size": self.batch_size,
+                "flush_interval_ms": self.flush_interval * 1000.0,
+                "commit_ms_p50": float(np.percentile(commits, 50)) if len(commits) else None,
+                "commit_ms_p99": float(np.percentile(commits, 99)) if len(commits) else None,
+            }
+
+
+def write_queue():
+    """The write-behind queue if WRITE_BEHIND_ENABLED, created on first use."""
+    global _queue
+
+    if not current_app.config.get("WRITE_BEHIND_ENABLED", False):
+        return None
+    if _queue is None:
+        _queue = WriteBehindQueue(
+            current_app._get_current_object(),
+            max_size=current_app.config.get("WRITE_BEHIND_QUEUE_SIZE", 10000),
+            batch_size=current_app.config.get("WRITE_BEHIND_BATCH_SIZE", 500),
+            flush_interval=current_app.config.get("WRITE_BEHIND_FLUSH_INTERVAL", 0.05),
+            put_timeout=current_app.config.get("WRITE_BEHIND_PUT_TIMEOUT", 1.0),
+        )
+    return _queue
+
+
+def flush_write_queue(timeout=None):
+    """Drain the queue (if there is one); False if rows are still waiting after timeout."""
+    if _queue is None:
+        return True
+    if timeout is None:
+        timeout = _queue.app.config.get("WRITE_BEHIND_SHUTDOWN_TIMEOUT", 30.0)
+    drained = _queue.flush(timeout)
+    if not drained:
+        _queue.app.logger.error(
+            "Write-behind: %d predictions not written at shutdown", _queue.stats()["queue_depth"])
+    return drained
+
+
+def write_queue_stats():
+    """Depth, batch sizes and commit times of the write-behind queue (None if off)."""
+    return _queue.stats() if _queue is not None else None
+
+
+# rows still queued when the process exits are written first
+atexit.register(flush_write_queue)
@@ -1,8 +1,14 @@
 import json
+import os
+import shutil
 from datetime import datetime
 from unittest.mock import patch
 
+import joblib
+import numpy as np
+import pandas as pd
 import pytest
+from sklearn.ensemble import RandomForestRegressor
 
 from application import app, db
 from application.models import User, Prediction
@@ -45,3 +51,208 @@ def client(app_fixture):
     """
     return app_fixture.test_client()
 
+
+# ===========================================================
+#  SYNTHETIC MODEL
+#  The real final_model_compressed_v2.joblib is too big for the repo,
+#  so predictor tests use a small forest with the same feature layout.
+# ===========================================================
+
+REAL_MODEL_DIR = os.path.join(os.path.dirname(__file__), "..", "Model")
+
+COMPONENT_FILES = [
+    "scaler.pkl",
+    "encoder.pkl",
+    "categorical_cols.pkl",
+    "continuous_cols.pkl",
+    "feature_columns.pkl",
+    "furnish_map.pkl",
+    "model_info.pkl",
+]
+
+
+def build_synthetic_forest(n_estimators=10, max_depth=10, n_rows=3000, seed=0):
+    """
+    Fit a small RandomForestRegressor on random rows shaped like the real
+    (scaled, one-hot encoded) feature matrix. Target is a log-rent.
+    """
+    feature_columns = joblib.load(os.path.join(REAL_MODEL_DIR, "feature_columns.pkl"))
+    rng = np.random.default_rng(seed)
+
+    beds, baths, furnishing, age, log_area = (
+        feature_columns.index(col)
+        for col in ["Beds", "Baths", "Furnishing", "Age_of_listing_in_days", "Log_Area"]
+    )
+    one_hot = [i for i in range(len(feature_columns)) if i not in (beds, baths, furnishing, age, log_area)]
+
+    X = np.zeros((n_rows, len(feature_columns)))
+    X[:, [beds, baths, age, log_area]] = rng.normal(size=(n_rows, 4))
+    X[:, furnishing] = rng.integers(0, 2, size=n_rows)
+    X[np.arange(n_rows), rng.choice(one_hot, size=n_rows)] = 1.0
+
+    y = 11.5 + 0.6 * X[:, log_area] + 0.2 * X[:, beds] + 0.1 * X[:, furnishing]
+    y += X[:, one_hot[:40]] @ rng.normal(0, 0.3, 40) + rng.normal(0, 0.05, n_rows)
+
+    model = RandomForestRegressor(
+        n_estimators=n_estimators, max_depth=max_depth, random_state=seed
+    )
+    model.fit(pd.DataFrame(X, columns=feature_columns), y)
+    return model
+
+
+@pytest.fixture(scope="session")
+def synthetic_model_dir(tmp_path_factory):
+    """A Model/ directory holding the real preprocessors + synthetic forest."""
+    model_dir = tmp_path_factory.mktemp("Model")
+    for name in COMPONENT_FILES:
+        shutil.copy(os.path.join(REAL_MODEL_DIR, name), model_dir / name)
+    joblib.dump(build_synthetic_forest(), model_dir / "final_model_compressed_v2.joblib", compress=3)
+    return str(model_dir)
+
+
+@pytest.fixture
+def synthetic_model(app_fixture, synthetic_model_dir, monkeypatch):
+    """Point the predictor at the synthetic model and force a fresh load."""
+    from application import predictor
+
+    monkeypatch.setitem(app_fixture.config, "MODEL_DIR", synthetic_model_dir)
+    predictor._registry.clear()
+    predictor.load_model_components()
+    yield predictor
+    predictor._registry.clear()
+
+
+# ===========================================================
+#  BENCHMARKS (pytest test/test_benchmark.py --benchmark)
+#  Skipped unless --benchmark is given. Results are compared with a
+#  JSON baseline from an earlier run on the same machine;
+#  --benchmark-save (re)writes that baseline.
+# ===========================================================
+
+DEFAULT_BENCHMARK_BASELINE = os.path.join(os.path.dirname(__file__), "benchmark_baseline.json")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmark")
+    group.addoption("--benchmark", action="store_true", help="Run the benchmarks in test_benchmark.py")
+    group.addoption("--benchmark-save", action="store_true",
+                    help="Write this run's results as the new baseline")
+    group.addoption("--benchmark-baseline", default=DEFAULT_BENCHMARK_BASELINE,
+                    help="Baseline JSON file (default: test/benchmark_baseline.json)")
+    group.addoption("--benchmark-threshold", type=float,
+                    default=float(os.environ.get("BENCHMARK_THRESHOLD", 0.25)),
+                    help="Fail a benchmark whose median is this much slower than the baseline "
+                         "(0.25 = 25%%, env BENCHMARK_THRESHOLD)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: timing benchmark, only run with --benchmark")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="benchmark: run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+class BenchmarkRecorder:
+    """Times callables, keeps the results and compares them with the baseline."""
+
+    def __init__(self, baseline_path, threshold):
+        self.baseline_path = baseline_path
+        self.threshold = threshold
+        self.results = {}
+        self.baseline = {}
+        if os.path.exists(baseline_path):
+            with open(baseline_path) as f:
+                self.baseline = json.load(f).get("results", {})
+
+    def run(self, name, fn, rows=1, min_rounds=20, min_time=0.2, max_rounds=2000, warmup=3):
+        """
+        Call fn repeatedly (at least min_rounds times and min_time seconds)
+        and record its latency distribution.
+
+        Returns:
+            dict: rounds, median / p95 / mean in ms, rows per second
+        """
+        import time
+
+        for _ in range(warmup):
+            fn()
+
+        times = []
+        started = time.perf_counter()
+        while len(times) < max_rounds and (len(times) < min_rounds or time.perf_counter() - started < min_time):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+
+        times = np.array(times)
+        median = float(np.median(times))
+        result = {
+            "rows": rows,
+            "rounds": len(times),
+            "median_ms": median * 1000,
+            "p95_ms": float(np.percentile(times, 95)) * 1000,
+            "mean_ms": float(times.mean()) * 1000,
+            "rows_per_s": rows / median,
+        }
+        self.results[name] = result
+        return result
+
+    def check(self, name):
+        """Fail the calling test if name got slower than the baseline allows."""
+        baseline = self.baseline.get(name)
+        if baseline is None:
+            return
+        current = self.results[name]["median_ms"]
+        limit = baseline["median_ms"] * (1 + self.threshold)
+        if current > limit:
+            pytest.fail(
+                f"{name}: median {current:.3f} ms is more than {self.threshold:.0%} slower "
+                f"than the baseline {baseline['median_ms']:.3f} ms"
+            )
+
+    def save(self):
+        import platform
+
+        results = dict(self.baseline, **self.results)
+        with open(self.baseline_path, "w") as f:
+            json.dump({
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "machine": platform.machine(),
+                "python": platform.python_version(),
+                "cpus": os.cpu_count(),
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+
+
+@pytest.fixture(scope="session")
+def benchmark_recorder(request):
+    config = request.config
+    recorder = BenchmarkRecorder(config.getoption("--benchmark-baseline"), config.getoption("--benchmark-threshold"))
+    config._benchmark_recorder = recorder
+    yield recorder
+    if config.getoption("--benchmark-save") and recorder.results:
+        recorder.save()
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    recorder = getattr(config, "_benchmark_recorder", None)
+    if recorder is None or not recorder.results:
+        return
+    terminalreporter.section("benchmarks")
+    terminalreporter.write_line(f"{'name':<40} {'rows':>6} {'median ms':>10} {'p95 ms':>10} "
+                                f"{'rows/s':>12} {'vs baseline':>12}")
+    for name, result in sorted(recorder.results.items()):
+        baseline = recorder.baseline.get(name)
+        change = f"{result['median_ms'] / baseline['median_ms'] - 1:+.1%}" if baseline else "new"
+        terminalreporter.write_line(
+            f"{name:<40} {result['rows']:>6} {result['median_ms']:>10.3f} {result['p95_ms']:>10.3f} "
+            f"{result['rows_per_s']:>12,.0f} {change:>12}"
+        )
+    if config.getoption("--benchmark-save"):
+        terminalreporter.write_line(f"baseline written to {recorder.baseline_path}")
@@ -769,3 +769,358 @@ def test_api_delete_prediction(client, capsys):
 
     # Confirm actually deleted from DB
     assert Prediction.query.get(new_id) is None
+
+
+# ===========================================================
+#  HISTORY QUERY / SYNTHETIC DATA TESTS
+# ===========================================================
+
+def _seed_history(n_predictions=600, n_users=12):
+    from application import datagen, predictor
+
+    return datagen.generate_history(n_predictions, n_users, predictor._model_dir(), days=90, seed=3,
+                                    chunk_size=250)
+
+
+def test_generate_history_is_skewed_and_consistent(client):
+    from application import datagen
+
+    report = _seed_history()
+    assert report["predictions"] == 600
+    assert User.query.count() == 12
+    assert Prediction.query.count() == 600
+
+    # every location sits in one city
+    pairs = db.session.execute(db.select(Prediction.location, Prediction.city).distinct()).all()
+    assert len({location for location, _ in pairs}) == len(pairs)
+
+    # the heaviest user owns far more than an even share
+    _, rows = datagen.user_by_history_size(0)
+    assert rows > 2 * 600 / 12
+
+
+def test_build_history_query_matches_python_filtering(client):
+    from application.datagen import user_by_history_size
+    from application.queries import build_history_query, history_filters
+
+    _seed_history()
+    user_id, _ = user_by_history_size(0)
+
+    filters = history_filters({"min_beds": "1", "max_beds": "3", "min_area": "500", "furnishing": "Furnished"})
+    query, date_error = build_history_query(user_id, filters, sort_by="rent", order="asc")
+    got = db.session.execute(query).scalars().all()
+
+    expected = [
+        p for p in Prediction.query.filter_by(user_id=user_id).all()
+        if 1 <= p.bedrooms <= 3 and p.area >= 500 and p.furnishing == "Furnished"
+    ]
+    assert not date_error
+    assert {p.id for p in got} == {p.id for p in expected}
+    rents = [p.predicted_rent for p in got]
+    assert rents == sorted(rents)
+
+    _, date_error = build_history_query(user_id, history_filters({"start_date": "not-a-date"}))
+    assert date_error
+
+
+def test_benchmark_history_reports_percentiles_and_plans(client):
+    from application.datagen import user_by_history_size
+    from application.queries import SORT_MAP, benchmark_history
+
+    _seed_history()
+    user_id, rows = user_by_history_size(0)
+    results = benchmark_history(user_id, repeat=3, explain=True)
+
+    assert {r["sort_by"] for r in results} == set(SORT_MAP)
+    everything = next(r for r in results if r["name"] == "sort created_at desc")
+    assert everything["total"] == rows
+    for result in results:
+        assert 0 < result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+        assert result["plan"]
+
+
+# ===========================================================
+#  KEYSET PAGINATION TESTS
+# ===========================================================
+
+def _walk_pages(user_id, sort_by, order, per_page=7):
+    from application.queries import history_filters, history_page
+
+    pages = []
+    cursor = None
+    while True:
+        page, _ = history_page(user_id, history_filters({}), sort_by, order, per_page, cursor)
+        pages.append(page)
+        if not page.has_next:
+            return pages
+        cursor = page.next_cursor
+
+
+def test_keyset_pages_visit_every_row_once_in_order(client):
+    from application.datagen import user_by_history_size
+    from application.queries import SORT_MAP, build_history_query, history_filters
+
+    _seed_history(300, 6)
+    user_id, rows = user_by_history_size(0)
+    # created_at from the server default (no microseconds), a tie with nothing
+    db.session.add(Prediction(area=900, bedrooms=2, bathrooms=2, furnishing="Furnished", age_of_listing=5,
+                              property_type="Apartment", city="Dubai", location="Dubai Marina",
+                              predicted_rent=90000, user_id=user_id))
+    db.session.commit()
+
+    for sort_by, column in SORT_MAP.items():
+        for order in ("desc", "asc"):
+            query, _ = build_history_query(user_id, history_filters({}), sort_by, order)
+            tie_break = Prediction.id.asc() if order == "asc" else Prediction.id.desc()
+            expected = db.session.execute(query.order_by(tie_break).with_only_columns(Prediction.id)).scalars().all()
+
+            pages = _walk_pages(user_id, sort_by, order)
+            got = [p.id for page in pages for p in page.items]
+            assert got == expected, (sort_by, order)
+            assert [page.page for page in pages] == list(range(1, len(pages) + 1))
+            assert all(page.total == rows + 1 for page in pages)
+
+
+def test_keyset_prev_cursor_returns_the_same_page(client):
+    from application.datagen import user_by_history_size
+    from application.queries import history_filters, history_page
+
+    _seed_history(300, 6)
+    user_id, _ = user_by_history_size(0)
+    pages = _walk_pages(user_id, "rent", "asc", per_page=5)[:3]
+
+    back, _ = history_page(user_id, history_filters({}), "rent", "asc", 5, pages[2].prev_cursor)
+    assert back.page == 2
+    assert [p.id for p in back.items] == [p.id for p in pages[1].items]
+    assert back.has_prev and back.has_next
+
+    first, _ = history_page(user_id, history_filters({}), "rent", "asc", 5, back.prev_cursor)
+    assert [p.id for p in first.items] == [p.id for p in pages[0].items]
+    assert first.page == 1 and not first.has_prev
+
+
+def test_keyset_bad_or_foreign_cursor_starts_over(client):
+    from application.datagen import user_by_history_size
+    from application.queries import history_filters, history_page
+
+    _seed_history(300, 6)
+    user_id, _ = user_by_history_size(0)
+    first, second = _walk_pages(user_id, "area", "desc", per_page=5)[:2]
+
+    for cursor in (second.next_cursor[:-3] + "abc", "garbage"):
+        page, _ = history_page(user_id, history_filters({}), "area", "desc", 5, cursor)
+        assert page.page == 1
+        assert [p.id for p in page.items] == [p.id for p in first.items]
+
+    # a cursor made for another sort is ignored
+    page, _ = history_page(user_id, history_filters({}), "city", "desc", 5, second.next_cursor)
+    assert page.page == 1
+
+
+def test_keyset_total_modes(client):
+    from application.datagen import user_by_history_size
+    from application.queries import history_filters, history_page
+
+    _seed_history(300, 6)
+    user_id, rows = user_by_history_size(0)
+
+    capped, _ = history_page(user_id, history_filters({}), per_page=5, total_mode="capped", total_cap=10)
+    assert (capped.total, capped.total_is_estimate, capped.total_label) == (10, True, "10+")
+    following, _ = history_page(user_id, history_filters({}), per_page=5, cursor=capped.next_cursor,
+                                total_mode="capped", total_cap=10)
+    assert following.total_label == "10+"
+
+    off, _ = history_page(user_id, history_filters({}), per_page=5, total_mode="off")
+    assert off.total is None and off.total_label == "—"
+    assert off.first_index == 1 and off.last_index == 5
+
+    exact, _ = history_page(user_id, history_filters({}), per_page=5, total_mode="capped", total_cap=rows)
+    assert (exact.total, exact.total_is_estimate) == (rows, False)
+
+
+def test_history_and_home_pages_follow_cursors(client):
+    from application.datagen import user_by_history_size
+
+    _seed_history(300, 6)
+    user_id, rows = user_by_history_size(0)
+    user = db.session.get(User, user_id)
+    login(client, email=user.email, password="password123")
+
+    resp = client.get("/history?sort_by=rent&order=asc")
+    assert resp.status_code == 200
+    assert b"cursor=" in resp.data
+    assert f"{rows:,}".encode() in resp.data
+
+    from application.queries import history_filters, history_page
+    first, _ = history_page(user_id, history_filters({}), "rent", "asc", 10)
+    resp = client.get("/history", query_string={"sort_by": "rent", "order": "asc", "cursor": first.next_cursor})
+    assert resp.status_code == 200
+    assert b"<strong>11</strong>" in resp.data
+
+    resp = client.get("/")
+    assert resp.status_code == 200
+    assert b"cursor=" in resp.data
+
+
+# ===========================================================
+#  INDEX ADVISOR TESTS
+# ===========================================================
+
+def test_history_queries_use_indexes(client):
+    from application.datagen import user_by_history_size
+    from application.queries import advise_history_indexes, missing_indexes
+
+    _seed_history()
+    user_id, _ = user_by_history_size(0)
+
+    assert missing_indexes() == []
+    report = advise_history_indexes(user_id)
+    assert report
+    assert [e for e in report if "scan" in e["problems"]] == []
+    # plain sorts read an index in order
+    plain = [e for e in report if e["case"].startswith("sort ") and e["statement"] != "count"]
+    assert all(e["problems"] == [] for e in plain)
+
+
+def test_advisor_flags_scans_and_recreates_indexes(client):
+    from application.queries import (
+        advise_history_indexes, create_missing_indexes, history_bench_cases, missing_indexes,
+    )
+
+    _seed_history()
+    for index in Prediction.__table__.indexes:
+        index.drop(db.session.connection())
+    db.session.commit()
+
+    assert len(missing_indexes()) == len(Prediction.__table__.indexes)
+    cases = [c for c in history_bench_cases() if c[0] == "sort rent desc"]
+    report = advise_history_indexes(1, cases=cases)
+    assert {e["statement"] for e in report if "scan" in e["problems"]} == {"count", "first page", "next page"}
+
+    assert sorted(create_missing_indexes()) == sorted(i.name for i in Prediction.__table__.indexes)
+    assert missing_indexes() == []
+    assert not any("scan" in e["problems"] for e in advise_history_indexes(1, cases=cases))
+
+
+# ===========================================================
+#  LOCATION SEARCH (FTS5) TESTS
+# ===========================================================
+
+def _location_ids(user_id, term):
+    from application.queries import filtered_history_query, history_filters
+
+    query, _ = filtered_history_query(user_id, history_filters({"location": term}))
+    return {p.id for p in db.session.execute(query).scalars()}
+
+
+def _ilike_ids(user_id, term):
+    query = db.select(Prediction.id).where(Prediction.user_id == user_id, Prediction.location.ilike(f"%{term}%"))
+    return set(db.session.execute(query).scalars())
+
+
+def test_location_search_matches_ilike(client):
+    from application.datagen import user_by_history_size
+    from application.search import location_search_available
+
+    _seed_history()
+    user_id, _ = user_by_history_size(0)
+    assert location_search_available()
+
+    for term in ("marina", "MARINA", "Jumeirah Village", "al ", "a", "zz-no-such-place"):
+        assert _location_ids(user_id, term) == _ilike_ids(user_id, term), term
+    # FTS5 syntax in the term is matched literally
+    for term in ('"marina', "marina OR dubai", "mar*", "NEAR(a b)"):
+        assert _location_ids(user_id, term) == _ilike_ids(user_id, term), term
+
+
+def test_location_search_follows_inserts_and_deletes(client):
+    user = create_user()
+    pred = Prediction(area=900, bedrooms=2, bathrooms=2, furnishing="Furnished", age_of_listing=5,
+                      property_type="Apartment", city="Dubai", location="Zabeel Heights", predicted_rent=90000,
+                      user_id=user.id)
+    db.session.add(pred)
+    db.session.commit()
+    assert _location_ids(user.id, "beel hei") == {pred.id}
+
+    db.session.delete(pred)
+    db.session.commit()
+    assert _location_ids(user.id, "beel hei") == set()
+
+
+def test_location_search_rebuilds_for_an_existing_database(client):
+    from application import search
+    from application.datagen import user_by_history_size
+
+    _seed_history()
+    user_id, _ = user_by_history_size(0)
+    db.session.commit()
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql(f"DROP TABLE {search.LOCATION_FTS_TABLE}")
+    search._available.clear()
+    assert not search.location_search_available()
+    # without the index it falls back to ILIKE
+    assert _location_ids(user_id, "marina") == _ilike_ids(user_id, "marina")
+
+    assert search.ensure_location_search()
+    assert search.location_search_available()
+    assert _location_ids(user_id, "marina") == _ilike_ids(user_id, "marina")
+
+
+def test_history_relevance_sort_ranks_location_matches(client):
+    from application.queries import history_filters, history_page
+
+    user = _make_logged_in_user(client)
+    for location in ("Downtown Marina Walk", "Marina Gate", "Dubai Marina", "Marina", "Bluewaters"):
+        db.session.add(Prediction(area=900, bedrooms=2, bathrooms=2, furnishing="Furnished", age_of_listing=5,
+                                  property_type="Apartment", city="Dubai", location=location,
+                                  predicted_rent=90000, user_id=user.id))
+    db.session.commit()
+
+    page, _ = history_page(user.id, history_filters({"location": "marina"}), "relevance", "desc", per_page=2)
+    following, _ = history_page(user.id, history_filters({"location": "marina"}), "relevance", "desc",
+                                per_page=2, cursor=page.next_cursor)
+    locations = [p.location for p in page.items + following.items]
+    assert locations[:2] == ["Marina", "Marina Gate"]
+    assert set(locations[2:]) == {"Downtown Marina Walk", "Dubai Marina"}
+
+    resp = client.get("/history?location=marina&sort_by=relevance")
+    assert resp.status_code == 200
+    assert b'value="relevance" selected' in resp.data
+
+
+# ===========================================================
+#  SCHEMA UPGRADE TESTS
+# ===========================================================
+
+def test_upgrade_adds_columns_to_old_prediction_table():
+    from sqlalchemy import create_engine, inspect
+
+    from application.schema import upgrade_prediction_table
+
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        # the prediction table as first shipped: no model_version / public_id
+        connection.exec_driver_sql(
+            "CREATE TABLE prediction (id INTEGER PRIMARY KEY, area FLOAT, bedrooms INTEGER, "
+            "bathrooms INTEGER, furnishing VARCHAR(15), age_of_listing INTEGER, property_type VARCHAR(20), "
+            "city VARCHAR(50), location VARCHAR(100), predicted_rent FLOAT, created_at DATETIME, user_id INTEGER)"
+        )
+        connection.exec_driver_sql("INSERT INTO prediction (area, predicted_rent) VALUES (850, 100000), (900, 110000)")
+
+        assert sorted(upgrade_prediction_table(connection)) == ["model_version", "public_id"]
+        assert upgrade_prediction_table(connection) == []  # idempotent
+
+        public_ids = [row[0] for row in connection.exec_driver_sql("SELECT public_id FROM prediction")]
+        assert len(set(public_ids)) == 2 and all(public_ids)
+        indexes = {index["name"]: index for index in inspect(connection).get_indexes("prediction")}
+        assert indexes["uq_prediction_public_id"]["unique"]
+
+
+def test_upgraded_table_works_with_the_app(client):
+    # the app's own table already has every column: nothing to add
+    from application.schema import ensure_schema
+
+    assert ensure_schema() == []
+    db.session.add(Prediction(area=850, predicted_rent=1.0))
+    db.session.commit()
+    assert Prediction.query.one().public_id
@@ -0,0 +1,119 @@
+"""
+Latency / throughput benchmarks of the prediction hot path, on the
+synthetic forest (no large model file needed).
+
+    pytest test/test_benchmark.py --benchmark                  # compare with the baseline
+    pytest test/test_benchmark.py --benchmark --benchmark-save # record a new baseline
+
+A benchmark fails when its median is more than --benchmark-threshold
+slower than the baseline recorded on this machine.
+"""
+import pandas as pd
+import pytest
+
+pytestmark = pytest.mark.benchmark
+
+BATCH_ROWS = 1000
+
+API_ITEM = {"area": 850, "bedrooms": 2, "bathrooms": 2, "furnishing": "Furnished", "age_of_listing": 7,
+            "property_type": "Apartment", "city": "Dubai", "location": "Dubai Marina"}
+
+FORM_ITEM = {"area_in_sqft": 850, "beds": 2, "baths": 2, "age_of_listing_in_days": 7, "furnishing": "Furnished",
+             "type": "Apartment", "location": "Dubai Marina", "city": "Dubai"}
+
+
+@pytest.fixture
+def uncached(synthetic_model, monkeypatch):
+    """The predictor with the prediction cache off, so every call is scored."""
+    monkeypatch.setattr(synthetic_model, "_cache", None)
+    return synthetic_model
+
+
+# ===========================================================
+#  PREDICTOR PIPELINE
+# ===========================================================
+
+@pytest.mark.parametrize("rows", [1, BATCH_ROWS])
+def test_preprocess_compiled(synthetic_model, benchmark_recorder, rows):
+    mv = synthetic_model.current_version()
+    records = synthetic_model.sample_inputs(rows, mv=mv)
+
+    name = f"preprocess_compiled[{rows}]"
+    benchmark_recorder.run(name, lambda: mv.compiled.transform(records), rows=rows)
+    benchmark_recorder.check(name)
+
+
+@pytest.mark.parametrize("rows", [1, BATCH_ROWS])
+def test_preprocess_pandas(synthetic_model, benchmark_recorder, rows):
+    mv = synthetic_model.current_version()
+    records = synthetic_model.sample_inputs(rows, mv=mv)
+
+    def preprocess():
+        df = pd.DataFrame(records, columns=synthetic_model.INPUT_FIELDS)
+        return synthetic_model._preprocess_frame(df, mv)
+
+    name = f"preprocess_pandas[{rows}]"
+    benchmark_recorder.run(name, preprocess, rows=rows)
+    benchmark_recorder.check(name)
+
+
+@pytest.mark.parametrize("rows", [1, BATCH_ROWS])
+def test_model_predict(synthetic_model, benchmark_recorder, rows):
+    mv = synthetic_model.current_version()
+    X = synthetic_model._build_features(synthetic_model.sample_inputs(rows, mv=mv), mv)
+
+    name = f"model_predict[{rows}]"
+    benchmark_recorder.run(name, lambda: synthetic_model._score_matrix(X, mv), rows=rows)
+    benchmark_recorder.check(name)
+
+
+def test_end_to_end_single(uncached, benchmark_recorder):
+    record = uncached.sample_inputs(1)[0]
+
+    name = "end_to_end[1]"
+    benchmark_recorder.run(name, lambda: uncached.preprocess_and_predict(dict(record)))
+    benchmark_recorder.check(name)
+
+
+def test_end_to_end_batch(uncached, benchmark_recorder):
+    records = uncached.sample_inputs(BATCH_ROWS)
+
+    name = f"end_to_end_batch[{BATCH_ROWS}]"
+    benchmark_recorder.run(name, lambda: uncached.preprocess_and_predict_batch(records), rows=BATCH_ROWS)
+    benchmark_recorder.check(name)
+
+
+# ===========================================================
+#  ROUTES (Flask test client, including the DB insert)
+# ===========================================================
+
+def test_route_api_predictions(client, uncached, benchmark_recorder):
+    def request():
+        resp = client.post("/api/predictions", json=API_ITEM)
+        assert resp.status_code == 200
+
+    name = "route_api_predictions"
+    benchmark_recorder.run(name, request)
+    benchmark_recorder.check(name)
+
+
+def test_route_api_predictions_batch(client, uncached, benchmark_recorder):
+    payload = {"items": [API_ITEM] * BATCH_ROWS}
+
+    def request():
+        resp = client.post("/api/predictions/batch", json=payload)
+        assert resp.status_code == 200
+
+    name = f"route_api_predictions_batch[{BATCH_ROWS}]"
+    benchmark_recorder.run(name, request, rows=BATCH_ROWS)
+    benchmark_recorder.check(name)
+
+
+def test_route_predict_form(client, uncached, benchmark_recorder):
+    def request():
+        resp = client.post("/predict", data=FORM_ITEM)
+        assert resp.status_code == 302
+
+    name = "route_predict_form"
+    benchmark_recorder.run(name, request)
+    benchmark_recorder.check(name)
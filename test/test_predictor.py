@@ -0,0 +1,1662 @@
+import json
+import os
+import time
+
+import numpy as np
+import pytest
+from flask import current_app
+
+from application import db
+from application.models import Prediction
+
+
+# ===========================================================
+#  SMALL HELPERS
+# ===========================================================
+
+def make_input(**overrides):
+    input_data = {
+        "Area_in_sqft": 850.0,
+        "Beds": 2,
+        "Baths": 2,
+        "Age_of_listing_in_days": 7,
+        "Furnishing": "Furnished",
+        "Type": "Apartment",
+        "Location": "Dubai Marina",
+        "City": "Dubai",
+    }
+    input_data.update(overrides)
+    return input_data
+
+
+def random_inputs(predictor, n, seed=0):
+    """Random but realistic inputs drawn from the encoder's categories."""
+    rng = np.random.default_rng(seed)
+    types, locations, cities = (list(c) for c in predictor.current_version().encoder.categories_)
+    return [
+        {
+            "Area_in_sqft": float(rng.uniform(300, 8000)),
+            "Beds": int(rng.integers(0, 8)),
+            "Baths": int(rng.integers(0, 8)),
+            "Age_of_listing_in_days": int(rng.integers(0, 365)),
+            "Furnishing": str(rng.choice(["Furnished", "Unfurnished"])),
+            "Type": str(rng.choice(types)),
+            "Location": str(rng.choice(locations + ["Unknown Place"])),
+            "City": str(rng.choice(cities)),
+        }
+        for _ in range(n)
+    ]
+
+
+# ===========================================================
+#  BATCH PREDICTION TESTS
+# ===========================================================
+
+def test_batch_matches_single_predictions(synthetic_model):
+    """CONSISTENCY: Batch results equal one-by-one results, in input order."""
+    records = random_inputs(synthetic_model, 25)
+
+    batch = synthetic_model.preprocess_and_predict_batch(records)
+    single = [synthetic_model.preprocess_and_predict(r) for r in records]
+
+    assert [r["predicted_rent"] for r in batch] == pytest.approx(single, rel=1e-12)
+
+
+def test_batch_reports_errors_per_row(synthetic_model):
+    """EXPECTED FAILURE: A bad row gets an error, the rest still predict."""
+    bad_missing = make_input()
+    del bad_missing["City"]
+    records = [make_input(), bad_missing, make_input(Beds="two"), make_input(Area_in_sqft=1200)]
+
+    results = synthetic_model.preprocess_and_predict_batch(records)
+
+    assert len(results) == 4
+    assert results[0]["predicted_rent"] > 0
+    assert "Missing fields: City" in results[1]["error"]
+    assert "Invalid input values" in results[2]["error"]
+    assert results[3]["predicted_rent"] > 0
+
+
+def test_api_batch_endpoint_does_not_save_by_default(client, synthetic_model):
+    items = [
+        {"area": 800, "bedrooms": 2, "bathrooms": 2, "furnishing": "Furnished",
+         "age_of_listing": 30, "property_type": "Apartment", "city": "Dubai",
+         "location": "Dubai Marina"},
+        {"area": 1200, "bedrooms": 3, "furnishing": "Unfurnished"},
+    ]
+
+    resp = client.post(
+        "/api/predictions/batch",
+        data=json.dumps({"items": items}),
+        content_type="application/json",
+    )
+
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["count"] == 2
+    assert body["succeeded"] == 1
+    assert body["results"][0]["predicted_rent"] > 0
+    assert body["results"][1]["success"] is False
+    assert "Missing fields" in body["results"][1]["message"]
+    assert Prediction.query.count() == 0
+
+
+def test_api_batch_endpoint_saves_when_requested(client, synthetic_model):
+    item = {"area": 800, "bedrooms": 2, "bathrooms": 2, "furnishing": "Furnished",
+            "age_of_listing": 30, "property_type": "Apartment", "city": "Dubai",
+            "location": "Dubai Marina"}
+
+    resp = client.post(
+        "/api/predictions/batch",
+        data=json.dumps({"items": [item, dict(item, area=1600)], "save": True}),
+        content_type="application/json",
+    )
+
+    body = resp.get_json()
+    assert resp.status_code == 200
+    assert Prediction.query.count() == 2
+    saved = db.session.get(Prediction, body["results"][1]["id"])
+    assert saved.area == 1600
+    assert saved.predicted_rent == body["results"][1]["predicted_rent"]
+
+
+@pytest.mark.parametrize("save", ["false", "0", "no", 1, None])
+def test_api_batch_endpoint_rejects_non_boolean_save(client, save):
+    resp = client.post("/api/predictions/batch", json={"items": [{"area": 800}], "save": save})
+    assert resp.status_code == 400
+    assert "save" in resp.get_json()["message"]
+    assert Prediction.query.count() == 0
+
+def test_api_batch_endpoint_rejects_empty_items(client):
+    resp = client.post(
+        "/api/predictions/batch",
+        data=json.dumps({"items": []}),
+        content_type="application/json",
+    )
+    assert resp.status_code == 400
+
+
+# ===========================================================
+#  COMPILED PREPROCESSOR TESTS
+# ===========================================================
+
+def test_compiled_features_match_pandas_bit_for_bit(synthetic_model):
+    """CONSISTENCY: Compiled feature rows equal the DataFrame path exactly."""
+    records = random_inputs(synthetic_model, 200, seed=1)
+    records.append(make_input(Furnishing="Semi", Location="Nowhere", City="Atlantis"))
+
+    compiled = synthetic_model.current_version().compiled.transform(records)
+    pandas_df = synthetic_model._preprocess_frame(
+        synthetic_model.pd.DataFrame(records, columns=synthetic_model.INPUT_FIELDS)
+    )
+
+    assert compiled.dtype == np.float64
+    assert np.array_equal(compiled, pandas_df.to_numpy())
+
+
+def test_compiled_and_pandas_engines_predict_the_same(synthetic_model, app_fixture, monkeypatch):
+    records = random_inputs(synthetic_model, 20, seed=2)
+    compiled = [synthetic_model.preprocess_and_predict(r) for r in records]
+
+    monkeypatch.setitem(app_fixture.config, "PREPROCESS_ENGINE", "pandas")
+    synthetic_model._registry.clear()
+    synthetic_model.load_model_components()
+    assert synthetic_model.current_version().compiled is None
+
+    assert [synthetic_model.preprocess_and_predict(r) for r in records] == compiled
+
+
+# ===========================================================
+#  FLAT FOREST ENGINE TESTS
+# ===========================================================
+
+def test_flat_forest_matches_sklearn_on_random_corpus(synthetic_model):
+    """CONSISTENCY: Every row reaches the same leaves as sklearn's trees."""
+    from application.forest import FlatForest
+
+    model = synthetic_model.current_version().model
+    X = synthetic_model._build_features(synthetic_model.sample_inputs(500, seed=3))
+    engine = FlatForest.from_sklearn(model)
+
+    expected = model.predict(synthetic_model._model_input(X))
+    assert engine.predict(X) == pytest.approx(expected, rel=1e-12)
+
+    X32 = X.astype(np.float32)
+    for t, est in enumerate(model.estimators_):
+        sklearn_leaves = est.apply(X32) + engine.roots[t]
+        assert np.array_equal(engine.leaves(X)[:, t], sklearn_leaves)
+
+
+def test_flat_engine_selected_by_config(synthetic_model, app_fixture, monkeypatch):
+    records = random_inputs(synthetic_model, 20, seed=4)
+    expected = [synthetic_model.preprocess_and_predict(r) for r in records]
+
+    monkeypatch.setitem(app_fixture.config, "INFERENCE_ENGINE", "flat")
+    synthetic_model._registry.clear()
+    synthetic_model.load_model_components()
+    assert synthetic_model.current_version().engine is not None
+
+    got = [synthetic_model.preprocess_and_predict(r) for r in records]
+    assert got == pytest.approx(expected, rel=1e-12)
+
+
+def test_flat_forest_rejects_wrong_width(synthetic_model):
+    from application.forest import FlatForest
+
+    engine = FlatForest.from_sklearn(synthetic_model.current_version().model)
+    with pytest.raises(ValueError):
+        engine.predict(np.zeros((1, 3)))
+
+
+# ===========================================================
+#  PREDICTION CACHE TESTS
+# ===========================================================
+
+def test_cache_lru_eviction_and_ttl(monkeypatch):
+    from application import cache as cache_module
+    from application.cache import PredictionCache
+
+    cache = PredictionCache(maxsize=2, ttl=10)
+    cache.put("a", 1.0)
+    cache.put("b", 2.0)
+    assert cache.get("a") == 1.0      # "a" is now most recent
+    cache.put("c", 3.0)               # evicts "b"
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+    now = cache_module.time.monotonic()
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now + 11)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_repeated_input_is_served_from_cache(synthetic_model, monkeypatch):
+    """CONSISTENCY: Equivalent inputs share one cache entry and one model call."""
+    calls = []
+    original = synthetic_model._score_records
+    monkeypatch.setattr(
+        synthetic_model, "_score_records",
+        lambda records, mv=None: calls.append(len(records)) or original(records, mv)
+    )
+
+    first = synthetic_model.preprocess_and_predict(make_input(Area_in_sqft=850.001))
+    second = synthetic_model.preprocess_and_predict(
+        make_input(Area_in_sqft=850.0, Location="  Dubai   Marina ")
+    )
+
+    assert first == second
+    assert calls == [1]
+    stats = synthetic_model.cache_stats()
+    assert stats["hits"] >= 1
+
+
+def test_cache_is_cleared_on_reload(synthetic_model):
+    synthetic_model.preprocess_and_predict(make_input())
+    assert synthetic_model.cache_stats()["size"] == 1
+
+    synthetic_model.reload_model_components()
+    assert synthetic_model.cache_stats()["size"] == 0
+
+
+def test_cache_stats_endpoint(client, synthetic_model):
+    synthetic_model.preprocess_and_predict(make_input())
+    synthetic_model.preprocess_and_predict(make_input())
+
+    resp = client.get("/api/model/cache")
+    body = resp.get_json()
+    assert resp.status_code == 200
+    assert body["enabled"] is True
+    assert body["cache"]["hits"] >= 1
+
+
+# ===========================================================
+#  MEMORY-MAPPED MODEL STORAGE TESTS
+# ===========================================================
+
+def test_mmap_storage_matches_joblib_model(synthetic_model, app_fixture, monkeypatch, tmp_path):
+    from application.forest import FlatForest
+
+    records = random_inputs(synthetic_model, 20, seed=5)
+    expected = synthetic_model.preprocess_and_predict_batch(records)
+
+    flat_dir = synthetic_model.export_flat_model(str(tmp_path / "flat"))
+
+    monkeypatch.setitem(app_fixture.config, "MODEL_STORAGE", "mmap")
+    monkeypatch.setitem(app_fixture.config, "FLAT_MODEL_DIR", flat_dir)
+    synthetic_model.reload_model_components()
+
+    assert isinstance(synthetic_model.current_version().model, FlatForest)
+    assert isinstance(synthetic_model.current_version().model.threshold, np.memmap)
+    got = synthetic_model.preprocess_and_predict_batch(records)
+    assert [r["predicted_rent"] for r in got] == pytest.approx(
+        [r["predicted_rent"] for r in expected], rel=1e-12
+    )
+
+    report = synthetic_model.model_memory_report()
+    assert report["storage"] == "mmap"
+    if report["available"]:
+        assert report["mapped_files"]["files"] == len(("feature", "threshold", "left", "right", "value", "roots"))
+        assert report["rss"] >= report["mapped_files"]["rss"]
+
+
+def bundle_with_forest(synthetic_model_dir, tmp_path, version, seed):
+    """A bundle of the synthetic preprocessors with its own forest (fitted with seed)."""
+    import joblib
+    import shutil
+
+    from application.bundle import build_bundle
+    from conftest import build_synthetic_forest
+
+    model_dir = tmp_path / f"Model-{version}"
+    shutil.copytree(synthetic_model_dir, model_dir)
+    joblib.dump(build_synthetic_forest(seed=seed), model_dir / "final_model_compressed_v2.joblib", compress=3)
+    bundle_path = str(tmp_path / f"{version}.bundle")
+    build_bundle(str(model_dir), bundle_path, version=version)
+    return bundle_path
+
+
+def test_mmap_storage_maps_the_bundles_own_forest(synthetic_model, synthetic_model_dir, app_fixture,
+                                                  monkeypatch, tmp_path):
+    from application.forest import FlatForest
+
+    records = random_inputs(synthetic_model, 20, seed=6)
+    bundle_path = bundle_with_forest(synthetic_model_dir, tmp_path, "other", seed=7)
+    monkeypatch.setitem(app_fixture.config, "MODEL_CACHE_DIR", "")
+    monkeypatch.setitem(app_fixture.config, "PREDICTION_CACHE_SIZE", 0)
+    monkeypatch.setitem(app_fixture.config, "MODEL_BUNDLE", bundle_path)
+    synthetic_model.reload_model_components()
+    expected = synthetic_model.preprocess_and_predict_batch(records)
+
+    monkeypatch.setitem(app_fixture.config, "MODEL_STORAGE", "mmap")
+    monkeypatch.setitem(app_fixture.config, "FLAT_MODEL_DIR", str(tmp_path / "flat"))
+    synthetic_model.reload_model_components()
+    mv = synthetic_model.current_version()
+    assert isinstance(mv.model, FlatForest) and mv.version == "other"
+    assert mv.flat_dir.startswith(str(tmp_path / "flat" / "bundles"))
+
+    got = synthetic_model.preprocess_and_predict_batch(records)
+    assert [r["predicted_rent"] for r in got] == pytest.approx([r["predicted_rent"] for r in expected], rel=1e-12)
+
+def test_mmap_storage_missing_export_fails_loudly(synthetic_model, app_fixture, monkeypatch, tmp_path):
+    monkeypatch.setitem(app_fixture.config, "MODEL_STORAGE", "mmap")
+    monkeypatch.setitem(app_fixture.config, "FLAT_MODEL_DIR", str(tmp_path / "missing"))
+    synthetic_model._registry.clear()
+
+    with pytest.raises(FileNotFoundError):
+        synthetic_model.load_model_components()
+
+
+def test_model_memory_endpoint(client, synthetic_model):
+    resp = client.get("/api/model/memory")
+    assert resp.status_code == 200
+    assert resp.get_json()["memory"]["pid"] > 0
+
+
+# ===========================================================
+#  WARM-UP / HEALTH CHECK TESTS
+# ===========================================================
+
+def test_concurrent_loads_run_only_once(synthetic_model, monkeypatch):
+    """Single-flight: many threads hitting a cold model trigger one load."""
+    import threading
+
+    from application import predictor
+
+    loads = []
+    original_load = predictor.joblib.load
+    monkeypatch.setattr(
+        predictor.joblib, "load", lambda path, *a, **kw: loads.append(path) or original_load(path, *a, **kw)
+    )
+    predictor._registry.clear()
+
+    app = current_app._get_current_object()
+
+    def worker():
+        with app.app_context():
+            predictor.preprocess_and_predict(make_input())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(path.endswith(".joblib") for path in loads) == 1
+
+
+def test_readyz_reports_warmup_state(client, synthetic_model, monkeypatch):
+    from application import warmup
+
+    monkeypatch.setitem(warmup._state, "status", "loading")
+    resp = client.get("/readyz")
+    assert resp.status_code == 503
+    assert resp.get_json()["ready"] is False
+
+    monkeypatch.setitem(warmup._state, "status", "idle")
+    warmup.start_warmup(client.application)
+    for _ in range(200):
+        if warmup.status()["status"] != "loading":
+            break
+        time.sleep(0.05)
+
+    resp = client.get("/readyz")
+    assert resp.status_code == 200
+    assert resp.get_json()["status"] == "ready"
+
+
+def test_healthz_is_always_ok(client):
+    resp = client.get("/healthz")
+    assert resp.status_code == 200
+    assert resp.get_json()["status"] == "alive"
+
+
+# ===========================================================
+#  MODEL BUNDLE TESTS
+# ===========================================================
+
+def test_bundle_round_trip_and_cache(synthetic_model, app_fixture, monkeypatch, tmp_path):
+    """CONSISTENCY: Loading from a bundle predicts the same as Model/ files."""
+    from application import bundle
+
+    record = make_input()
+    expected = synthetic_model.preprocess_and_predict_batch([record])[0]
+
+    bundle_path = str(tmp_path / "model.bundle")
+    manifest = synthetic_model.export_model_bundle(bundle_path, version="test-1")
+    assert manifest["version"] == "test-1"
+    assert set(manifest["parts"]) == set(bundle.PART_FILES)
+    assert manifest["model_info"]["model_type"] == "RandomForestRegressor"
+
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setitem(app_fixture.config, "MODEL_BUNDLE", bundle_path)
+    monkeypatch.setitem(app_fixture.config, "MODEL_CACHE_DIR", str(cache_dir))
+    synthetic_model.reload_model_components()
+
+    assert synthetic_model.current_version().version == "test-1"
+    assert synthetic_model.preprocess_and_predict_batch([record]) == [expected]
+    cached = list(cache_dir.rglob("model.joblib"))
+    assert len(cached) == 1
+
+    # second cold start loads the decompressed copy, not the bundle part
+    zip_reads = []
+    original_read = bundle.zipfile.ZipFile.read
+    monkeypatch.setattr(
+        bundle.zipfile.ZipFile, "read",
+        lambda self, name, *a: zip_reads.append(name) or original_read(self, name, *a),
+    )
+    synthetic_model.reload_model_components()
+    assert "parts/model.joblib" not in zip_reads
+    assert synthetic_model.preprocess_and_predict_batch([record]) == [expected]
+
+
+def test_bundle_cache_must_be_private_and_match_the_manifest(synthetic_model, tmp_path):
+    import joblib
+
+    from application import bundle
+
+    bundle_path = str(tmp_path / "model.bundle")
+    manifest = synthetic_model.export_model_bundle(bundle_path, version="v")
+    part_sha256 = manifest["parts"]["model"]["sha256"]
+
+    # a cache directory others can write to is not used at all
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    bundle.load_bundle(bundle_path, parts=["model"], cache_dir=str(shared))
+    assert not list(shared.rglob("model.joblib"))
+
+    cache_dir = tmp_path / "cache"
+    bundle.load_bundle(bundle_path, parts=["model"], cache_dir=str(cache_dir))
+    assert (cache_dir.stat().st_mode & 0o777) == 0o700
+    cached = cache_dir / part_sha256 / "model.joblib"
+    assert bundle._load_cached(str(cached), part_sha256) is not None
+
+    # a swapped-in file (or one made from another part) is never unpickled
+    joblib.dump({"not": "the model"}, cached, compress=0)
+    assert bundle._load_cached(str(cached), part_sha256) is None
+    record = cached.with_name("model.joblib.json")
+    record.write_text(json.dumps({"part_sha256": part_sha256, "sha256": bundle._sha256_file(str(cached))}))
+    record.chmod(0o666)
+    assert bundle._load_cached(str(cached), part_sha256) is None
+    record.chmod(0o600)
+    assert bundle._load_cached(str(cached), "0" * 64) is None
+
+def test_bundle_rejects_corrupt_part(synthetic_model, tmp_path):
+    import zipfile
+
+    from application.bundle import load_bundle
+
+    good = str(tmp_path / "good.bundle")
+    synthetic_model.export_model_bundle(good, version="v")
+
+    bad = str(tmp_path / "bad.bundle")
+    with zipfile.ZipFile(good) as src, zipfile.ZipFile(bad, "w") as dst:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            if item.filename == "parts/scaler.joblib":
+                data = data[:-1] + bytes([data[-1] ^ 0xFF])
+            dst.writestr(item, data)
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        load_bundle(bad, parts=["scaler"])
+
+
+# ===========================================================
+#  COMPACT FOREST TESTS
+# ===========================================================
+
+def test_compact_forest_keeps_every_split(synthetic_model):
+    """Rounding thresholds down to float32 must not move any row to another leaf."""
+    from application.forest import FlatForest
+
+    flat = FlatForest.from_sklearn(synthetic_model.current_version().model)
+    compact = flat.compact()
+    X = synthetic_model._build_features(synthetic_model.sample_inputs(500, seed=6))
+
+    # also probe exactly at / around every float32 threshold
+    probes = np.repeat(X[:1], 200, axis=0).astype(np.float32)
+    internal = np.flatnonzero(flat.left != np.arange(len(flat.left)))[:200]
+    for row, node in zip(probes, internal):
+        row[flat.feature[node]] = np.float32(flat.threshold[node])
+
+    for data in (X, probes):
+        assert np.array_equal(compact.leaves(data), flat.leaves(data).astype(np.int32))
+
+    assert compact.threshold.dtype == np.float32
+    assert compact.feature.dtype == np.int16
+    assert compact.left.dtype == np.int32
+    assert compact.nbytes < flat.nbytes
+
+
+def test_compact_model_report(synthetic_model, tmp_path, app_fixture, monkeypatch):
+    report = synthetic_model.compact_model_report(n_rows=300)
+    assert report["compact_bytes"] < report["sklearn_bytes"]
+    assert report["bytes_saved"] > 0
+    assert report["max_rel_deviation"] < 1e-5
+
+    flat_dir = synthetic_model.export_flat_model(str(tmp_path / "compact"), compact=True)
+    monkeypatch.setitem(app_fixture.config, "MODEL_STORAGE", "mmap")
+    monkeypatch.setitem(app_fixture.config, "FLAT_MODEL_DIR", flat_dir)
+    synthetic_model.reload_model_components()
+    assert synthetic_model.current_version().model.value.dtype == np.float32
+    assert synthetic_model.preprocess_and_predict(make_input()) > 0
+
+
+# ===========================================================
+#  FEATURE PRUNING TESTS
+# ===========================================================
+
+def test_pruned_engine_matches_full_model(synthetic_model, app_fixture, monkeypatch):
+    """CONSISTENCY: Dropping never-split features does not change predictions."""
+    records = random_inputs(synthetic_model, 40, seed=7)
+    expected = [r["predicted_rent"] for r in synthetic_model.preprocess_and_predict_batch(records)]
+
+    monkeypatch.setitem(app_fixture.config, "INFERENCE_ENGINE", "flat")
+    monkeypatch.setitem(app_fixture.config, "PRUNE_UNUSED_FEATURES", True)
+    synthetic_model.reload_model_components()
+
+    n_used = len(synthetic_model.current_version().engine_columns)
+    assert n_used < len(synthetic_model.current_version().feature_columns)
+    assert synthetic_model.current_version().engine_compiled.transform(records).shape == (40, n_used)
+
+    got = [r["predicted_rent"] for r in synthetic_model.preprocess_and_predict_batch(records)]
+    assert got == pytest.approx(expected, rel=1e-12)
+
+
+def test_dead_feature_report_lists_unused_locations(synthetic_model):
+    report = synthetic_model.dead_feature_report()
+
+    assert report["total"] == len(synthetic_model.current_version().feature_columns)
+    assert report["used"] + len(report["dead_columns"]) == report["total"]
+    dead_locations = report["dead_categories"]["Location"]
+    assert dead_locations
+    assert all(f"Location_{loc}" in report["dead_columns"] for loc in dead_locations)
+
+
+# ===========================================================
+#  MICRO-BATCHING TESTS
+# ===========================================================
+
+def test_micro_batcher_coalesces_concurrent_requests(synthetic_model, app_fixture, monkeypatch):
+    import threading
+
+    monkeypatch.setitem(app_fixture.config, "PREDICTION_CACHE_SIZE", 0)
+    synthetic_model.reload_model_components()
+    records = random_inputs(synthetic_model, 16, seed=8)
+    expected = [synthetic_model.preprocess_and_predict(r) for r in records]
+
+    monkeypatch.setitem(app_fixture.config, "MICRO_BATCH_ENABLED", True)
+    monkeypatch.setitem(app_fixture.config, "MICRO_BATCH_WINDOW_MS", 50)
+    monkeypatch.setattr(synthetic_model, "_batcher", None)
+
+    results = [None] * len(records)
+    barrier = threading.Barrier(len(records))
+
+    def worker(i):
+        with app_fixture.app_context():
+            barrier.wait()
+            results[i] = synthetic_model.preprocess_and_predict(records[i])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(records))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == pytest.approx(expected, rel=1e-12)
+    stats = synthetic_model.batching_stats()
+    assert stats["items"] == len(records)
+    assert stats["batches"] < len(records)
+    assert stats["queue_depth"] == 0
+
+
+def test_micro_batcher_isolates_failing_record(app_fixture):
+    from application.batching import MicroBatcher
+
+    def score(records):
+        if any(r < 0 for r in records):
+            raise ValueError("negative")
+        return [r * 2 for r in records]
+
+    batcher = MicroBatcher(app_fixture, score, window_ms=1, max_batch=8)
+    assert batcher.submit(21) == 42
+    with pytest.raises(ValueError):
+        batcher.submit(-1)
+    assert batcher.stats()["batches"] == 2
+
+
+# ===========================================================
+#  PROCESS-POOL BACKEND TESTS
+# ===========================================================
+
+def test_process_backend_matches_inline(synthetic_model, app_fixture, monkeypatch):
+    monkeypatch.setitem(app_fixture.config, "PREDICTION_CACHE_SIZE", 0)
+    synthetic_model.reload_model_components()
+    records = random_inputs(synthetic_model, 12, seed=9)
+    expected = [synthetic_model.preprocess_and_predict(r) for r in records]
+
+    monkeypatch.setitem(app_fixture.config, "INFERENCE_BACKEND", "process")
+    monkeypatch.setitem(app_fixture.config, "INFERENCE_POOL_WORKERS", 2)
+    monkeypatch.setattr(synthetic_model, "_executor", None)
+    try:
+        single = [synthetic_model.preprocess_and_predict(r) for r in records]
+        batch = synthetic_model.preprocess_and_predict_batch(records)
+
+        assert single == pytest.approx(expected, rel=1e-12)
+        assert [r["predicted_rent"] for r in batch] == pytest.approx(expected, rel=1e-12)
+        stats = synthetic_model.executor_stats()
+        assert stats["completed"] == len(records) + 1
+        assert stats["in_flight"] == 0
+    finally:
+        synthetic_model._executor.shutdown()
+
+
+def test_process_backend_times_out_when_overloaded():
+    from application.executor import ProcessInferenceExecutor
+
+    executor = ProcessInferenceExecutor(max_workers=1, max_in_flight=1, task_timeout=0.05)
+    executor._in_flight = 1  # simulate one request already in flight
+    with pytest.raises(TimeoutError):
+        executor.score([{}])
+    stats = executor.stats()
+    assert stats["rejected"] == 1 and stats["in_flight"] == 1
+    assert executor._pool is None
+
+
+def test_process_backend_splits_large_batches(synthetic_model, app_fixture, monkeypatch):
+    from application.executor import ProcessInferenceExecutor
+
+    executor = ProcessInferenceExecutor(max_workers=3, chunk_rows=4)
+    assert [len(c) for c in executor._chunks(list(range(3)))] == [3]
+    assert [len(c) for c in executor._chunks(list(range(9)))] == [5, 4]
+    assert [len(c) for c in executor._chunks(list(range(40)))] == [14, 14, 12]
+
+    monkeypatch.setitem(app_fixture.config, "PREDICTION_CACHE_SIZE", 0)
+    synthetic_model.reload_model_components()
+    records = random_inputs(synthetic_model, 20, seed=10)
+    expected = [r["predicted_rent"] for r in synthetic_model.preprocess_and_predict_batch(records)]
+
+    monkeypatch.setitem(app_fixture.config, "INFERENCE_BACKEND", "process")
+    monkeypatch.setitem(app_fixture.config, "INFERENCE_POOL_WORKERS", 2)
+    monkeypatch.setitem(app_fixture.config, "INFERENCE_CHUNK_ROWS", 4)
+    monkeypatch.setattr(synthetic_model, "_executor", None)
+    try:
+        batch = synthetic_model.preprocess_and_predict_batch(records)
+        assert [r["predicted_rent"] for r in batch] == pytest.approx(expected, rel=1e-12)
+        stats = synthetic_model.executor_stats()
+        assert stats["completed"] == 1 and stats["chunks"] == 2
+        assert stats["in_flight"] == 0
+    finally:
+        synthetic_model._executor.shutdown()
+
+
+# ===========================================================
+#  INTRA-REQUEST PARALLELISM TESTS
+# ===========================================================
+
+@pytest.mark.parametrize("strategy", ["rows", "trees"])
+def test_parallel_split_matches_inline(synthetic_model, app_fixture, monkeypatch, strategy):
+    records = random_inputs(synthetic_model, 300, seed=10)
+    monkeypatch.setitem(app_fixture.config, "PREDICTION_CACHE_SIZE", 0)
+    monkeypatch.setitem(app_fixture.config, "PARALLEL_WORKERS", 1)
+    synthetic_model.reload_model_components()
+    expected = synthetic_model.preprocess_and_predict_batch(records)
+    assert synthetic_model.parallel_stats() is None
+
+    monkeypatch.setitem(app_fixture.config, "PARALLEL_WORKERS", 3)
+    monkeypatch.setitem(app_fixture.config, "PARALLEL_BATCH_THRESHOLD", 100)
+    monkeypatch.setitem(app_fixture.config, "PARALLEL_STRATEGY", strategy)
+    synthetic_model.reload_model_components()
+    assert synthetic_model.current_version().model.n_jobs == 1
+
+    batch = synthetic_model.preprocess_and_predict_batch(records)
+    single = synthetic_model.preprocess_and_predict(records[0])
+
+    assert [r["predicted_rent"] for r in batch] == pytest.approx(
+        [r["predicted_rent"] for r in expected], rel=1e-12
+    )
+    assert single == pytest.approx(expected[0]["predicted_rent"], rel=1e-12)
+    stats = synthetic_model.parallel_stats()
+    assert stats["parallel_calls"] == 1
+    assert stats["inline_calls"] >= 1
+
+
+def test_parallel_threshold_auto_calibrates(synthetic_model, app_fixture, monkeypatch):
+    from application.parallel import CALIBRATION_SIZES
+
+    monkeypatch.setitem(app_fixture.config, "PARALLEL_WORKERS", 2)
+    monkeypatch.setitem(app_fixture.config, "PARALLEL_BATCH_THRESHOLD", "auto")
+    synthetic_model.reload_model_components()
+
+    threshold = synthetic_model.parallel_stats()["threshold"]
+    assert threshold is None or threshold in CALIBRATION_SIZES
+
+
+
+def test_parallel_threshold_default_skips_calibration(synthetic_model, app_fixture, monkeypatch):
+    from application.parallel import ParallelScorer
+
+    def calibrate(*args, **kwargs):
+        raise AssertionError("calibrated with a fixed threshold")
+
+    monkeypatch.setattr(ParallelScorer, "calibrate", calibrate)
+    monkeypatch.setitem(app_fixture.config, "PARALLEL_WORKERS", 2)
+    synthetic_model.reload_model_components()  # shipped PARALLEL_BATCH_THRESHOLD
+
+    assert synthetic_model.parallel_stats()["threshold"] == app_fixture.config["PARALLEL_BATCH_THRESHOLD"] == 512
+
+# ===========================================================
+#  WHAT-IF SWEEP TESTS
+# ===========================================================
+
+@pytest.mark.parametrize("engine", ["compiled", "pandas"])
+def test_sweep_matches_pointwise_predictions(synthetic_model, app_fixture, monkeypatch, engine):
+    monkeypatch.setitem(app_fixture.config, "PREDICTION_CACHE_SIZE", 0)
+    monkeypatch.setitem(app_fixture.config, "PREPROCESS_ENGINE", engine)
+    synthetic_model.reload_model_components()
+
+    areas = [500.0, 1250.5, 3000.0]
+    beds = [0, 2, 5]
+    surface, version = synthetic_model.predict_sweep(
+        make_input(), [("Area_in_sqft", areas), ("Beds", beds)]
+    )
+
+    assert surface.shape == (3, 3)
+    assert version == synthetic_model.current_version().version
+    for i, area in enumerate(areas):
+        for j, bed in enumerate(beds):
+            expected = synthetic_model.preprocess_and_predict(make_input(Area_in_sqft=area, Beds=bed))
+            assert surface[i, j] == pytest.approx(expected, rel=1e-12)
+
+
+def test_sweep_rejects_non_numeric_field(synthetic_model):
+    with pytest.raises(ValueError):
+        synthetic_model.predict_sweep(make_input(), [("City", ["Dubai"])])
+
+
+def test_api_sweep_endpoint_scores_grid_without_saving(client, synthetic_model):
+    base = {"bathrooms": 2, "furnishing": "Furnished", "age_of_listing": 30,
+            "property_type": "Apartment", "city": "Dubai", "location": "Dubai Marina",
+            "bedrooms": 2}
+    resp = client.post(
+        "/api/predictions/sweep",
+        data=json.dumps({"base": base, "vary": [
+            {"field": "area", "start": 500, "stop": 5000, "steps": 10},
+            {"field": "bedrooms", "values": [0, 1, 1, 2]},
+        ]}),
+        content_type="application/json",
+    )
+
+    body = resp.get_json()
+    assert resp.status_code == 200
+    assert body["fields"] == ["area", "bedrooms"]
+    assert body["values"]["bedrooms"] == [0, 1, 2]
+    assert body["points"] == 30
+    assert len(body["predicted_rent"]) == 10
+    assert all(len(row) == 3 for row in body["predicted_rent"])
+    assert Prediction.query.count() == 0
+
+
+def test_api_sweep_endpoint_enforces_point_limit(client, synthetic_model, app_fixture, monkeypatch):
+    monkeypatch.setitem(app_fixture.config, "SWEEP_MAX_POINTS", 5)
+    resp = client.post(
+        "/api/predictions/sweep",
+        data=json.dumps({"base": {"area": 900, "bedrooms": 1, "bathrooms": 1,
+                                  "furnishing": "Furnished", "property_type": "Apartment",
+                                  "city": "Dubai", "location": "Dubai Marina"}, "vary": [
+            {"field": "age_of_listing", "start": 0, "stop": 100, "steps": 6},
+        ]}),
+        content_type="application/json",
+    )
+    assert resp.status_code == 400
+    assert "Too many points" in resp.get_json()["message"]
+
+
+
+@pytest.mark.parametrize("axis", [
+    {"field": "area", "start": 500, "stop": 5000, "steps": 1000000000},
+    {"field": "bedrooms", "start": 0, "stop": 5, "steps": 1000000000},
+    {"field": "area", "values": [900] * 6},
+])
+def test_api_sweep_rejects_huge_axis_before_building_it(client, monkeypatch, axis):
+    import application.routes as routes
+
+    def linspace(*args, **kwargs):
+        raise AssertionError("axis built before the point limit was checked")
+
+    monkeypatch.setitem(client.application.config, "SWEEP_MAX_POINTS", 5)
+    monkeypatch.setattr(routes.np, "linspace", linspace)
+    resp = client.post("/api/predictions/sweep", json={"base": {"area": 900}, "vary": [axis]})
+    assert resp.status_code == 400
+    assert "Too many points" in resp.get_json()["message"]
+
+# ===========================================================
+#  RENT GRID TESTS
+# ===========================================================
+
+def use_small_grid(app_fixture, monkeypatch):
+    for key, value in {
+        "RENT_GRID_AREA_POINTS": 6, "RENT_GRID_AGE_POINTS": 3,
+        "RENT_GRID_MAX_BEDS": 2, "RENT_GRID_MAX_BATHS": 2,
+        "PREDICTION_CACHE_SIZE": 0,
+    }.items():
+        monkeypatch.setitem(app_fixture.config, key, value)
+
+
+def test_rent_grid_matches_forest_on_nodes(synthetic_model, app_fixture, monkeypatch):
+    use_small_grid(app_fixture, monkeypatch)
+    monkeypatch.setitem(app_fixture.config, "RENT_GRID_MODE", "compute")
+    synthetic_model.reload_model_components()
+    grid = synthetic_model.current_version().grid
+
+    record = make_input(Area_in_sqft=float(np.expm1(grid.log_area[2])), Beds=1, Baths=2,
+                        Age_of_listing_in_days=int(grid.ages[-1]))
+    forest = float(np.exp(synthetic_model._score_records([record])[0]))
+    assert synthetic_model.preprocess_and_predict(record) == pytest.approx(forest, rel=1e-5)
+
+    # halfway between two area nodes: between the two node answers
+    low = synthetic_model.preprocess_and_predict(record)
+    high = synthetic_model.preprocess_and_predict(
+        dict(record, Area_in_sqft=float(np.expm1(grid.log_area[3]))))
+    mid = synthetic_model.preprocess_and_predict(
+        dict(record, Area_in_sqft=float(np.expm1((grid.log_area[2] + grid.log_area[3]) / 2))))
+    assert min(low, high) - 1e-6 <= mid <= max(low, high) + 1e-6
+    assert synthetic_model.rent_grid_stats()["hits"] == 4
+
+
+def test_rent_grid_falls_back_to_forest_outside_grid(synthetic_model, app_fixture, monkeypatch):
+    use_small_grid(app_fixture, monkeypatch)
+    synthetic_model.reload_model_components()
+    outside = [
+        make_input(Beds=5),
+        make_input(City="Sharjah"),
+        make_input(Location="Al Barsha"),
+        make_input(Area_in_sqft=100.0),
+    ]
+    expected = [synthetic_model.preprocess_and_predict(r) for r in outside]
+
+    monkeypatch.setitem(app_fixture.config, "RENT_GRID_MODE", "compute")
+    synthetic_model.reload_model_components()
+    assert [synthetic_model.preprocess_and_predict(r) for r in outside] == expected
+    assert synthetic_model.rent_grid_stats()["misses"] == len(outside)
+
+
+def test_rent_grid_file_round_trip_and_report(synthetic_model, app_fixture, monkeypatch, tmp_path):
+    use_small_grid(app_fixture, monkeypatch)
+    path = str(tmp_path / "grid.npz")
+    written, built = synthetic_model.export_rent_grid(path)
+
+    monkeypatch.setitem(app_fixture.config, "RENT_GRID_MODE", "file")
+    monkeypatch.setitem(app_fixture.config, "RENT_GRID_FILE", written)
+    synthetic_model.reload_model_components()
+    assert np.array_equal(synthetic_model.current_version().grid.values, built.values)
+
+    report = synthetic_model.rent_grid_report(n_rows=200)
+    assert report["points"] == built.points
+    assert 0 <= report["mean_rel_deviation"] <= report["max_rel_deviation"]
+
+
+# ===========================================================
+#  MODEL REGISTRY / HOT RELOAD TESTS
+# ===========================================================
+
+def test_reload_swaps_version_and_old_version_keeps_serving(synthetic_model, app_fixture, monkeypatch, tmp_path):
+    records = random_inputs(synthetic_model, 5, seed=11)
+    old = synthetic_model.current_version()
+    before = synthetic_model.preprocess_and_predict(records[0])
+    assert before.model_version == old.version
+
+    bundle_path = str(tmp_path / "model.bundle")
+    synthetic_model.export_model_bundle(bundle_path, version="v2")
+    monkeypatch.setitem(app_fixture.config, "MODEL_CACHE_DIR", "")
+    new = synthetic_model.reload_model_components(bundle_path)
+
+    assert synthetic_model.current_version() is new
+    # a request that started on the old version finishes on it
+    assert synthetic_model._score_aed_inline(records, old)[0].model_version == old.version
+
+    after = synthetic_model.preprocess_and_predict(records[0])
+    assert after.model_version == "v2"
+    assert after == before
+    history = synthetic_model.model_registry_status()["history"]
+    assert [h["version"] for h in history[-2:]] == [old.version, "v2"]
+
+
+def test_failed_reload_keeps_current_version(synthetic_model, tmp_path):
+    current = synthetic_model.current_version()
+    with pytest.raises(FileNotFoundError):
+        synthetic_model.reload_model_components(str(tmp_path / "missing.bundle"))
+    assert synthetic_model.current_version() is current
+
+
+def test_predicted_rent_survives_pickling():
+    import pickle
+
+    from application.registry import PredictedRent
+
+    value = pickle.loads(pickle.dumps(PredictedRent(1234.5, "v7")))
+    assert value == 1234.5
+    assert value.model_version == "v7"
+
+
+def test_api_prediction_records_model_version(client, synthetic_model):
+    resp = client.post(
+        "/api/predictions",
+        data=json.dumps({"area": 800, "bedrooms": 2, "bathrooms": 2, "furnishing": "Furnished",
+                         "age_of_listing": 30, "property_type": "Apartment", "city": "Dubai",
+                         "location": "Dubai Marina"}),
+        content_type="application/json",
+    )
+    body = resp.get_json()
+    version = synthetic_model.current_version().version
+    assert body["model_version"] == version
+    assert db.session.get(Prediction, body["id"]).model_version == version
+
+
+def test_admin_reload_endpoint(client, synthetic_model, app_fixture, monkeypatch, tmp_path):
+    bundle_path = str(tmp_path / "model.bundle")
+    synthetic_model.export_model_bundle(bundle_path, version="v3")
+    monkeypatch.setitem(app_fixture.config, "MODEL_CACHE_DIR", "")
+
+    resp = client.post("/api/admin/model/reload", json={"bundle": bundle_path, "wait": True})
+    assert resp.status_code == 403  # no ADMIN_TOKEN configured
+
+    monkeypatch.setitem(app_fixture.config, "ADMIN_TOKEN", "secret")
+    resp = client.post("/api/admin/model/reload", json={"bundle": bundle_path, "wait": True},
+                       headers={"X-Admin-Token": "wrong"})
+    assert resp.status_code == 403
+
+    resp = client.post("/api/admin/model/reload", json={"bundle": bundle_path, "wait": True},
+                       headers={"X-Admin-Token": "secret"})
+    assert resp.status_code == 400  # tmp_path is not an allowed bundle directory
+
+    monkeypatch.setitem(app_fixture.config, "MODEL_BUNDLE_DIR", str(tmp_path))
+    resp = client.post("/api/admin/model/reload", json={"bundle": bundle_path, "wait": True},
+                       headers={"X-Admin-Token": "secret"})
+    assert resp.status_code == 200
+    assert resp.get_json()["model_version"] == "v3"
+
+    resp = client.get("/api/admin/model", headers={"X-Admin-Token": "secret"})
+    assert resp.get_json()["model"]["current"]["version"] == "v3"
+
+
+def test_admin_reload_rejects_bundles_outside_allowed_dirs(client, synthetic_model, app_fixture,
+                                                           monkeypatch, tmp_path):
+    allowed = tmp_path / "bundles"
+    allowed.mkdir()
+    outside = tmp_path / "model.bundle"
+    synthetic_model.export_model_bundle(str(outside), version="evil")
+    os.symlink(outside, allowed / "link.bundle")
+    monkeypatch.setitem(app_fixture.config, "MODEL_BUNDLE_DIR", str(allowed))
+    monkeypatch.setitem(app_fixture.config, "ADMIN_TOKEN", "secret")
+    version = synthetic_model.current_version().version
+
+    for bundle in (str(outside), str(allowed / ".." / "model.bundle"), str(allowed / "link.bundle"),
+                   str(allowed), ["x"]):
+        resp = client.post("/api/admin/model/reload", json={"bundle": bundle, "wait": True},
+                           headers={"X-Admin-Token": "secret"})
+        assert resp.status_code == 400, bundle
+        assert resp.get_json()["success"] is False
+    assert synthetic_model.current_version().version == version
+
+
+def test_admin_reload_under_mmap_scores_with_the_new_forest(client, synthetic_model, synthetic_model_dir,
+                                                            app_fixture, monkeypatch, tmp_path):
+    first = bundle_with_forest(synthetic_model_dir, tmp_path, "first", seed=1)
+    second = bundle_with_forest(synthetic_model_dir, tmp_path, "second", seed=2)
+    monkeypatch.setitem(app_fixture.config, "MODEL_CACHE_DIR", "")
+    monkeypatch.setitem(app_fixture.config, "PREDICTION_CACHE_SIZE", 0)
+    monkeypatch.setitem(app_fixture.config, "MODEL_STORAGE", "mmap")
+    monkeypatch.setitem(app_fixture.config, "FLAT_MODEL_DIR", str(tmp_path / "flat"))
+    monkeypatch.setitem(app_fixture.config, "ADMIN_TOKEN", "secret")
+    monkeypatch.setitem(app_fixture.config, "MODEL_BUNDLE_DIR", str(tmp_path))
+    records = random_inputs(synthetic_model, 10, seed=3)
+
+    before = []
+    for bundle_path, version in ((first, "first"), (second, "second")):
+        resp = client.post("/api/admin/model/reload", json={"bundle": bundle_path, "wait": True},
+                           headers={"X-Admin-Token": "secret"})
+        assert resp.status_code == 200 and resp.get_json()["model_version"] == version
+        got = synthetic_model.preprocess_and_predict_batch(records)
+        assert {r["predicted_rent"].model_version for r in got} == {version}
+        before.append([r["predicted_rent"] for r in got])
+
+    assert before[0] != pytest.approx(before[1], rel=1e-6)
+
+def test_model_watcher_fires_once_files_settle(tmp_path):
+    import threading
+
+    from application.registry import ModelWatcher
+
+    path = tmp_path / "model.bundle"
+    path.write_bytes(b"v1")
+    changed = threading.Event()
+    watcher = ModelWatcher(lambda: [str(path)], changed.set, interval=0.05)
+    watcher.start()
+    try:
+        time.sleep(0.1)
+        assert not changed.is_set()
+        path.write_bytes(b"version two")
+        assert changed.wait(2)
+    finally:
+        watcher.stop()
+
+
+
+def test_model_watcher_watches_flat_forest_with_mmap(synthetic_model, app_fixture, monkeypatch, tmp_path):
+    import threading
+
+    from application.forest import META_FILE
+    from application.registry import ModelWatcher
+
+    flat_dir = synthetic_model.export_flat_model(str(tmp_path / "flat"))
+    monkeypatch.setitem(app_fixture.config, "MODEL_STORAGE", "mmap")
+    monkeypatch.setitem(app_fixture.config, "FLAT_MODEL_DIR", flat_dir)
+
+    paths = synthetic_model._watched_paths()
+    assert os.path.join(flat_dir, META_FILE) in paths
+
+    def watched():
+        with app_fixture.app_context():
+            return synthetic_model._watched_paths()
+
+    changed = threading.Event()
+    watcher = ModelWatcher(watched, changed.set, interval=0.05)
+    watcher.start()
+    try:
+        time.sleep(0.1)
+        assert watcher._thread.is_alive() and not changed.is_set()
+        with open(os.path.join(flat_dir, META_FILE), "a") as f:
+            f.write(" ")
+        assert changed.wait(2)
+    finally:
+        watcher.stop()
+
+
+def test_model_watcher_survives_failing_paths(tmp_path):
+    import threading
+
+    from application.registry import ModelWatcher
+
+    path = tmp_path / "model.bundle"
+    path.write_bytes(b"v1")
+    calls = []
+
+    def paths():
+        calls.append(1)
+        if len(calls) <= 2:
+            raise AttributeError("bad path")
+        return [str(path)]
+
+    changed = threading.Event()
+    watcher = ModelWatcher(paths, changed.set, interval=0.05)
+    watcher.start()
+    try:
+        time.sleep(0.2)
+        assert watcher._thread.is_alive() and not changed.is_set()
+        path.write_bytes(b"version two")
+        assert changed.wait(2)
+    finally:
+        watcher.stop()
+
+# ===========================================================
+#  SHADOW MODEL / REPLAY TESTS
+# ===========================================================
+
+def test_delta_stats_summary():
+    from application.shadow import DeltaStats
+
+    stats = DeltaStats(maxlen=3)
+    stats.add([100.0, 100.0], [100.0, 90.0])
+    stats.add([100.0, 200.0], [120.0, 200.5])
+    summary = stats.summary()
+
+    assert summary["count"] == 4
+    # only the 3 most recent deltas (-10, +20, +0.5) are kept
+    assert summary["max_abs_delta_aed"] == pytest.approx(20.0)
+    assert summary["mean_delta_aed"] == pytest.approx(10.5 / 3)
+    assert summary["abs_rel_buckets"] == {"<0.1%": 0, "<1.0%": 1, "<5.0%": 0, "<10.0%": 0, ">=10.0%": 2}
+
+
+def test_shadow_model_scores_sampled_requests(client, synthetic_model, app_fixture, monkeypatch, tmp_path):
+    bundle_path = str(tmp_path / "candidate.bundle")
+    synthetic_model.export_model_bundle(bundle_path, version="candidate")
+    monkeypatch.setitem(app_fixture.config, "MODEL_CACHE_DIR", "")
+    monkeypatch.setitem(app_fixture.config, "SHADOW_MODEL_BUNDLE", bundle_path)
+    monkeypatch.setitem(app_fixture.config, "SHADOW_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(synthetic_model, "_shadow", None)
+
+    records = random_inputs(synthetic_model, 5, seed=12)
+    for record in records:
+        synthetic_model.preprocess_and_predict(record)
+
+    deadline = time.time() + 10
+    while synthetic_model.shadow_stats()["deltas"]["count"] < len(records) and time.time() < deadline:
+        time.sleep(0.02)
+
+    body = client.get("/api/model/shadow").get_json()
+    assert body["enabled"] is True
+    shadow = body["shadow"]
+    assert shadow["candidate_version"] == "candidate"
+    assert shadow["sampled"] == len(records)
+    # same forest, so no differences
+    assert shadow["deltas"]["count"] == len(records)
+    assert shadow["deltas"]["max_abs_delta_aed"] == pytest.approx(0.0, abs=1e-6)
+
+
+def test_replay_stored_predictions(synthetic_model, tmp_path, monkeypatch, app_fixture):
+    records = random_inputs(synthetic_model, 7, seed=13)
+    actual = synthetic_model._score_aed_inline(records)
+    for record, rent in zip(records, actual):
+        db.session.add(Prediction(
+            area=record["Area_in_sqft"], bedrooms=record["Beds"], bathrooms=record["Baths"],
+            furnishing=record["Furnishing"], age_of_listing=record["Age_of_listing_in_days"],
+            property_type=record["Type"], city=record["City"], location=record["Location"],
+            predicted_rent=rent * 1.25, model_version="old",
+        ))
+    db.session.add(Prediction(area=800.0, predicted_rent=None))  # incomplete row
+    db.session.commit()
+
+    bundle_path = str(tmp_path / "candidate.bundle")
+    synthetic_model.export_model_bundle(bundle_path, version="candidate")
+    monkeypatch.setitem(app_fixture.config, "MODEL_CACHE_DIR", "")
+    chunks = []
+    report = synthetic_model.replay_stored_predictions(bundle_path, chunk_size=3, progress=chunks.append)
+
+    assert chunks == [3, 6, 8]
+    assert report["candidate_version"] == "candidate"
+    assert report["rows"] == 8
+    assert report["skipped"] == 1
+    assert report["stored_versions"] == {"old": 7}
+    assert report["deltas"]["count"] == 7
+    assert report["deltas"]["mean_rel_delta"] == pytest.approx(-0.2)
+
+    limited = synthetic_model.replay_stored_predictions(bundle_path, chunk_size=3, limit=4)
+    assert limited["rows"] == 4
+
+
+
+def test_replay_and_shadow_under_mmap_use_the_candidate_forest(synthetic_model, synthetic_model_dir,
+                                                              app_fixture, monkeypatch, tmp_path):
+    records = random_inputs(synthetic_model, 5, seed=14)
+    for record, rent in zip(records, synthetic_model._score_aed_inline(records)):
+        db.session.add(Prediction(
+            area=record["Area_in_sqft"], bedrooms=record["Beds"], bathrooms=record["Baths"],
+            furnishing=record["Furnishing"], age_of_listing=record["Age_of_listing_in_days"],
+            property_type=record["Type"], city=record["City"], location=record["Location"],
+            predicted_rent=rent, model_version="current",
+        ))
+    db.session.commit()
+
+    bundle_path = bundle_with_forest(synthetic_model_dir, tmp_path, "candidate", seed=5)
+    monkeypatch.setitem(app_fixture.config, "MODEL_CACHE_DIR", "")
+    monkeypatch.setitem(app_fixture.config, "MODEL_STORAGE", "mmap")
+    monkeypatch.setitem(app_fixture.config, "FLAT_MODEL_DIR", str(tmp_path / "flat"))
+
+    candidate = synthetic_model.load_candidate(bundle_path)
+    assert candidate.flat_dir != synthetic_model.current_version().flat_dir
+
+    report = synthetic_model.replay_stored_predictions(bundle_path)
+    assert report["deltas"]["count"] == 5
+    # a different forest: the candidate is not compared with the primary's own forest
+    assert report["deltas"]["max_abs_delta_aed"] > 1.0
+
+# ===========================================================
+#  ASGI SERVING TESTS
+# ===========================================================
+
+def asgi_request(asgi_app, method, path, payload=None, cookie=None):
+    """Run one request through an ASGI app, return (status, JSON body)."""
+    import asyncio
+
+    body = json.dumps(payload).encode() if payload is not None else b""
+    headers = [(b"content-type", b"application/json")]
+    if cookie:
+        headers.append((b"cookie", cookie.encode()))
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+             "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+             "query_string": b"", "headers": headers, "server": ("testserver", 80), "client": ("127.0.0.1", 1)}
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+    status = sent[0]["status"]
+    return status, json.loads(b"".join(m.get("body", b"") for m in sent[1:]))
+
+
+API_ITEM = {"area": 800, "bedrooms": 2, "bathrooms": 2, "furnishing": "Furnished", "age_of_listing": 30,
+            "property_type": "Apartment", "city": "Dubai", "location": "Dubai Marina"}
+
+
+@pytest.fixture
+def asgi_app(app_fixture):
+    from application.asgi import PredictionASGIApp
+
+    asgi_app = PredictionASGIApp(app_fixture, inference_threads=2)
+    yield asgi_app
+    asgi_app.shutdown()
+
+
+def test_asgi_create_prediction_matches_flask(client, synthetic_model, asgi_app):
+    status, body = asgi_request(asgi_app, "POST", "/api/predictions", API_ITEM)
+    assert status == 200
+    flask_body = client.post("/api/predictions", json=API_ITEM).get_json()
+    assert body["predicted_rent"] == flask_body["predicted_rent"]
+    assert body["model_version"] == flask_body["model_version"]
+
+    pred = db.session.get(Prediction, body["id"])
+    assert pred.predicted_rent == pytest.approx(body["predicted_rent"])
+    assert pred.user_id is None
+
+    status, body = asgi_request(asgi_app, "POST", "/api/predictions", {"area": 800})
+    assert status == 400
+    assert body["message"].startswith("Missing fields")
+
+
+def test_asgi_prediction_saved_for_logged_in_user(client, synthetic_model, asgi_app):
+    from application.models import User
+
+    user = User(username="asgiuser", email="asgiuser@gmail.com")
+    user.set_password("password123")
+    db.session.add(user)
+    db.session.commit()
+    client.post("/login", data={"email": "asgiuser@gmail.com", "password": "password123"})
+    cookie = f"session={client.get_cookie('session').value}"
+
+    status, body = asgi_request(asgi_app, "POST", "/api/predictions", API_ITEM, cookie=cookie)
+    assert status == 200
+    assert db.session.get(Prediction, body["id"]).user_id == user.id
+
+
+def test_asgi_parses_inputs_off_the_event_loop(client, synthetic_model, asgi_app, monkeypatch):
+    import threading
+
+    import application.asgi as asgi
+    import application.routes as routes
+
+    threads = []
+    parse = routes.api_prediction_input
+    decode = asgi.json_body
+
+    def recording_parse(data):
+        threads.append(threading.current_thread().name)
+        return parse(data)
+
+    def recording_decode(scope, body):
+        threads.append(threading.current_thread().name)
+        return decode(scope, body)
+
+    monkeypatch.setattr(asgi, "api_prediction_input", recording_parse)
+    monkeypatch.setattr(routes, "api_prediction_input", recording_parse)
+    monkeypatch.setattr(asgi, "json_body", recording_decode)
+
+    assert asgi_request(asgi_app, "POST", "/api/predictions", API_ITEM)[0] == 200
+    status, body = asgi_request(asgi_app, "POST", "/api/predictions/batch", {"save": True, "items": [API_ITEM] * 3})
+    assert status == 200 and all(r["id"] for r in body["results"])
+
+    # 2 bodies decoded, 4 items parsed
+    assert len(threads) == 6
+    assert all(name.startswith("asgi-inference") for name in threads)
+
+def test_asgi_batch_rejects_non_boolean_save(synthetic_model, asgi_app):
+    status, body = asgi_request(asgi_app, "POST", "/api/predictions/batch", {"save": "false", "items": [API_ITEM]})
+    assert status == 400
+    assert "save" in body["message"]
+    assert Prediction.query.count() == 0
+
+def test_asgi_batch_and_fallback_to_flask(synthetic_model, asgi_app):
+    status, body = asgi_request(asgi_app, "POST", "/api/predictions/batch",
+                                {"items": [API_ITEM, {"area": 1}, dict(API_ITEM, bedrooms=3)], "save": True})
+    assert status == 200
+    assert [r["success"] for r in body["results"]] == [True, False, True]
+    assert body["saved"] is True
+    saved_id = body["results"][2]["id"]
+
+    # GET is not served natively: it goes through the Flask app
+    status, body = asgi_request(asgi_app, "GET", f"/api/predictions/{saved_id}")
+    assert status == 200
+    assert body["item"]["bedrooms"] == 3
+
+
+# ===========================================================
+#  METRICS TESTS
+# ===========================================================
+
+def metric_value(text, sample):
+    """Value of one sample line (name + labels) in a Prometheus text page."""
+    for line in text.splitlines():
+        if line.startswith(sample + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_histogram_renders_cumulative_buckets():
+    import application.metrics as metrics
+    from application.metrics import Histogram, render
+
+    hist = Histogram("test_seconds", "Test", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        hist.observe(value, stage="a")
+    snap = {"test_seconds": hist.snapshot()}
+
+    metrics._metrics.append(hist)
+    try:
+        text = render([snap, snap])  # two workers with the same counts
+    finally:
+        metrics._metrics.remove(hist)
+
+    assert 'test_seconds_bucket{stage="a",le="0.1"} 2' in text
+    assert 'test_seconds_bucket{stage="a",le="1.0"} 6' in text
+    assert 'test_seconds_bucket{stage="a",le="+Inf"} 8' in text
+    assert 'test_seconds_count{stage="a"} 8' in text
+    assert metric_value(text, 'test_seconds_sum{stage="a"}') == pytest.approx(8.5)
+
+
+def test_metrics_endpoint_counts_requests_and_stages(client, synthetic_model):
+    before = client.get("/metrics").get_data(as_text=True)
+    resp = client.post("/api/predictions", json={
+        "area": 812, "bedrooms": 2, "bathrooms": 2, "furnishing": "Furnished", "age_of_listing": 30,
+        "property_type": "Apartment", "city": "Dubai", "location": "Dubai Marina"})
+    assert resp.status_code == 200
+
+    resp = client.get("/metrics")
+    assert resp.content_type.startswith("text/plain; version=0.0.4")
+    after = resp.get_data(as_text=True)
+
+    requests = 'rent_http_requests_total{endpoint="api_create_prediction",method="POST",status="200"}'
+    assert metric_value(after, requests) == metric_value(before, requests) + 1
+    for stage in ("predict", "db_commit"):
+        sample = f'rent_prediction_stage_seconds_count{{stage="{stage}"}}'
+        assert metric_value(after, sample) > metric_value(before, sample)
+    assert metric_value(after, 'rent_model_loads_total{result="success"}') >= 1
+
+
+def test_metrics_are_summed_across_worker_files(client, monkeypatch, tmp_path):
+    import application.metrics as metrics
+
+    monkeypatch.setattr(metrics, "_directory", str(tmp_path))
+    client.get("/healthz")
+    own = metrics.render([metrics.snapshot()])
+    # another (live) worker's snapshot with the same counts
+    (tmp_path / f"metrics-{os.getppid()}.json").write_text(json.dumps(metrics.snapshot()))
+
+    text = client.get("/metrics").get_data(as_text=True)
+    sample = 'rent_http_requests_total{endpoint="healthz",method="GET",status="200"}'
+    assert metric_value(text, sample) == 2 * metric_value(own, sample)
+    assert (tmp_path / f"metrics-{os.getpid()}.json").exists()
+
+
+
+def test_metrics_archive_exited_or_stale_workers(client, monkeypatch, tmp_path):
+    import application.metrics as metrics
+
+    monkeypatch.setattr(metrics, "_directory", str(tmp_path))
+    client.get("/healthz")
+    own = metrics.render([metrics.snapshot()])
+    sample = 'rent_http_requests_total{endpoint="healthz",method="GET",status="200"}'
+    per_worker = metric_value(own, sample)
+
+    other = metrics.snapshot()
+    other["rent_write_queue_depth"] = [[[], 7]]
+    dead = tmp_path / "metrics-999999.json"
+    dead.write_text(json.dumps(other))
+    stale = tmp_path / f"metrics-{os.getppid()}.json"
+    stale.write_text(json.dumps(other))
+    old = time.time() - 10 * metrics._interval
+    os.utime(stale, (old, old))
+
+    # their counters are kept (in the archive), their gauges dropped
+    first = client.get("/metrics").get_data(as_text=True)
+    assert metric_value(first, sample) == 3 * per_worker
+    assert not dead.exists() and not stale.exists()
+    archived = json.loads((tmp_path / metrics.ARCHIVE_NAME).read_text())
+    assert archived["rent_write_queue_depth"] == []
+    assert "rent_write_queue_depth 7" not in first
+
+    # and stay counted on every later scrape: the totals never go down
+    client.get("/healthz")
+    second = client.get("/metrics").get_data(as_text=True)
+    assert metric_value(second, sample) == 3 * per_worker + 1
+    for line in first.splitlines():
+        if line.startswith("rent_") and "_total" in line.split(" ")[0]:
+            name = line.rsplit(" ", 1)[0]
+            assert metric_value(second, name) >= metric_value(first, name)
+
+# ===========================================================
+#  LOCATION AUTOCOMPLETE TESTS
+# ===========================================================
+
+LOCATION_ITEM = {"area": 850, "bedrooms": 2, "bathrooms": 2, "furnishing": "Furnished", "age_of_listing": 7,
+                 "property_type": "Apartment", "city": "Dubai"}
+
+
+def test_location_index_prefixes_and_canonical_names():
+    from application.locations import LocationIndex
+
+    index = LocationIndex(
+        ["Dubai Marina", "Marina Village", "Ajman Marina", "Jumeirah Lake Towers (JLT)", "Al Marjan Island"],
+        city_of={"Dubai Marina": "Dubai", "Ajman Marina": "Ajman"},
+    )
+    assert index.canonical("  dubai   MARINA ") == "Dubai Marina"
+    assert index.canonical("jlt") == index.canonical("Jumeirah Lake Towers") == "Jumeirah Lake Towers (JLT)"
+    assert index.canonical("Marina") is None
+
+    # names starting with the prefix first, then later words; each alphabetical
+    assert index.complete("MAR") == ["Marina Village", "Ajman Marina", "Al Marjan Island", "Dubai Marina"]
+    assert index.complete("jl") == ["Jumeirah Lake Towers (JLT)"]
+    assert index.complete("marina", limit=2) == ["Marina Village", "Ajman Marina"]
+    # known to be in the city first, unknown city after, other cities left out
+    assert index.complete("marina", city="Dubai") == ["Dubai Marina", "Marina Village"]
+
+    same = LocationIndex(list(reversed(index.names)), city_of=index.city_of)
+    assert same.etag == index.etag
+    assert LocationIndex(index.names + ["Yas Island"]).etag != index.etag
+
+
+def test_location_index_is_built_with_the_model(synthetic_model):
+    mv = synthetic_model.current_version()
+    assert len(mv.locations) == len(mv.encoder.categories_[1])
+    assert synthetic_model.location_index() is mv.locations
+    assert mv.locations.city_of["Dubai Marina"] == "Dubai"
+    assert synthetic_model.canonical_location("palm JUMEIRAH") == "Palm Jumeirah"
+    with pytest.raises(ValueError):
+        synthetic_model.canonical_location("Atlantis Under The Sea")
+    assert synthetic_model.canonical_location("Atlantis  Under", strict=False) == "Atlantis Under"
+
+
+def test_api_locations_is_small_sorted_and_cacheable(client, synthetic_model):
+    resp = client.get("/api/locations?q=dubai&city=Dubai&limit=5")
+    assert resp.status_code == 200
+    body = resp.get_json()
+    names = [loc["name"] for loc in body["locations"]]
+    assert len(names) == 5
+    assert all(name.lower().startswith("dubai") for name in names)
+    assert names == sorted(names, key=str.casefold)
+    assert body["locations"][0]["city"] == "Dubai"
+
+    etag = resp.headers["ETag"]
+    assert "max-age" in resp.headers["Cache-Control"]
+    again = client.get("/api/locations?q=dubai&city=Dubai&limit=5", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+    assert len(client.get("/api/locations?limit=1000").get_json()["locations"]) == 50
+
+
+def test_api_canonicalizes_and_rejects_locations(client, synthetic_model):
+    resp = client.post("/api/predictions", json=dict(LOCATION_ITEM, location="  dubai marina "))
+    assert resp.status_code == 200
+    assert db.session.get(Prediction, resp.get_json()["id"]).location == "Dubai Marina"
+
+    resp = client.post("/api/predictions", json=dict(LOCATION_ITEM, location="Atlantis"))
+    assert resp.status_code == 400
+    assert "Unknown location" in resp.get_json()["message"]
+
+    resp = client.post("/api/predictions/batch", json={"save": True, "items": [
+        dict(LOCATION_ITEM, location="jlt"), dict(LOCATION_ITEM, location="Atlantis")]})
+    results = resp.get_json()["results"]
+    assert results[0]["success"] and not results[1]["success"]
+    assert "Unknown location" in results[1]["message"]
+    assert db.session.get(Prediction, results[0]["id"]).location == "Jumeirah Lake Towers (JLT)"
+
+
+def test_form_canonicalizes_and_rejects_locations(client, synthetic_model):
+    form = {"area_in_sqft": 850, "beds": 2, "baths": 2, "age_of_listing_in_days": 7, "furnishing": "Furnished",
+            "type": "Apartment", "city": "Dubai"}
+    client.post("/predict", data=dict(form, location="business  BAY"))
+    assert [p.location for p in Prediction.query.all()] == ["Business Bay"]
+
+    resp = client.post("/predict", data=dict(form, location="Atlantis"), follow_redirects=True)
+    assert b"Unknown location" in resp.data
+    assert Prediction.query.count() == 1
+
+
+# ===========================================================
+#  WRITE-BEHIND TESTS
+# ===========================================================
+
+WRITE_ITEM = dict(LOCATION_ITEM, location="Dubai Marina")
+
+
+@pytest.fixture
+def write_behind(app_fixture, monkeypatch):
+    """WRITE_BEHIND_ENABLED with a fresh queue; remaining rows are written afterwards."""
+    from application import writebehind
+
+    monkeypatch.setitem(app_fixture.config, "WRITE_BEHIND_ENABLED", True)
+    monkeypatch.setitem(app_fixture.config, "WRITE_BEHIND_FLUSH_INTERVAL", 0.02)
+    writebehind._queue = None
+    yield writebehind
+    writebehind.flush_write_queue(timeout=10)
+    writebehind._queue = None
+
+
+def test_write_behind_returns_public_id_then_writes(client, synthetic_model, write_behind):
+    resp = client.post("/api/predictions", json=WRITE_ITEM)
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["id"] is None and body["queued"]
+    public_id = body["public_id"]
+
+    assert write_behind.flush_write_queue(timeout=10)
+    db.session.expire_all()
+    pred = Prediction.query.filter_by(public_id=public_id).one()
+    assert pred.predicted_rent == pytest.approx(body["predicted_rent"])
+    assert pred.location == "Dubai Marina"
+
+    resp = client.get(f"/api/predictions/ref/{public_id}")
+    assert resp.status_code == 200
+    assert resp.get_json()["item"]["id"] == pred.id
+    assert client.get("/api/predictions/ref/does-not-exist").status_code == 404
+
+
+def test_write_behind_pending_ref_is_202(client, synthetic_model, write_behind):
+    # writer never starts: the row stays queued
+    queue = write_behind.write_queue()
+    queue._ensure_thread = lambda: None
+    public_id = client.post("/api/predictions", json=WRITE_ITEM).get_json()["public_id"]
+
+    resp = client.get(f"/api/predictions/ref/{public_id}")
+    assert resp.status_code == 202
+    assert resp.get_json()["pending"]
+
+    del queue._ensure_thread
+    assert write_behind.flush_write_queue(timeout=10)
+    assert client.get(f"/api/predictions/ref/{public_id}").status_code == 200
+
+
+def test_write_behind_commits_rows_in_batches(client, synthetic_model, write_behind):
+    resp = client.post("/api/predictions/batch", json={"save": True, "items": [WRITE_ITEM] * 20})
+    results = resp.get_json()["results"]
+    assert all(r["id"] is None and r["public_id"] for r in results)
+    assert write_behind.flush_write_queue(timeout=10)
+
+    stats = client.get("/api/model/writer").get_json()
+    assert stats["enabled"]
+    writer = stats["writer"]
+    assert writer["written"] == 20 and writer["failed"] == 0
+    assert writer["batches"] < 20
+    assert writer["max_batch_size"] > 1
+    assert writer["queue_depth"] == 0 and writer["commit_ms_p50"] is not None
+
+    db.session.expire_all()
+    public_ids = {r["public_id"] for r in results}
+    assert Prediction.query.filter(Prediction.public_id.in_(public_ids)).count() == 20
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert metric_value(text, 'rent_write_rows_total{result="written"}') >= 20
+    assert metric_value(text, "rent_write_batch_rows_count") >= 1
+    assert "# TYPE rent_write_queue_depth gauge" in text
+
+
+def test_write_behind_full_queue_is_503(client, synthetic_model, write_behind, monkeypatch):
+    monkeypatch.setitem(current_app.config, "WRITE_BEHIND_QUEUE_SIZE", 1)
+    monkeypatch.setitem(current_app.config, "WRITE_BEHIND_PUT_TIMEOUT", 0.05)
+    queue = write_behind.write_queue()
+    queue._ensure_thread = lambda: None
+
+    assert client.post("/api/predictions", json=WRITE_ITEM).status_code == 200
+    resp = client.post("/api/predictions", json=WRITE_ITEM)
+    assert resp.status_code == 503
+    assert "Write queue full" in resp.get_json()["message"]
+    assert write_behind.write_queue_stats()["rejected"] == 1
+
+    del queue._ensure_thread
+    assert write_behind.flush_write_queue(timeout=10)
+
+
+def test_form_predictions_are_written_synchronously(client, synthetic_model, write_behind):
+    # a stalled writer would keep a queued row off the page the form redirects to
+    queue = write_behind.write_queue()
+    queue._ensure_thread = lambda: None
+
+    form = {"area_in_sqft": 850, "beds": 2, "baths": 2, "age_of_listing_in_days": 7, "furnishing": "Furnished",
+            "type": "Apartment", "city": "Dubai", "location": "Dubai Marina"}
+    resp = client.post("/predict", data=form, follow_redirects=True)
+    assert b"Prediction successful!" in resp.data
+    assert Prediction.query.count() == 1
+    assert queue.stats()["queued"] == 0
+
+
+def test_write_behind_rows_get_column_defaults(app_fixture, write_behind):
+    queue = write_behind.WriteBehindQueue(app_fixture)
+    pred = Prediction(area=850.0, predicted_rent=1.0, model_version="test")
+    row = write_behind.prediction_values(pred)
+    assert "created_at" not in row and row["public_id"] == pred.public_id
+
+    queue.submit([row])
+    assert queue.flush(timeout=10)
+    db.session.expire_all()
+    assert Prediction.query.filter_by(public_id=pred.public_id).one().created_at is not None
+
+def test_write_behind_bad_row_does_not_lose_batch(app_fixture, write_behind, caplog):
+    import logging
+    from datetime import datetime
+
+    queue = write_behind.WriteBehindQueue(app_fixture, flush_interval=0.5)
+    row = {"area": 850.0, "bedrooms": 2, "bathrooms": 2, "furnishing": "Furnished", "age_of_listing": 7,
+           "property_type": "Apartment", "city": "Dubai", "location": "Dubai Marina", "predicted_rent": 1.0,
+           "model_version": "test", "created_at": datetime.now(), "user_id": None}
+    rows = [dict(row, public_id=f"wb-{i}") for i in range(3)]
+    rows.append(dict(row, public_id="wb-0"))  # duplicate public_id fails the batch
+    queue.submit(rows)
+    assert queue.flush(timeout=10)
+
+    stats = queue.stats()
+    assert (stats["written"], stats["failed"]) == (3, 1)
+    dropped = [r for r in caplog.records if r.levelno == logging.ERROR and "dropped prediction" in r.getMessage()]
+    assert len(dropped) == 1 and "wb-0" in dropped[0].getMessage()
+    db.session.expire_all()
+    assert Prediction.query.filter(Prediction.public_id.like("wb-%")).count() == 3
+
+
+def test_sync_writes_return_id_and_public_id(client, synthetic_model):
+    body = client.post("/api/predictions", json=WRITE_ITEM).get_json()
+    assert body["id"] is not None and not body["queued"]
+    assert db.session.get(Prediction, body["id"]).public_id == body["public_id"]
+    assert client.get("/api/model/writer").get_json()["enabled"] is False